@@ -1,147 +1,46 @@
 import pandas as pd
-import numpy as np
-from datetime import datetime, timedelta
-import pyodbc
-import pandas as pd
 from datetime import datetime
-import time
+from storage import MSSQL_LOGIN, SqlStorage, connect_mssql
+from gap_fill import missing_rows
+from tick_scheduler import replay
+from sim_clock import get_clock
+from energy_generator import build_timestamps, generate_energy_batch, expand_for_db
+from shift_calendar import default_calendar
+from station_config import registry
 
 # Parameters
 start_date = datetime(2025, 4, 20)
 end_date = datetime(2025, 5, 20)
-working_hours = range(9, 18)  # 9 AM to 6 PM
-days_of_week = [0, 1, 2, 3, 4, 5]  # Monday to Saturday
-prob_status = [0.85, 0.14, 0.01]  # Probabilities for Working, Idle, Maintenance
-
-
-# Data generation
-timestamps = []
-pf_values = []
-power_values = []
-reading_values = []
-consumption_values = []
-statuses = []
-notifications = []
-
-current_kvah_reading = 0
-
-
-# Function to generate random PF with probabilities
-def generate_pf():
-    rand = np.random.rand()
-    if rand < 0.07:  # 7% Low PF occational
-        return round(np.random.uniform(0.80, 0.84), 2)
-    elif rand < 0.14:  # 2% High PF Rare
-        return round(np.random.uniform(0.90, 1.00), 2)
-    else:  # Normal PF
-        return round(np.random.uniform(0.85, 0.95), 2)
-    
-
-# Generate timestamps for working days and hours
-current_date = start_date
-while current_date <= end_date:
-    if current_date.weekday() in days_of_week:
-        for hour in working_hours:
-            for minute in range(60):
-                timestamps.append(current_date.replace(hour=hour, minute=minute, second=0))
-    current_date += timedelta(days=1)
-
-
-# Generate data for each timestamp
-for ts in timestamps:
-    pf = generate_pf()
-    power = np.random.uniform(3, 5)  # Default to Working
-    status = np.random.choice(["Working", "Idle", "Maintenance"], p=prob_status)
-
-    if status == "Idle":
-        power = np.random.uniform(0.3, 0.6)
-    elif status == "Maintenance":
-        power = 0
-
-    consumption = power * (1 / 60)  # Convert power (KW) to KVAH for 1 minute
-    current_kvah_reading += consumption
-
-    notification = "Normal PF"
-    if pf < 0.85:
-        notification = "Low PF"
-    elif pf > 0.95:
-        notification = "High PF"
-
-        # Append data
-    pf_values.append(pf)
-    power_values.append(round(power, 2))
-    reading_values.append(round(current_kvah_reading, 2))
-    consumption_values.append(round(consumption, 2))
-    statuses.append(status)
-    notifications.append(notification)
-
-
-# Create DataFrame
-df = pd.DataFrame({
-    "Timestamp": timestamps,
-    "Power Factor": pf_values,
-    "Power (KW)": power_values,
-    "Reading (KVAH)": reading_values,
-    "Consumption (KVAH)": consumption_values,
-    "Machine Status": statuses,
-    "Notification": notifications
-})
-
-
-# Add ID column as row numbers (starting from 1)
-df['ID'] = range(1, len(df) + 1)
-
-# Add Index column with constant value "Sand_Energy"
-df['Station'] = "Laddle_Energy"
-
-# Split Timestamp into separate Date and Time columns
-df['Date'] = df['Timestamp'].dt.date
-df['Time'] = df['Timestamp'].dt.time
-
-# Drop the original Timestamp column (if not required)
-df.drop(columns=['Timestamp'], inplace=True)
-
-# Reorder columns for better readability
-df = df[['ID', 'Station', 'Date', 'Time', 'Power Factor', 'Power (KW)', 'Reading (KVAH)', 'Consumption (KVAH)', 'Machine Status', 'Notification']]
-
-
-# SQL Server connection details
-server = 'database-2.c5084sk6oq16.ap-south-1.rds.amazonaws.com,1433'
-database = 'EnergyDB'
-username = 'admin'  # Replace with your actual username
-password = 'C4i4anuj'  # Replace with your actual password
-
-# Create the connection
-conn = pyodbc.connect(
-    f"DRIVER={{ODBC Driver 17 for SQL Server}};SERVER={server};DATABASE={database};UID={username};PWD={password};"
-)
-cursor = conn.cursor()
 
-# Check if the table has data
-print("Checking if Laddle_Energy table has existing data...")
-cursor.execute("SELECT COUNT(*) FROM Laddle_Energy")
-row_count = cursor.fetchone()[0]
+# Station configuration: this script's profile in the registry (stations.toml), the station shared with
+# app.py and the simulation plus the Station label, PF mix and notification thresholds of this script
+station_config = registry.scripts['Laddle']
+
+
+# Generate data for every working minute of the shared shift calendar in one batch (Reading (KVAH) is the
+# minute's consumption, as on every other write path)
+timestamps = build_timestamps(start_date, end_date, default_calendar)
+df = generate_energy_batch(station_config, timestamps, calendar=default_calendar)
 
-if row_count > 0:
-    print(f"Found {row_count} existing rows in Laddle_Energy table")
-    print("Deleting all existing rows from Laddle_Energy table...")
-    cursor.execute("DELETE FROM Laddle_Energy")
-    conn.commit()
-    print("Table cleared successfully")
-else:
-    print("Laddle_Energy table is empty, proceeding with data insertion")
+
+# SQL Server connection (MSSQL_SERVER / MSSQL_DATABASE / MSSQL_USERNAME / MSSQL_PASSWORD, see storage.py)
+conn = connect_mssql()
+cursor = conn.cursor()
+
+# Incremental: rows already in the table are kept and only the missing minutes are inserted
+storage = SqlStorage(conn, bcp_login=MSSQL_LOGIN)
 
 # Get today's date
-today = datetime.today().date()
+today = pd.Timestamp(get_clock().today())
 
 
 # Split DataFrame into bulk data (up to yesterday) and row-wise data (from today)
-bulk_data = df[df['Date'] < today]
-rowwise_data = df[df['Date'] == today]
+bulk_data = df[df['Timestamp'] < today]
+rowwise_data = df[(df['Timestamp'] >= today) & (df['Timestamp'] < today + pd.Timedelta(days=1))]
 
 
-# Sort bulk_data by ID, Date, and Time in ascending order
-bulk_data = bulk_data.sort_values(by=['ID', 'Date', 'Time'], ascending=[True, True, True])
+# Sort bulk_data by ID and Timestamp in ascending order
+bulk_data = bulk_data.sort_values(by=['ID', 'Timestamp'], ascending=[True, True])
 
 # Insert the bulk data (up to yesterday) into the database
 insert_query = """
@@ -160,35 +59,36 @@ insert_query = """
     VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
 """
 
-# Bulk insert - use executemany for bulk insertion
-bulk_values = bulk_data[['ID', 'Station', 'Date', 'Time', 'Power Factor', 
-                         'Power (KW)', 'Reading (KVAH)', 'Consumption (KVAH)', 
-                         'Machine Status', 'Notification']].values.tolist()
-cursor.executemany(insert_query, bulk_values)
-conn.commit()  # Commit the bulk insert
-
-# Sort rowwise_data by ID, Date, and Time in ascending order
-rowwise_data = rowwise_data.sort_values(by=['ID', 'Date', 'Time'], ascending=[True, True, True])
-
-# Insert row-by-row data from today with a minute delay
-for _, row in rowwise_data.iterrows():
-    row_values = (
-        row['ID'],
-        row['Station'],
-        row['Date'],
-        row['Time'],
-        row['Power Factor'],
-        row['Power (KW)'],
-        row['Reading (KVAH)'],
-        row['Consumption (KVAH)'],
-        row['Machine Status'],
-        row['Notification']
-    )
-    cursor.execute(insert_query, row_values)
-    conn.commit()  # Commit after each row
-
-    # Add a 1-minute delay between row inserts
-    time.sleep(30)
+# Bulk insert the minutes the table is missing (renumbered after its IDs) - fastest available path
+# (bcp, TVP or fast_executemany), expanded to the DB types per chunk
+print(storage.load('Laddle_Energy', missing_rows(storage, 'Laddle_Energy', bulk_data)))
+
+# Today's missing minutes, sorted by ID and Timestamp in ascending order, then expanded to the DB types
+rowwise_data = missing_rows(storage, 'Laddle_Energy', rowwise_data)
+rowwise_data = rowwise_data.sort_values(by=['ID', 'Timestamp'], ascending=[True, True])
+timestamps = rowwise_data['Timestamp']
+rowwise_data = expand_for_db(rowwise_data)
+
+# Insert today's rows on wall-clock-aligned minute ticks: each tick inserts the rows whose minute has
+# come (rows for minutes already past go in straight away), then commits
+def insert_rows(rows):
+    for _, row in rows.iterrows():
+        row_values = (
+            row['ID'],
+            row['Station'],
+            row['Date'],
+            row['Time'],
+            row['Power Factor'],
+            row['Power (KW)'],
+            row['Reading (KVAH)'],
+            row['Consumption (KVAH)'],
+            row['Machine Status'],
+            row['Notification']
+        )
+        cursor.execute(insert_query, row_values)
+    conn.commit()
+
+replay(rowwise_data, timestamps, insert_rows)
 
 # Close the connection
 cursor.close()
@@ -1,164 +1,48 @@
 import pandas as pd
-import numpy as np
-from datetime import datetime, timedelta
-import pyodbc
-import pandas as pd
 from datetime import datetime
-import time
+from storage import MSSQL_LOGIN, SqlStorage, connect_mssql
+from gap_fill import missing_rows
+from tick_scheduler import replay
+from sim_clock import get_clock
+from shift_calendar import default_calendar
+from energy_generator import build_timestamps, generate_melting_prod_batch, expand_for_db
+from station_config import registry
 
 # Parameters
 start_date = datetime(2025, 4, 20)
 end_date = datetime(2025, 5, 20)
-working_hours = range(9, 18)  # 9 AM to 6 PM
-
-days_of_week = [0, 1, 2, 3, 4, 5]  # Monday to Saturday
 planned_metal_per_hour = 300  # kg
-metal_composition = {'Fe%': 75, 'C%': 10, 'Cr%': 5, 'Ni%': 5}
-
-
-# Data generation
-timestamps = []
-heat_numbers = []
-temperatures = []
-cumulative_planned = []
-cumulative_actual = []
-composition_data = {'Fe%': [], 'C%': [], 'Cr%': [], 'Ni%': []}
-
-current_planned_total = 0
-current_actual_total = 0
-current_day = None
-
-
-# Generate data
-current_date = start_date
-heat_counter = 1
-
-while current_date <= end_date:
-    if current_date.weekday() in days_of_week:
-        current_day = current_date.date()
-        current_planned_total = 0
-        current_actual_total = 0
-        heat_counter = 1  # Reset heat counter daily
-        
-        for hour in working_hours:
-            heat_no = f"HT_{current_date.strftime('%Y%m%d')}_{heat_counter:03d}"
-            heat_counter += 1
-            
-            for minute in range(60):  # 1-minute intervals
-                timestamp = current_date.replace(hour=hour, minute=minute, second=0)
-                timestamps.append(timestamp)
-                heat_numbers.append(heat_no)
-                
-                # Simulated furnace temperature (1000-1400°C)
-                temperature = np.random.uniform(1000, 1400)
-                temperatures.append(round(temperature, 2))
-                
-                # Add metal composition based on 15-min intervals
-                if 0 <= minute < 15:
-                    composition_data['Fe%'].append(75)
-                    composition_data['C%'].append(0)
-                    composition_data['Cr%'].append(0)
-                    composition_data['Ni%'].append(0)
-                elif 15 <= minute < 30:
-                    composition_data['Fe%'].append(0)
-                    composition_data['C%'].append(10)
-                    composition_data['Cr%'].append(0)
-                    composition_data['Ni%'].append(0)
-                elif 30 <= minute < 45:
-                    composition_data['Fe%'].append(0)
-                    composition_data['C%'].append(0)
-                    composition_data['Cr%'].append(5)
-                    composition_data['Ni%'].append(0)
-                else:
-                    composition_data['Fe%'].append(0)
-                    composition_data['C%'].append(0)
-                    composition_data['Cr%'].append(0)
-                    composition_data['Ni%'].append(5)
-                
-                # Cumulative Planned and Actual Molten Metal
-                planned = planned_metal_per_hour if minute == 0 else 0
-                actual = planned + np.random.uniform(-5, 5) if minute == 0 else 0
-                
-                current_planned_total += planned
-                current_actual_total += actual
-                
-                cumulative_planned.append(round(current_planned_total, 2))
-                cumulative_actual.append(round(current_actual_total, 2))
-        
-    current_date += timedelta(days=1)
-
-
-# Create DataFrame
-df = pd.DataFrame({
-    'ID': range(1, len(timestamps) + 1),
-    'Timestamp': timestamps,
-    'HeatNo': heat_numbers,
-    'Furnace Temperature': temperatures,
-    'Fe%': composition_data['Fe%'],
-    'C%': composition_data['C%'],
-    'Cr%': composition_data['Cr%'],
-    'Ni%': composition_data['Ni%'],
-    'Cumulative Planned Metal (kg)': cumulative_planned,
-    'Cumulative Actual Metal (kg)': cumulative_actual
-})
-
-
-
-# Add Station column
-df['Station'] = 'Melting_Production'
-
-# Split Timestamp into separate Date and Time columns
-df['Date'] = df['Timestamp'].dt.date
-df['Time'] = df['Timestamp'].dt.time
-
-# Drop the original Timestamp column (if not required)
-df.drop(columns=['Timestamp'], inplace=True)
-
-# Reorder columns for better readability
-df = df[['ID', 'Station', 'Date', 'Time', 'HeatNo', 'Furnace Temperature', 'Fe%', 'C%', 'Cr%', 'Ni%',
-         'Cumulative Planned Metal (kg)', 'Cumulative Actual Metal (kg)']]
-
-
-
-# SQL Server connection details
-server = 'database-2.c5084sk6oq16.ap-south-1.rds.amazonaws.com,1433'
-database = 'EnergyDB'
-username = 'admin'  # Replace with your actual username
-password = 'C4i4anuj'  # Replace with your actual password
-
-# Create the connection
-conn = pyodbc.connect(
-    f"DRIVER={{ODBC Driver 17 for SQL Server}};SERVER={server};DATABASE={database};UID={username};PWD={password};"
-)
-cursor = conn.cursor()
 
-# Check if the table has data
-print("Checking if Melting_Prod table has existing data...")
-cursor.execute("SELECT COUNT(*) FROM Melting_Prod")
-row_count = cursor.fetchone()[0]
 
-if row_count > 0:
-    print(f"Found {row_count} existing rows in Melting_Prod table")
-    print("Deleting all existing rows from Melting_Prod table...")
-    cursor.execute("DELETE FROM Melting_Prod")
-    conn.commit()
-    print("Table cleared successfully")
-else:
-    print("Melting_Prod table is empty, proceeding with data insertion")
+# Melting production configuration: shared profile (metal accumulated over each day, as everywhere)
+prod_config = dict(registry.melting_prod, planned_metal_per_hour=planned_metal_per_hour)
+
+
+# Generate data for every working minute of the shared shift calendar in one batch
+timestamps = build_timestamps(start_date, end_date, default_calendar)
+df = generate_melting_prod_batch(prod_config, timestamps, calendar=default_calendar)
+
+
+# SQL Server connection (MSSQL_SERVER / MSSQL_DATABASE / MSSQL_USERNAME / MSSQL_PASSWORD, see storage.py)
+conn = connect_mssql()
+cursor = conn.cursor()
+
+# Incremental: rows already in the table are kept and only the missing minutes are inserted
+storage = SqlStorage(conn, bcp_login=MSSQL_LOGIN)
 
 
 # Get today's date
-today = datetime.today().date()
+today = pd.Timestamp(get_clock().today())
 
 
 # Split DataFrame into bulk data (up to yesterday) and row-wise data (from today)
-bulk_data = df[df['Date'] < today]
-rowwise_data = df[df['Date'] == today]
+bulk_data = df[df['Timestamp'] < today]
+rowwise_data = df[(df['Timestamp'] >= today) & (df['Timestamp'] < today + pd.Timedelta(days=1))]
 
 
 
-# Sort bulk_data by ID, Date, and Time in ascending order
-bulk_data = bulk_data.sort_values(by=['ID', 'Date', 'Time'], ascending=[True, True, True])
+# Sort bulk_data by ID and Timestamp in ascending order
+bulk_data = bulk_data.sort_values(by=['ID', 'Timestamp'], ascending=[True, True])
 
 # Insert the bulk data (up to yesterday) into the database
 insert_query = """
@@ -179,37 +63,38 @@ insert_query = """
     VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
 """
 
-# Bulk insert - use executemany for bulk insertion
-bulk_values = bulk_data[['ID', 'Station', 'Date', 'Time', 'HeatNo', 
-                         'Furnace Temperature', 'Fe%', 'C%', 
-                         'Cr%', 'Ni%','Cumulative Planned Metal (kg)','Cumulative Actual Metal (kg)']].values.tolist()
-cursor.executemany(insert_query, bulk_values)
-conn.commit()  # Commit the bulk insert
-
-# Sort rowwise_data by ID, Date, and Time in ascending order
-rowwise_data = rowwise_data.sort_values(by=['ID', 'Date', 'Time'], ascending=[True, True, True])
-
-# Insert row-by-row data from today with a minute delay
-for _, row in rowwise_data.iterrows():
-    row_values = (
-        row['ID'],
-        row['Station'],
-        row['Date'],
-        row['Time'],
-        row['HeatNo'],
-        row['Furnace Temperature'],
-        row['Fe%'],
-        row['C%'],
-        row['Cr%'],
-        row['Ni%'],
-        row['Cumulative Planned Metal (kg)'],
-        row['Cumulative Actual Metal (kg)']
-    )
-    cursor.execute(insert_query, row_values)
-    conn.commit()  # Commit after each row
-
-    # Add a 1-minute delay between row inserts
-    time.sleep(30)
+# Bulk insert the minutes the table is missing (renumbered after its IDs) - fastest available path
+# (bcp, TVP or fast_executemany), expanded to the DB types per chunk
+print(storage.load('Melting_Prod', missing_rows(storage, 'Melting_Prod', bulk_data)))
+
+# Today's missing minutes, sorted by ID and Timestamp in ascending order, then expanded to the DB types
+rowwise_data = missing_rows(storage, 'Melting_Prod', rowwise_data)
+rowwise_data = rowwise_data.sort_values(by=['ID', 'Timestamp'], ascending=[True, True])
+timestamps = rowwise_data['Timestamp']
+rowwise_data = expand_for_db(rowwise_data)
+
+# Insert today's rows on wall-clock-aligned minute ticks: each tick inserts the rows whose minute has
+# come (rows for minutes already past go in straight away), then commits
+def insert_rows(rows):
+    for _, row in rows.iterrows():
+        row_values = (
+            row['ID'],
+            row['Station'],
+            row['Date'],
+            row['Time'],
+            row['HeatNo'],
+            row['Furnace Temperature'],
+            row['Fe%'],
+            row['C%'],
+            row['Cr%'],
+            row['Ni%'],
+            row['Cumulative Planned Metal (kg)'],
+            row['Cumulative Actual Metal (kg)']
+        )
+        cursor.execute(insert_query, row_values)
+    conn.commit()
+
+replay(rowwise_data, timestamps, insert_rows)
 
 # Close the connection
 cursor.close()
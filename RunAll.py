@@ -1,22 +1,16 @@
-import subprocess
+import logging
+from datetime import timedelta
+from sim_clock import get_clock
+from simulation import run_simulation, start_date, end_date
 
-# List of Python scripts to run
-scripts = [
-    "./CoreMaking.py",
-    "./SandProcessing.py",
-    "./Moulding.py",
-    "./Melting.py",
-    "./Melt_prod.py",
-    "./Laddle.py",
-    "./PostProcessing.py",
-    "./Auxiliary.py"
-]
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
 
-# Run all scripts in parallel
-processes = [subprocess.Popen(["python", script]) for script in scripts]
-
-# Wait for all processes to complete
-for p in processes:
-    p.wait()
+# Generate every station (and Melting_Prod) in one process over one connection.
+# Live rows for today are produced by the real-time loops in app.py.
+yesterday = get_clock().today() - timedelta(days=1)
+run_simulation(start_date, min(end_date.date(), yesterday))
 
 print("All Scripts Executed Successfully!")
@@ -0,0 +1,298 @@
+# Compact archive of closed days. A table's days are blocks in one file per month:
+#   <root>/<table>/<YYYY-MM>.arc  = day blocks, JSON footer, footer length (8 bytes), MAGIC
+# Each block stores a day column by column, every column zlib-compressed after encoding:
+#   numeric columns (ID, Time as seconds since midnight, measurements) - integers scaled by 10^decimals
+#       (the fewest decimals that hold every value of the day exactly: PF and power become centi-units),
+#       delta-encoded when they never decrease (IDs, timestamps, the cumulative Reading); values that need
+#       more than MAX_DECIMALS decimals stay float64
+#   string columns (Station, HeatNo, Machine Status, Notification) - a dictionary plus small integer codes
+# The footer keeps, per block, the day, row count, byte range, column encodings and min/max/sum of every
+# numeric column (value counts of every string column), so daily and monthly aggregates are answered
+# from the footer alone without decoding a row.
+# app.py archives the closed days after the startup history and then daily; to run it on its own (cron):
+#   python archive.py 2025-04-20 [last day]
+import argparse
+import json
+import logging
+import os
+import struct
+import zlib
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+from sim_clock import get_clock
+from storage import open_storage, table_layouts
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_DIR = os.environ.get('ARCHIVE_DIR', 'energy_archive')
+# Days are archived once they are this many days old (1: every closed day up to yesterday)
+ARCHIVE_AFTER_DAYS = int(os.environ.get('ARCHIVE_AFTER_DAYS', 1))
+MAX_DECIMALS = 6
+MAGIC = b'EARC1'
+_TRAILER = struct.Struct('<Q')
+
+
+def archive_path(table, day, root=ARCHIVE_DIR):
+    day = pd.Timestamp(day)
+    return os.path.join(root, table, f"{day.year:04d}-{day.month:02d}.arc")
+
+
+def _int_dtype(low, high):
+    for dtype in (np.int8, np.int16, np.int32):
+        info = np.iinfo(dtype)
+        if info.min <= low and high <= info.max:
+            return dtype
+    return np.int64
+
+
+def _encode_numeric(values):
+    values = np.asarray(values, dtype='float64')
+    for decimals in range(MAX_DECIMALS + 1):
+        scaled = values * 10 ** decimals
+        ints = np.round(scaled)
+        if np.all(np.abs(scaled - ints) < 1e-6):
+            break
+    else:
+        return values.astype('<f8').tobytes(), {'kind': 'float'}
+    ints = ints.astype(np.int64)
+    delta = len(ints) > 1 and bool(np.all(np.diff(ints) >= 0))
+    if delta:
+        ints = np.diff(ints, prepend=0)
+    dtype = np.dtype(_int_dtype(ints.min(), ints.max())).newbyteorder('<')
+    return ints.astype(dtype).tobytes(), {'kind': 'scaled', 'decimals': decimals, 'delta': delta, 'dtype': dtype.str}
+
+
+def _decode_numeric(data, encoding):
+    if encoding['kind'] == 'float':
+        return np.frombuffer(data, dtype='<f8')
+    ints = np.frombuffer(data, dtype=encoding['dtype']).astype(np.int64)
+    if encoding['delta']:
+        ints = np.cumsum(ints)
+    if encoding['decimals'] == 0:
+        return ints
+    return np.round(ints / 10 ** encoding['decimals'], encoding['decimals'])
+
+
+def _encode_strings(values):
+    codes, dictionary = pd.factorize(pd.Series(values, dtype=object))
+    dtype = np.dtype(_int_dtype(-1, len(dictionary))).newbyteorder('<')
+    return codes.astype(dtype).tobytes(), {'kind': 'dictionary', 'dtype': dtype.str,
+                                           'dictionary': [str(value) for value in dictionary]}
+
+
+def _decode_strings(data, encoding):
+    codes = np.frombuffer(data, dtype=encoding['dtype'])
+    dictionary = np.array(encoding['dictionary'] + [None], dtype=object)
+    return dictionary[codes]
+
+
+def _seconds(times):
+    return pd.to_timedelta(pd.Series(times).astype(str)).dt.total_seconds().to_numpy()
+
+
+# One day of rows (DB layout) -> (block bytes, block footer entry without offset)
+def encode_block(day, frame):
+    chunks, columns, offset = [], [], 0
+    for column in frame.columns:
+        if column == 'Date':
+            columns.append({'name': column, 'kind': 'day'})
+            continue
+        values = frame[column]
+        if column == 'Time':
+            data, encoding = _encode_numeric(_seconds(values))
+            encoding['time'] = True
+            stats = None
+        elif pd.api.types.is_numeric_dtype(values):
+            data, encoding = _encode_numeric(values)
+            encoding['integer'] = pd.api.types.is_integer_dtype(values)
+            stats = {'min': float(values.min()), 'max': float(values.max()), 'sum': float(values.sum())}
+        else:
+            data, encoding = _encode_strings(values)
+            stats = {'counts': {str(key): int(count) for key, count in values.value_counts().items()}}
+        data = zlib.compress(data, 6)
+        chunks.append(data)
+        columns.append({'name': column, **encoding, 'start': offset, 'length': len(data), 'stats': stats})
+        offset += len(data)
+    block = {'day': pd.Timestamp(day).date().isoformat(), 'rows': len(frame), 'length': offset, 'columns': columns}
+    return b''.join(chunks), block
+
+
+def decode_block(data, block):
+    day = date.fromisoformat(block['day'])
+    columns = {}
+    for column in block['columns']:
+        if column['kind'] == 'day':
+            columns[column['name']] = [day] * block['rows']
+            continue
+        raw = zlib.decompress(data[column['start']:column['start'] + column['length']])
+        if column['kind'] == 'dictionary':
+            columns[column['name']] = _decode_strings(raw, column)
+        elif column.get('time'):
+            columns[column['name']] = [(pd.Timestamp(0) + timedelta(seconds=float(seconds))).time()
+                                       for seconds in _decode_numeric(raw, column)]
+        else:
+            values = _decode_numeric(raw, column)
+            columns[column['name']] = values.astype(np.int64) if column.get('integer') else values.astype('float64')
+    return pd.DataFrame(columns)
+
+
+# Footer of an archive file: {'blocks': [...]} (empty if the file does not exist)
+def read_footer(path):
+    if not os.path.exists(path):
+        return {'blocks': []}
+    with open(path, 'rb') as f:
+        f.seek(-(len(MAGIC) + _TRAILER.size), os.SEEK_END)
+        length = _TRAILER.unpack(f.read(_TRAILER.size))[0]
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not an archive file")
+        f.seek(-(len(MAGIC) + _TRAILER.size + length), os.SEEK_END)
+        return json.loads(f.read(length))
+
+
+# Add day blocks to their month file: they overwrite the old footer, then the new footer follows. A block
+# for a day already in the file replaces that day's block (the blocks after it move up).
+# Written to a temporary file and renamed, so a crash leaves the previous file intact.
+def append_blocks(path, blocks):
+    footer = read_footer(path)
+    replaced = {block['day'] for _, block in blocks}
+    kept = [block for block in footer['blocks'] if block['day'] not in replaced]
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path + '.tmp', 'wb') as out:
+        end = 0
+        if kept and len(kept) == len(footer['blocks']):
+            # Nothing replaced: the existing blocks are copied as they are
+            end = sum(block['length'] for block in kept)
+            with open(path, 'rb') as f:
+                out.write(f.read(end))
+        elif kept:
+            with open(path, 'rb') as f:
+                for block in kept:
+                    f.seek(block['offset'])
+                    out.write(f.read(block['length']))
+                    block['offset'] = end
+                    end += block['length']
+        for data, block in blocks:
+            block['offset'] = end
+            kept.append(block)
+            out.write(data)
+            end += len(data)
+        footer['blocks'] = sorted(kept, key=lambda block: block['day'])
+        encoded = json.dumps(footer, separators=(',', ':')).encode()
+        out.write(encoded)
+        out.write(_TRAILER.pack(len(encoded)))
+        out.write(MAGIC)
+    os.replace(path + '.tmp', path)
+
+
+def archived_days(table, first_day, last_day, root=ARCHIVE_DIR):
+    first, last = pd.Timestamp(first_day).date(), pd.Timestamp(last_day).date()
+    blocks = []
+    for month in pd.period_range(first, last, freq='M'):
+        path = archive_path(table, month.start_time, root)
+        for block in read_footer(path)['blocks']:
+            if first <= date.fromisoformat(block['day']) <= last:
+                blocks.append((path, block))
+    return blocks
+
+
+# Days of table between first and last whose rows in storage differ in number from their archived block
+# (or that have no block yet), as ISO dates
+def _stale_days(storage, table, first, last, root):
+    counts = storage.read_sql(f"SELECT Date, COUNT(*) AS Readings FROM {table} WHERE Date BETWEEN ? AND ? "
+                              f"GROUP BY Date", (first.isoformat(), last.isoformat()))
+    stored = dict(zip(pd.to_datetime(counts['Date'].astype(str)).dt.date.map(date.isoformat), counts['Readings']))
+    archived = {block['day']: block['rows'] for _, block in archived_days(table, first, last, root)}
+    return sorted(day for day, rows in stored.items() if archived.get(day) != rows)
+
+
+# Archive the days first_day..last_day of table that are not archived yet or whose row count in storage
+# changed since (a gap fill added minutes), one query and one file rewrite per month; returns the rows
+# archived
+def _archive_range(storage, table, first_day, last_day, root):
+    columns = list(table_layouts()[table])
+    archived = 0
+    for month in pd.period_range(pd.Timestamp(first_day), pd.Timestamp(last_day), freq='M'):
+        first = max(pd.Timestamp(first_day), month.start_time).date()
+        last = min(pd.Timestamp(last_day), month.end_time).date()
+        stale = _stale_days(storage, table, first, last, root)
+        if not stale:
+            continue
+        rows = storage.read_sql(f"SELECT * FROM {table} WHERE Date BETWEEN ? AND ? ORDER BY ID",
+                                (stale[0], stale[-1]))
+        days = pd.to_datetime(rows['Date'].astype(str)).dt.date
+        blocks = [encode_block(day, frame[columns]) for day, frame in rows.groupby(days, sort=True)
+                  if day.isoformat() in stale]
+        if not blocks:
+            continue
+        append_blocks(archive_path(table, first, root), blocks)
+        rows_archived = sum(block['rows'] for _, block in blocks)
+        size = sum(len(data) for data, _ in blocks)
+        archived += rows_archived
+        logger.debug(f"Archived {table} {month}: {rows_archived} rows in {size} bytes ({size / rows_archived:.1f} bytes/row)")
+    return archived
+
+
+# Archive one closed day of table from storage; returns the rows archived (0 if archived as stored or empty)
+def archive_day(storage, table, day, root=ARCHIVE_DIR):
+    return _archive_range(storage, table, day, day, root)
+
+
+# Archive every day from first_day to last_day (default ARCHIVE_AFTER_DAYS before today on the process
+# clock) of tables (default every registry table) that is not archived as stored; returns {table: rows archived}
+def archive_closed_days(storage, first_day, last_day=None, tables=None, root=ARCHIVE_DIR):
+    last_day = last_day or get_clock().today() - timedelta(days=ARCHIVE_AFTER_DAYS)
+    tables = list(table_layouts()) if tables is None else tables
+    archived = {table: _archive_range(storage, table, first_day, last_day, root) for table in tables}
+    logger.info(f"Archived {sum(archived.values())} rows of {len(tables)} tables up to {last_day}")
+    return archived
+
+
+# Rows of the archived days first_day..last_day of table in the DB layout (decodes the blocks)
+def read_archive(table, first_day, last_day, root=ARCHIVE_DIR):
+    frames = []
+    for path, block in archived_days(table, first_day, last_day, root):
+        with open(path, 'rb') as f:
+            f.seek(block['offset'])
+            frames.append(decode_block(f.read(block['length']), block))
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=table_layouts()[table])
+
+
+# Per day min/max/sum of the numeric columns of table, from the footers only
+def daily_aggregates(table, first_day, last_day, columns=None, root=ARCHIVE_DIR):
+    records = []
+    for _, block in archived_days(table, first_day, last_day, root):
+        record = {'Date': date.fromisoformat(block['day']), 'Rows': block['rows']}
+        for column in block['columns']:
+            stats = column.get('stats') or {}
+            if 'sum' in stats and (columns is None or column['name'] in columns):
+                record.update({f"{column['name']} {name}": stats[name] for name in ('min', 'max', 'sum')})
+        records.append(record)
+    return pd.DataFrame(records)
+
+
+# Per month min/max/sum of the numeric columns of table, combined from the daily footers
+def monthly_aggregates(table, first_day, last_day, columns=None, root=ARCHIVE_DIR):
+    daily = daily_aggregates(table, first_day, last_day, columns, root)
+    if daily.empty:
+        return daily
+    month = pd.to_datetime(daily.pop('Date')).dt.to_period('M').astype(str).rename('Month')
+    how = {column: column.rsplit(' ', 1)[1] if ' ' in column else 'sum' for column in daily.columns}
+    return daily.groupby(month).agg(how).reset_index()
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description='Archive the closed days of every station table and Melting_Prod')
+    parser.add_argument('first_day', type=date.fromisoformat)
+    parser.add_argument('last_day', type=date.fromisoformat, nargs='?',
+                        help=f"default: {ARCHIVE_AFTER_DAYS} day(s) before today (ARCHIVE_AFTER_DAYS)")
+    parser.add_argument('--root', default=ARCHIVE_DIR)
+    args = parser.parse_args()
+    storage = open_storage()
+    try:
+        archive_closed_days(storage, args.first_day, args.last_day, root=args.root)
+    finally:
+        storage.close()
@@ -0,0 +1,233 @@
+# Asyncio ingestion service for the real-time station streams. Every feeder (a station of the registry,
+# or Melting_Prod) is a lightweight task that wakes on each tick boundary of the process clock, builds its
+# sample and puts it on one bounded asyncio.Queue; a full queue suspends the feeders (backpressure)
+# instead of growing memory. One drainer takes the queue in batches and numbers them in queue order, and
+# up to `writers` batches are written at a time on a dedicated thread pool, so thousands of feeders share
+# one event loop and a few DB sessions.
+# Given a spooled write-behind queue (writer=, see write_behind.py / spool.py) the drainer appends each
+# batch to it instead, so rows survive outages and restarts; its single writer then does the DB writes.
+# DB-API drivers (pyodbc, sqlite3, duckdb) have no async interface, hence the executor.
+import asyncio
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from id_allocator import IdAllocator
+from realtime_samples import build_energy_insert, build_melting_prod_insert
+from shift_calendar import default_calendar
+from sim_clock import get_clock
+from station_config import registry
+from storage import open_storage
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_QUEUE_SIZE = int(os.environ.get('INGEST_QUEUE_SIZE', 10000))
+DEFAULT_INGEST_BATCH = int(os.environ.get('INGEST_BATCH', 5000))
+DEFAULT_INGEST_WRITERS = int(os.environ.get('INGEST_WRITERS', 2))
+DEFAULT_FLUSH_INTERVAL = float(os.environ.get('INGEST_FLUSH_INTERVAL', 1))
+
+
+# {feeder key: (table, sample(config, tick), config)} for every station in the registry and Melting_Prod
+def registry_feeders():
+    feeders = {key: (config['name'], build_energy_insert, config) for key, config in registry.stations.items()}
+    melting_prod = registry.melting_prod
+    if melting_prod:
+        feeders['melting_prod'] = (melting_prod['name'], build_melting_prod_insert, melting_prod)
+    return feeders
+
+
+class AsyncIngestService:
+    # feeders: callable returning {key: (table, sample, config)}; re-read every period so registry edits apply
+    # writer: optional WriteBehindQueue that takes the batches instead of the service's own writers
+    def __init__(self, storage_factory=open_storage, feeders=registry_feeders, period=60,
+                 queue_size=DEFAULT_QUEUE_SIZE, batch_size=DEFAULT_INGEST_BATCH, writers=DEFAULT_INGEST_WRITERS,
+                 flush_interval=DEFAULT_FLUSH_INTERVAL, calendar=default_calendar, clock=None, ids=None,
+                 writer=None):
+        self.storage_factory = storage_factory
+        self.feeders = feeders
+        self.period = period
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.writers = writers
+        self.flush_interval = flush_interval
+        self.calendar = calendar
+        self.clock = clock or get_clock()
+        self.ids = ids or IdAllocator(storage_factory)
+        self.writer = writer
+        self._loop = None
+        self._queue = None
+        self._stopping = None
+        self._tasks = {}
+        self._current = {}
+        self._thread = None
+        self.stats = {'feeders': 0, 'queued': 0, 'written': 0, 'spooled': 0, 'flushes': 0, 'failures': 0, 'backpressure_waits': 0}
+
+    def depth(self):
+        return self._queue.qsize() if self._queue else 0
+
+    # Sleep until the process clock reaches moment (epoch seconds); False if the service is stopping
+    async def _sleep_until(self, moment):
+        while not self._stopping.is_set():
+            remaining = moment - self.clock.time()
+            if remaining <= 0:
+                return True
+            # A stopped virtual clock has no speed; poll until it is advanced
+            delay = min(remaining / self.clock.speed, 1.0) if self.clock.speed else 0.05
+            try:
+                await asyncio.wait_for(self._stopping.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
+        return False
+
+    async def _put(self, item):
+        if self._queue.full():
+            self.stats['backpressure_waits'] += 1
+        await self._queue.put(item)
+        self.stats['queued'] += 1
+
+    # One feeder: a sample on every working tick until the feeder leaves the registry or the service stops
+    async def _feed(self, key):
+        next_tick = (self.clock.time() // self.period + 1) * self.period
+        while await self._sleep_until(next_tick):
+            feeder = self._current.get(key)
+            if feeder is None:
+                return
+            table, sample, config = feeder
+            tick = datetime.fromtimestamp(next_tick)
+            if self.calendar.is_working_minute(tick):
+                await self._put((table, sample(config, tick)))
+            next_tick += self.period
+
+    # Refresh the feeder snapshot and start tasks for feeders added to the registry; tasks of removed
+    # feeders end on their own
+    async def _supervise(self):
+        while True:
+            self._current = self.feeders()
+            for key in self._current:
+                if key not in self._tasks or self._tasks[key].done():
+                    self._tasks[key] = asyncio.create_task(self._feed(key), name=f"feed-{key}")
+            self.stats['feeders'] = sum(not task.done() for task in self._tasks.values())
+            if not await self._sleep_until(self.clock.time() + self.period):
+                return
+
+    async def _take_batch(self):
+        batch = [await self._queue.get()]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            if self._queue.empty():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+            else:
+                batch.append(self._queue.get_nowait())
+        return batch
+
+    # Run func(*args) on the executor until it succeeds; returns (True, result), or (False, None) once it
+    # fails while stopping. The bounded queue holds the feeders back while a batch is retried.
+    async def _retry(self, executor, func, *args, rows=0):
+        while True:
+            try:
+                return True, await self._loop.run_in_executor(executor, func, *args)
+            except Exception as e:
+                self.stats['failures'] += 1
+                if self._stopping.is_set():
+                    # Give up instead of blocking shutdown (the startup gap fill restores those minutes)
+                    logger.error(f"Ingestion write failed while stopping, dropping {rows} rows: {str(e)}")
+                    return False, None
+                logger.error(f"Ingestion write failed, retrying: {str(e)}")
+                await asyncio.sleep(self.flush_interval)
+
+    # The single drainer: batches leave the queue and get their IDs one at a time, in queue order, so every
+    # table's IDs follow its minutes; up to `writers` numbered batches are then written concurrently
+    async def _drain(self, executor):
+        slots = asyncio.Semaphore(self.writers)
+        writes = set()
+        while True:
+            batch = await self._take_batch()
+            if self.writer:
+                # Durable hand-off: appended to the spool, numbered and written by the write-behind writer
+                handed_off, _ = await self._retry(executor, self.writer.put_many, batch, rows=len(batch))
+                if handed_off:
+                    self.stats['spooled'] += len(batch)
+                for _ in batch:
+                    self._queue.task_done()
+                continue
+            # Awaited before the next batch is taken; the executor only keeps a block refill off the loop
+            numbered, tables = await self._retry(executor, self._number, batch, rows=len(batch))
+            await slots.acquire()
+            write = asyncio.create_task(self._write(executor, batch, tables if numbered else None, slots))
+            writes.add(write)
+            write.add_done_callback(writes.discard)
+
+    async def _write(self, executor, batch, tables, slots):
+        try:
+            if tables is not None:
+                written, _ = await self._retry(executor, self._write_batch, tables, rows=len(batch))
+                if written:
+                    self.stats['written'] += len(batch)
+                    self.stats['flushes'] += 1
+        finally:
+            slots.release()
+            for _ in batch:
+                self._queue.task_done()
+
+    # Blocking: the batch's rows grouped by table with their IDs, as {table: [row]}
+    def _number(self, batch):
+        tables = {}
+        for table, row in batch:
+            tables.setdefault(table, []).append(row)
+        return {table: [{'ID': row_id, **row} for row_id, row in zip(self.ids.take(table, len(rows)), rows)]
+                for table, rows in tables.items()}
+
+    # Blocking: one transaction for the whole batch (runs on the executor)
+    def _write_batch(self, tables):
+        storage = self.storage_factory()
+        try:
+            for table, rows in tables.items():
+                storage.insert_many(table, rows)
+            storage.commit()
+        finally:
+            storage.close()
+
+    # Run until stop(); the queue is drained before returning
+    async def run(self):
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue(self.queue_size)
+        if self._stopping is None:
+            self._stopping = asyncio.Event()
+        # One thread more than the writers, so numbering the next batch never waits for a write
+        with ThreadPoolExecutor(max_workers=self.writers + 1, thread_name_prefix='ingest-writer') as executor:
+            drainer = asyncio.create_task(self._drain(executor))
+            await self._supervise()
+            await asyncio.gather(*self._tasks.values(), return_exceptions=True)
+            await self._queue.join()
+            drainer.cancel()
+            await asyncio.gather(drainer, return_exceptions=True)
+
+    # Run the service on its own event loop in a background thread (for the threaded Flask app)
+    def start(self):
+        if self._thread:
+            return self._thread
+        # Loop and stop event exist before the thread starts, so stop() can be called right away
+        self._loop = asyncio.new_event_loop()
+        self._stopping = asyncio.Event()
+        self._thread = threading.Thread(target=self._loop.run_until_complete, args=(self.run(),),
+                                        name='async-ingest', daemon=True)
+        self._thread.start()
+        return self._thread
+
+    def stop(self, timeout=None):
+        if self._loop and self._stopping:
+            self._loop.call_soon_threadsafe(self._stopping.set)
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+            self._loop.close()
+        self._stopping = None
@@ -0,0 +1,265 @@
+# Parallel, resumable historical backfill. The working days of the range are split into shards of
+# shard_days working days; every shard of every table has a fixed ID range and its own seeded streams
+# (the same per-day streams as stream_simulation(seed=...)), so shards can be generated on a process
+# pool in any order. Completed shards are recorded in a JSON checkpoint; after a crash the same call
+# resumes with the shards that are still missing, clearing whatever a half-written shard left behind.
+# A full reload (clear=True) writes into staging tables that survive restarts and are swapped in once
+# every shard is done; resumed on a later day with a later end_date (app.py backfills up to yesterday),
+# the run is extended instead of started over. At most 2 * workers shards are in flight at a time.
+import hashlib
+import json
+import logging
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from energy_generator import consumption_total, draw_energy
+from shift_calendar import default_calendar
+from simulation import iter_station_chunks, resolve_configs, shard_rng, table_names, write_chunks
+from storage import DEFAULT_BACKEND, open_storage
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SHARD_DAYS = int(os.environ.get('BACKFILL_SHARD_DAYS', 5))
+DEFAULT_CHECKPOINT = os.environ.get('BACKFILL_CHECKPOINT', 'backfill_checkpoint.json')
+DEFAULT_WORKERS = int(os.environ.get('BACKFILL_WORKERS', os.cpu_count() or 1))
+
+# Backends whose database file takes a single writer process: workers only generate, the parent writes
+SINGLE_WRITER_BACKENDS = ['sqlite', 'duckdb']
+
+
+class BackfillProgress:
+    def __init__(self, total_shards, done_shards=0):
+        self.total_shards = total_shards
+        self.done_shards = done_shards
+        self.resumed_shards = done_shards
+        self.rows = 0
+        self.started = time.perf_counter()
+
+    def add(self, rows):
+        self.done_shards += 1
+        self.rows += rows
+
+    @property
+    def seconds(self):
+        return time.perf_counter() - self.started
+
+    @property
+    def rows_per_sec(self):
+        return self.rows / self.seconds if self.seconds > 0 else float('inf')
+
+    # Seconds left at the pace of the shards finished in this run
+    @property
+    def eta(self):
+        finished = self.done_shards - self.resumed_shards
+        if finished == 0:
+            return None
+        return self.seconds / finished * (self.total_shards - self.done_shards)
+
+    def __repr__(self):
+        eta = 'unknown' if self.eta is None else f"{self.eta:.0f}s"
+        return f"BackfillProgress({self.done_shards}/{self.total_shards} shards, {self.rows} rows in " \
+               f"{self.seconds:.1f}s, {self.rows_per_sec:,.0f} rows/s, ETA {eta})"
+
+
+# Checkpoint file: the run it belongs to, the seed, IDs and end date it started with, and the completed
+# shards as {shard key: {'rows': rows, 'last_day': last day}}
+class Checkpoint:
+    def __init__(self, path):
+        self.path = path
+        self.state = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                self.state = json.load(f)
+
+    def matches(self, run_key):
+        return self.state.get('run') == run_key
+
+    def start(self, state):
+        self.state = {**state, 'completed': {}}
+        self.save()
+
+    def completed(self):
+        return self.state.get('completed', {})
+
+    def complete(self, shard_key, rows, last_day):
+        self.state['completed'][shard_key] = {'rows': rows, 'last_day': str(last_day)}
+        self.save()
+
+    # A shard counts as done only if it was completed up to the same last day (the last shard of an
+    # extended run grows)
+    def is_complete(self, shard_key, last_day):
+        done = self.completed().get(shard_key)
+        return done is not None and done['last_day'] == str(last_day)
+
+    def save(self):
+        with open(self.path + '.tmp', 'w') as f:
+            json.dump(self.state, f)
+        os.replace(self.path + '.tmp', self.path)
+
+    def remove(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+# Working days of the range in groups of shard_days; returns [(shard key, first day, last day, day offset)]
+def plan_shards(start_date, end_date, calendar=default_calendar, shard_days=DEFAULT_SHARD_DAYS):
+    days = calendar.working_days(start_date, end_date)
+    return [(str(days[offset]), days[offset], days[min(offset + shard_days, len(days)) - 1], offset)
+            for offset in range(0, len(days), shard_days)]
+
+
+# Cumulative reading of each energy station at the start of every shard, re-drawn from the seeded streams
+def shard_start_readings(shards, station_configs, seed, calendar=default_calendar):
+    readings = {key: {} for key, _, _, _ in shards}
+    for station_config in station_configs.values():
+        table_name = station_config['name']
+        reading = 0.0
+        for key, first_day, last_day, _ in shards:
+            readings[key][table_name] = reading
+            for day in calendar.working_days(first_day, last_day):
+                day_ordinal = pd.Period(pd.Timestamp(day), 'D').ordinal
+                day_rng = shard_rng(seed, table_name, day_ordinal)
+                _, power, _ = draw_energy(station_config, calendar.minutes_per_day, day_rng)
+                reading += consumption_total(power)
+    return readings
+
+
+def _run_key(*parts):
+    return hashlib.sha1(json.dumps(parts, default=str).encode()).hexdigest()
+
+
+# Generate one shard; writes it when storage_options are given, otherwise returns the chunks for the parent
+def _backfill_shard(task):
+    (key, first_day, last_day, start_ids, start_readings, targets, station_configs, prod_config, calendar,
+     cumulative_reading, seed, storage_options, resumed) = task
+    chunks = iter_station_chunks(first_day, last_day, station_configs, prod_config, calendar,
+                                 start_ids=start_ids, cumulative_reading=cumulative_reading, seed=seed,
+                                 start_readings=start_readings)
+    chunks = [(targets[table], df) for table, df in chunks]
+    if storage_options is None:
+        return key, chunks
+    storage = open_storage(**storage_options)
+    try:
+        return key, _write_shard(storage, task, chunks)
+    finally:
+        storage.close()
+
+
+def _write_shard(storage, task, chunks):
+    key, first_day, last_day, start_ids, _, targets, _, _, calendar, _, _, _, resumed = task
+    if resumed:
+        # A previous attempt may have committed part of this shard
+        rows = len(calendar.working_days(first_day, last_day)) * calendar.minutes_per_day
+        for table, first_id in start_ids.items():
+            storage.delete_id_range(targets[table], first_id, first_id + rows - 1)
+    return write_chunks(storage, chunks)
+
+
+# Backfill [start_date, end_date] into the configured storage with a process pool, resuming from the
+# checkpoint when it belongs to the same run. clear=True rebuilds the tables (through staging copies);
+# otherwise rows are appended after a reserved ID block. Returns the final BackfillProgress.
+def run_backfill(start_date, end_date, clear=False, seed=None, workers=DEFAULT_WORKERS,
+                 shard_days=DEFAULT_SHARD_DAYS, checkpoint_path=DEFAULT_CHECKPOINT, backend=None, path=None,
+                 station_configs=None, prod_config=None, calendar=default_calendar, cumulative_reading=False):
+    station_configs, prod_config = resolve_configs(station_configs, prod_config)
+    tables = table_names(station_configs, prod_config)
+    backend = backend or DEFAULT_BACKEND
+    storage_options = dict(backend=backend, path=path)
+    end_date = pd.Timestamp(end_date).date()
+
+    checkpoint = Checkpoint(checkpoint_path)
+    # end_date is not part of the run: the same backfill restarted with a later end date resumes
+    run_key = _run_key(start_date, clear, seed, shard_days, cumulative_reading, backend, path,
+                       station_configs, prod_config)
+    storage = open_storage(**storage_options)
+    try:
+        resumed = checkpoint.matches(run_key)
+        if resumed:
+            pinned = pd.Timestamp(checkpoint.state['end_date']).date()
+            if clear and end_date > pinned:
+                # Staging tables are numbered from 1 by day offset, so later days simply add shards
+                logger.info(f"Extending backfill from {pinned} to {end_date}")
+                checkpoint.state['end_date'] = str(end_date)
+                checkpoint.save()
+            elif end_date != pinned:
+                # Appends only hold the ID block reserved for the original range; the rest is left to
+                # the next run (or gap_fill)
+                logger.info(f"Resuming backfill up to {pinned}, as checkpointed (requested {end_date})")
+                end_date = pinned
+        shards = plan_shards(start_date, end_date, calendar, shard_days)
+        if resumed:
+            done = sum(checkpoint.is_complete(key, last_day) for key, _, last_day, _ in shards)
+            logger.info(f"Resuming backfill: {done}/{len(shards)} shards already done")
+        else:
+            seed = int(np.random.SeedSequence().entropy % 2 ** 63) if seed is None else seed
+            if clear:
+                targets = storage.create_staging(tables)
+                start_ids = {table: 1 for table in tables}
+            else:
+                targets = {table: table for table in tables}
+                total_rows = len(calendar.working_days(start_date, end_date)) * calendar.minutes_per_day
+                start_ids = {table: storage.reserve_ids(table, total_rows) for table in tables}
+            checkpoint.start(dict(run=run_key, seed=seed, targets=targets, start_ids=start_ids,
+                                  end_date=str(end_date), started=datetime.now().isoformat()))
+
+        seed = checkpoint.state['seed']
+        targets = checkpoint.state['targets']
+        start_ids = checkpoint.state['start_ids']
+        pending = [shard for shard in shards if not checkpoint.is_complete(shard[0], shard[2])]
+        readings = shard_start_readings(shards, station_configs, seed, calendar) if cumulative_reading else {}
+
+        write_in_workers = workers > 1 and backend not in SINGLE_WRITER_BACKENDS
+        tasks = [(key, first_day, last_day,
+                  {table: first_id + offset * calendar.minutes_per_day for table, first_id in start_ids.items()},
+                  readings.get(key), targets, station_configs, prod_config, calendar, cumulative_reading, seed,
+                  storage_options if write_in_workers else None, resumed)
+                 for key, first_day, last_day, offset in pending]
+        task_by_key = {task[0]: task for task in tasks}
+
+        progress = BackfillProgress(len(shards), len(shards) - len(pending))
+
+        def record(key, result):
+            task = task_by_key[key]
+            rows = result if write_in_workers else _write_shard(storage, task, result)
+            checkpoint.complete(key, rows, task[2])
+            progress.add(rows)
+            logger.info(f"Backfilled shard {key}: {progress}")
+
+        if workers == 1:
+            for task in tasks:
+                record(*_backfill_shard(task))
+        else:
+            # At most 2 * workers shards in flight, so generated chunks waiting for the parent stay bounded;
+            # a finished future is dropped once recorded
+            queue = iter(tasks)
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                in_flight = set()
+                try:
+                    for task in queue:
+                        in_flight.add(pool.submit(_backfill_shard, task))
+                        if len(in_flight) >= 2 * workers:
+                            break
+                    while in_flight:
+                        finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                        for future in finished:
+                            record(*future.result())
+                            task = next(queue, None)
+                            if task is not None:
+                                in_flight.add(pool.submit(_backfill_shard, task))
+                except Exception:
+                    for future in in_flight:
+                        future.cancel()
+                    raise
+
+        if clear:
+            storage.swap_staging(tables)
+        checkpoint.remove()
+        logger.info(f"Backfill complete: {progress}")
+        return progress
+    finally:
+        storage.close()
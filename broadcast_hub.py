@@ -0,0 +1,120 @@
+# Shared broadcast of the dashboard WebSocket updates. One poller thread computes every dashboard event
+# once per interval over one storage session and JSON-encodes each frame once; every connection thread
+# waits for the next published version and sends those same encoded frames. DB load no longer grows with
+# the number of open screens. A slow screen skips to the newest update instead of queueing old ones,
+# and the poller only queries while at least one screen is connected.
+import json
+import logging
+import os
+import threading
+import time
+
+from dashboard_queries import dashboard_events
+from sim_clock import get_clock
+from storage import open_storage
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BROADCAST_INTERVAL = float(os.environ.get('DASHBOARD_INTERVAL', 5))
+
+
+def encode_frame(event, data):
+    return json.dumps({'event': event, 'data': data})
+
+
+class BroadcastHub:
+    # compute(storage) -> [(event, payload)] in the order the dashboard expects them
+    def __init__(self, storage_factory=open_storage, compute=dashboard_events, interval=DEFAULT_BROADCAST_INTERVAL,
+                 clock=None, name='dashboard-broadcast'):
+        self.storage_factory = storage_factory
+        self.compute = compute
+        self.interval = interval
+        self.clock = clock or get_clock()
+        self.name = name
+        self._condition = threading.Condition()
+        self._frames = []
+        self._version = 0
+        self._subscribers = 0
+        self._stop = threading.Event()
+        self._thread = None
+        self.stats = {'polls': 0, 'failures': 0, 'frames_sent': 0, 'last_poll_seconds': 0.0}
+
+    def subscribers(self):
+        return self._subscribers
+
+    # Compute and publish one update; a failure is published as an error frame
+    def poll(self):
+        started = time.perf_counter()
+        try:
+            storage = self.storage_factory()
+            try:
+                events = self.compute(storage)
+            finally:
+                storage.close()
+            frames = [encode_frame(event, payload) for event, payload in events]
+        except Exception as e:
+            self.stats['failures'] += 1
+            logger.error(f"{self.name}: dashboard update failed: {str(e)}")
+            frames = [encode_frame('error', {'message': str(e)})]
+        self.stats['polls'] += 1
+        self.stats['last_poll_seconds'] = time.perf_counter() - started
+        with self._condition:
+            self._frames = frames
+            self._version += 1
+            self._condition.notify_all()
+
+    def start(self):
+        if self._thread:
+            return self._thread
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+        return self._thread
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        with self._condition:
+            self._condition.notify_all()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            with self._condition:
+                # Idle (no queries) until a screen connects
+                while not self._subscribers and not self._stop.is_set():
+                    self._condition.wait()
+            if self._stop.is_set():
+                return
+            self.poll()
+            self.clock.wait(self._stop, self.interval)
+
+    # Frames of the first version newer than version, as (version, frames); (version, None) on timeout or stop
+    def wait(self, version, timeout=None):
+        with self._condition:
+            self._condition.wait_for(lambda: self._version > version or self._stop.is_set(), timeout)
+            if self._version > version:
+                return self._version, self._frames
+            return version, None
+
+    # Serve one WebSocket connection until it closes: the greeting, then every published update
+    def serve(self, ws):
+        ws.send(encode_frame('connection_established',
+                             {'message': 'WebSocket connection established successfully'}))
+        with self._condition:
+            # Screens joining an active poller get the current update straight away; the first screen
+            # waits for the update the woken poller publishes (the last one may be stale)
+            version = self._version - 1 if self._subscribers and self._frames else self._version
+            self._subscribers += 1
+            self._condition.notify_all()
+        self.start()
+        try:
+            while not self._stop.is_set():
+                version, frames = self.wait(version)
+                for frame in frames or []:
+                    ws.send(frame)
+                    self.stats['frames_sent'] += 1
+        finally:
+            with self._condition:
+                self._subscribers -= 1
@@ -0,0 +1,246 @@
+# Bulk loader for the generated frames. Picks the fastest insert path the connection supports:
+#   SQL Server (pyodbc): bcp (when the bcp utility and a login are available), table-valued parameters
+#                        (when a matching table type exists), otherwise fast_executemany
+#   DuckDB:              insert straight from the registered DataFrame
+#   SQLite and others:   chunked multi-row INSERT ... VALUES
+# The method can be forced with method=... or the BULK_LOAD_METHOD environment variable.
+import csv
+import logging
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+from contextlib import contextmanager
+
+from energy_generator import expand_for_db
+
+logger = logging.getLogger(__name__)
+
+METHODS = ['bcp', 'tvp', 'fast_executemany', 'dataframe', 'values', 'executemany']
+
+# Bound parameter limits per statement (SQL Server: 2100 parameters and 1000 rows per VALUES list,
+# SQLite: 999 on older builds)
+MAX_PARAMETERS = {'mssql': 2099, 'sqlite': 999}
+MAX_VALUES_ROWS = 1000
+
+
+# 'mssql', 'sqlite', 'duckdb' or 'generic', from the DB-API connection's module
+def detect_dialect(conn):
+    module = type(conn).__module__
+    if module.startswith('pyodbc'):
+        return 'mssql'
+    if module.startswith('sqlite3'):
+        return 'sqlite'
+    if 'duckdb' in module:
+        return 'duckdb'
+    return 'generic'
+
+
+# Cursor that shares the connection's transaction. DuckDB's cursor() opens a separate connection with
+# its own transaction, so there statements run on the connection itself.
+@contextmanager
+def connection_cursor(conn):
+    if detect_dialect(conn) == 'duckdb':
+        yield conn
+        return
+    cursor = conn.cursor()
+    try:
+        yield cursor
+    finally:
+        cursor.close()
+
+
+def quote_identifier(name, dialect):
+    if dialect == 'duckdb':
+        return '"' + name.replace('"', '""') + '"'
+    return f"[{name}]"
+
+
+class LoadStats:
+    def __init__(self, table, method, rows, seconds):
+        self.table = table
+        self.method = method
+        self.rows = rows
+        self.seconds = seconds
+
+    @property
+    def rows_per_sec(self):
+        return self.rows / self.seconds if self.seconds > 0 else float('inf')
+
+    def __repr__(self):
+        return f"LoadStats({self.table}: {self.rows} rows via {self.method} in {self.seconds:.2f}s, " \
+               f"{self.rows_per_sec:,.0f} rows/s)"
+
+
+class BulkLoader:
+    # bcp_login: dict(server=, database=, username=, password=) for the bcp utility (no username: trusted
+    # connection)
+    # tvp_types: {table_name: 'schema.TypeName'} overrides; defaults to dbo.<table>_Type
+    def __init__(self, conn, method=None, chunk_size=50000, bcp_login=None, tvp_types=None):
+        self.conn = conn
+        self.dialect = detect_dialect(conn)
+        self.method = method or os.environ.get('BULK_LOAD_METHOD') or None
+        if self.method and self.method not in METHODS:
+            raise ValueError(f"Unknown bulk load method '{self.method}', expected one of {METHODS}")
+        self.chunk_size = chunk_size
+        self.bcp_login = bcp_login
+        self.tvp_types = tvp_types or {}
+        self.stats = []
+        self._table_methods = {}
+
+    # Fastest method available for this table; probed once per table
+    def method_for(self, table):
+        if self.method:
+            return self.method
+        if table not in self._table_methods:
+            self._table_methods[table] = self._probe_method(table)
+        return self._table_methods[table]
+
+    def _probe_method(self, table):
+        if self.dialect == 'mssql':
+            if self.bcp_login and shutil.which('bcp'):
+                return 'bcp'
+            if self._tvp_type(table):
+                return 'tvp'
+            return 'fast_executemany'
+        if self.dialect == 'duckdb':
+            return 'dataframe'
+        return 'values'
+
+    # Insert a compact frame (see energy_generator.expand_for_db) and commit; returns LoadStats
+    def load(self, table, df):
+        method = self.method_for(table)
+        started = time.perf_counter()
+        rows = 0
+        for offset in range(0, len(df), self.chunk_size):
+            chunk = expand_for_db(df.iloc[offset:offset + self.chunk_size])
+            getattr(self, f"_load_{method}")(table, chunk)
+            rows += len(chunk)
+        self.conn.commit()
+
+        stats = LoadStats(table, method, rows, time.perf_counter() - started)
+        self.stats.append(stats)
+        logger.info(f"Inserted {stats.rows} rows into {table} via {method} ({stats.rows_per_sec:,.0f} rows/s)")
+        return stats
+
+    # Overall throughput of everything loaded so far
+    def summary(self):
+        rows = sum(stats.rows for stats in self.stats)
+        seconds = sum(stats.seconds for stats in self.stats)
+        return LoadStats('all tables', self.method or 'auto', rows, seconds)
+
+    def _column_list(self, columns):
+        return ', '.join(quote_identifier(column, self.dialect) for column in columns)
+
+    def _rows(self, chunk):
+        if self.dialect in ('sqlite', 'duckdb', 'generic'):
+            # These drivers have no datetime.time adapter; store ISO strings
+            chunk = chunk.copy()
+            for column in ('Date', 'Time'):
+                if column in chunk:
+                    chunk[column] = chunk[column].astype(str)
+        return chunk.values.tolist()
+
+    def _load_executemany(self, table, chunk):
+        placeholders = ', '.join('?' * len(chunk.columns))
+        query = f"INSERT INTO {table} ({self._column_list(chunk.columns)}) VALUES ({placeholders})"
+        with connection_cursor(self.conn) as cursor:
+            cursor.executemany(query, self._rows(chunk))
+
+    # pyodbc sends the whole parameter array in one round-trip
+    def _load_fast_executemany(self, table, chunk):
+        placeholders = ', '.join('?' * len(chunk.columns))
+        query = f"INSERT INTO {table} ({self._column_list(chunk.columns)}) VALUES ({placeholders})"
+        cursor = self.conn.cursor()
+        cursor.fast_executemany = True
+        cursor.executemany(query, self._rows(chunk))
+        cursor.close()
+
+    # INSERT ... VALUES (...), (...), ... with as many rows per statement as the parameter limit allows
+    def _load_values(self, table, chunk):
+        width = len(chunk.columns)
+        max_parameters = MAX_PARAMETERS.get(self.dialect, MAX_VALUES_ROWS * width)
+        rows_per_statement = max(1, min(MAX_VALUES_ROWS, max_parameters // width))
+        row_placeholder = '(' + ', '.join('?' * width) + ')'
+        prefix = f"INSERT INTO {table} ({self._column_list(chunk.columns)}) VALUES "
+
+        rows = self._rows(chunk)
+        full_query = prefix + ', '.join([row_placeholder] * rows_per_statement)
+        with connection_cursor(self.conn) as cursor:
+            for start in range(0, len(rows), rows_per_statement):
+                batch = rows[start:start + rows_per_statement]
+                query = full_query if len(batch) == rows_per_statement else \
+                    prefix + ', '.join([row_placeholder] * len(batch))
+                cursor.execute(query, [value for row in batch for value in row])
+
+    # DuckDB scans the DataFrame directly
+    def _load_dataframe(self, table, chunk):
+        columns = self._column_list(chunk.columns)
+        self.conn.register('_bulk_load_chunk', chunk)
+        try:
+            self.conn.execute(f"INSERT INTO {table} ({columns}) SELECT {columns} FROM _bulk_load_chunk")
+        finally:
+            self.conn.unregister('_bulk_load_chunk')
+
+    def _tvp_type(self, table):
+        type_name = self.tvp_types.get(table, f"dbo.{table}_Type")
+        schema, name = type_name.split('.', 1)
+        cursor = self.conn.cursor()
+        try:
+            cursor.execute("SELECT 1 FROM sys.table_types WHERE SCHEMA_NAME(schema_id) = ? AND name = ?",
+                           (schema, name))
+            return type_name if cursor.fetchone() else None
+        except Exception as e:
+            logger.debug(f"Table type lookup failed for {table}: {str(e)}")
+            return None
+        finally:
+            cursor.close()
+
+    # Table-valued parameter: the chunk travels as one parameter whose columns follow the table type.
+    # pyodbc takes [type name, schema, row, row, ...].
+    def _load_tvp(self, table, chunk):
+        schema, name = self._tvp_type(table).split('.', 1)
+        columns = self._column_list(chunk.columns)
+        cursor = self.conn.cursor()
+        cursor.execute(f"INSERT INTO {table} ({columns}) SELECT {columns} FROM ?",
+                       ([name, schema] + [tuple(row) for row in self._rows(chunk)],))
+        cursor.close()
+
+    # bcp in from a tab-separated file, mapped to the table's columns by a generated format file
+    def _load_bcp(self, table, chunk):
+        cursor = self.conn.cursor()
+        cursor.execute("SELECT COLUMN_NAME, ORDINAL_POSITION FROM INFORMATION_SCHEMA.COLUMNS WHERE TABLE_NAME = ?",
+                       (table,))
+        ordinals = {name: position for name, position in cursor.fetchall()}
+        cursor.close()
+        # bcp uses its own session, so rows inserted on this connection must be visible first
+        self.conn.commit()
+
+        with tempfile.TemporaryDirectory() as directory:
+            data_path = os.path.join(directory, f"{table}.tsv")
+            format_path = os.path.join(directory, f"{table}.fmt")
+            with open(data_path, 'w', newline='', encoding='utf-8') as f:
+                csv.writer(f, delimiter='\t', lineterminator='\n').writerows(self._rows(chunk))
+
+            # bcp maps fields to columns by ordinal; the name field is informational and cannot hold the
+            # spaces of names like [Power (KW)], so it gets a placeholder
+            fields = []
+            for position, column in enumerate(chunk.columns, start=1):
+                terminator = '\\n' if position == len(chunk.columns) else '\\t'
+                fields.append(f'{position}\tSQLCHAR\t0\t0\t"{terminator}"\t{ordinals[column]}\tcol{position}\t""')
+            with open(format_path, 'w', encoding='utf-8') as f:
+                f.write('14.0\n' + f"{len(fields)}\n" + '\n'.join(fields) + '\n')
+
+            # The password is answered on bcp's prompt (stdin) so it never shows up in the process list;
+            # without a username bcp uses a trusted connection
+            login = self.bcp_login
+            if login.get('username'):
+                auth, prompt = ['-U', login['username']], login.get('password', '') + '\n'
+            else:
+                auth, prompt = ['-T'], None
+            subprocess.run(
+                ['bcp', table, 'in', data_path, '-f', format_path, '-S', login['server'], '-d', login['database'],
+                 *auth, '-b', str(self.chunk_size), '-h', 'TABLOCK'],
+                input=prompt, text=True, check=True, capture_output=True
+            )
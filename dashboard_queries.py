@@ -0,0 +1,127 @@
+# Dashboard KPIs shared by app.py and flask_server.py. The SQL avoids dialect-specific syntax
+# (TOP, GETDATE, DATEADD, [EnergyDB].[dbo] prefixes) so it runs on every storage backend;
+# month filters are passed as date bounds computed here.
+from datetime import date
+
+import pandas as pd
+
+from sim_clock import get_clock
+
+
+# [first day of the month, first day of the next month) as ISO dates, months_back months before today
+# (today on the process clock, see sim_clock.py)
+def month_bounds(months_back=0, today=None):
+    today = today or get_clock().today()
+    month_index = today.year * 12 + today.month - 1 - months_back
+    start = date(month_index // 12, month_index % 12 + 1, 1)
+    end = date((month_index + 1) // 12, (month_index + 1) % 12 + 1, 1)
+    return start.isoformat(), end.isoformat()
+
+
+def _scalar(df, column):
+    if not df.empty and df[column].notna().iloc[0]:
+        return float(df[column].iloc[0])
+    return 0
+
+
+LATEST_ENERGY_SQL = "SELECT Process, Power, Consumption, PowerFactor FROM Latest_AllEnergy_Readings_View"
+
+POWER_VIEW_SQL = ("SELECT Date, Time, SUM(Power) AS Total_Power_KW FROM Last9_Energy_Readings_Vw "
+                  "GROUP BY Date, Time ORDER BY Date ASC, Time ASC")
+
+# Scalar KPI expressions (SELECT <expr> AS name)
+CURRENT_POWER = "(SELECT ROUND(SUM(Power), 1) FROM Latest_Energy_Reading_View)"
+TODAY_CONSUMPTION = ("(SELECT ROUND(Total_Consumption, 1) FROM Daily_Consumption_View "
+                     "WHERE Date = (SELECT MAX(Date) FROM Daily_Consumption_View))")
+TODAY_PRODUCTION = ("(SELECT ROUND(Daily_Production, 1) FROM Daily_Production_View "
+                    "WHERE Date = (SELECT MAX(Date) FROM Daily_Production_View))")
+# Parameters: month_bounds()
+MONTH_CONSUMPTION = ("(SELECT ROUND(SUM(Total_Consumption), 1) FROM Daily_Consumption_View "
+                     "WHERE Date >= ? AND Date < ?)")
+# Parameters: month_bounds() twice
+CONSUMPTION_PER_TONNE = ("ROUND((SELECT SUM(Total_Consumption) FROM Daily_Consumption_View WHERE Date >= ? AND Date < ?) / "
+                         "(SELECT SUM(Daily_Production) / 1000 FROM Daily_Production_View WHERE Date >= ? AND Date < ?), 1)")
+
+
+def latest_energy_data(storage):
+    return storage.read_sql(LATEST_ENERGY_SQL).to_dict(orient='records')
+
+
+def current_power(storage):
+    return _scalar(storage.read_sql(f"SELECT {CURRENT_POWER} AS TotalPower"), 'TotalPower')
+
+
+def today_consumption(storage):
+    return _scalar(storage.read_sql(f"SELECT {TODAY_CONSUMPTION} AS TodayConsumption"), 'TodayConsumption')
+
+
+def today_production(storage):
+    return _scalar(storage.read_sql(f"SELECT {TODAY_PRODUCTION} AS TodayProduction"), 'TodayProduction')
+
+
+def _power_records(df):
+    df['Time'] = df['Time'].astype(str)
+    df['Date'] = df['Date'].astype(str)
+    df['Timestamp'] = pd.to_datetime(df['Date'] + ' ' + df['Time'], format='ISO8601').astype(str)
+    return df.to_dict(orient='records')
+
+
+def power_view(storage):
+    return _power_records(storage.read_sql(POWER_VIEW_SQL))
+
+
+def month_consumption(storage, months_back=0):
+    df = storage.read_sql(f"SELECT {MONTH_CONSUMPTION} AS MonthConsumption", month_bounds(months_back))
+    return _scalar(df, 'MonthConsumption')
+
+
+def month_consumption_per_tonne(storage, months_back=0):
+    df = storage.read_sql(f"SELECT {CONSUMPTION_PER_TONNE} AS ConsumptionPerTonne", month_bounds(months_back) * 2)
+    return _scalar(df, 'ConsumptionPerTonne')
+
+
+def daily_consumption(storage):
+    df = storage.read_sql("SELECT Date, Total_Consumption FROM Daily_Consumption_View ORDER BY Date ASC")
+    df['Date'] = df['Date'].astype(str)
+    return df.to_dict(orient='records')
+
+
+def daily_production(storage):
+    df = storage.read_sql("SELECT Date, Daily_Production FROM Daily_Production_View ORDER BY Date ASC")
+    df['Date'] = df['Date'].astype(str)
+    return df.to_dict(orient='records')
+
+
+# The WebSocket update: (event, payload) pairs in the order the dashboard expects them. The nine KPI
+# statements go out as one batch, so SQL Server answers them in a single round trip (one result set each).
+def dashboard_events(storage):
+    this_month, previous_month = month_bounds(), month_bounds(1)
+    (latest, total_power, consumption, production, power, this_month_consumption, previous_month_consumption,
+     this_month_per_tonne, previous_month_per_tonne) = storage.read_sql_batch([
+        (LATEST_ENERGY_SQL, ()),
+        (f"SELECT {CURRENT_POWER} AS TotalPower", ()),
+        (f"SELECT {TODAY_CONSUMPTION} AS TodayConsumption", ()),
+        (f"SELECT {TODAY_PRODUCTION} AS TodayProduction", ()),
+        (POWER_VIEW_SQL, ()),
+        (f"SELECT {MONTH_CONSUMPTION} AS MonthConsumption", this_month),
+        (f"SELECT {MONTH_CONSUMPTION} AS MonthConsumption", previous_month),
+        (f"SELECT {CONSUMPTION_PER_TONNE} AS ConsumptionPerTonne", this_month * 2),
+        (f"SELECT {CONSUMPTION_PER_TONNE} AS ConsumptionPerTonne", previous_month * 2)
+    ])
+    return [
+        ('latest_energy_data', latest.to_dict(orient='records')),
+        ('current_power', {'TotalPower': _scalar(total_power, 'TotalPower')}),
+        ('today_data', {
+            'TodayConsumption': _scalar(consumption, 'TodayConsumption'),
+            'TodayProduction': _scalar(production, 'TodayProduction')
+        }),
+        ('power_view', _power_records(power)),
+        ('monthly_data', {
+            'ThisMonthConsumption': _scalar(this_month_consumption, 'MonthConsumption'),
+            'PreviousMonthConsumption': _scalar(previous_month_consumption, 'MonthConsumption')
+        }),
+        ('consumption_per_tonne', {
+            'ThisMonthConsumptionPerTonne': _scalar(this_month_per_tonne, 'ConsumptionPerTonne'),
+            'PreviousMonthConsumptionPerTonne': _scalar(previous_month_per_tonne, 'ConsumptionPerTonne')
+        })
+    ]
@@ -0,0 +1,204 @@
+import pandas as pd
+import numpy as np
+from shift_calendar import default_calendar
+
+STATUS_LABELS = np.array(["Working", "Idle", "Maintenance"])
+NOTIFICATION_LABELS = np.array(["Normal PF", "Low PF", "High PF"])
+
+# Default PF notification thresholds (below low -> "Low PF", above high -> "High PF")
+DEFAULT_NOTIFICATION_PF = (0.80, 0.95)
+
+ENERGY_COLUMNS = ['ID', 'Station', 'Date', 'Time', 'Power Factor', 'Power (KW)', 'Reading (KVAH)',
+                  'Consumption (KVAH)', 'Machine Status', 'Notification']
+MELTING_ENERGY_COLUMNS = ['ID', 'Station', 'Date', 'Time', 'HeatNo', 'Power Factor', 'Power (KW)',
+                          'Reading (KVAH)', 'Consumption (KVAH)', 'Machine Status', 'Notification']
+# Reading (KVAH) is the minute's consumption in every table and on every write path (real-time loop,
+# gap fill, backfill, simulation, station scripts), like the meter export it stands in for. Rows of one
+# table are written by several of them, so a running counter would mix two meanings in one column;
+# cumulative_reading=True (a counter over the generated range) is only for frames kept on their own.
+MELTING_PROD_COLUMNS = ['ID', 'Station', 'Date', 'Time', 'HeatNo', 'Furnace Temperature', 'Fe%', 'C%', 'Cr%', 'Ni%',
+                        'Cumulative Planned Metal (kg)', 'Cumulative Actual Metal (kg)']
+
+# Generated frames are kept compact in memory: one datetime64 'Timestamp' column instead of Date/Time,
+# categoricals for the repeated strings, float32 measurements and int64 IDs. Only expand_for_db()
+# turns them back into the Python types the DB driver expects, at the write boundary.
+# Reading (KVAH) stays float64 because a cumulative counter outgrows float32 precision.
+FLOAT32_COLUMNS = ['Power Factor', 'Power (KW)', 'Consumption (KVAH)', 'Furnace Temperature',
+                   'Cumulative Planned Metal (kg)', 'Cumulative Actual Metal (kg)']
+
+
+def _constant_category(value, size):
+    return pd.Categorical.from_codes(np.zeros(size, dtype='int8'), [value])
+
+
+# Expand a compact frame to the DB layout: Timestamp -> Date/Time objects, categories -> str,
+# float32 -> float rounded to 2 decimals
+def expand_for_db(df):
+    columns = {}
+    for column in df.columns:
+        values = df[column]
+        if column == 'Timestamp':
+            columns['Date'] = values.dt.date
+            columns['Time'] = values.dt.time
+        elif isinstance(values.dtype, pd.CategoricalDtype):
+            columns[column] = values.astype(object)
+        elif values.dtype == np.float32:
+            columns[column] = values.astype('float64').round(2)
+        else:
+            columns[column] = values
+    return pd.DataFrame(columns)
+
+
+# Every working minute between start_date and end_date (inclusive), from the shared shift calendar
+def build_timestamps(start_date, end_date, calendar=default_calendar):
+    return calendar.working_index(start_date, end_date)
+
+
+# Heat number per timestamp: HT_<yyyymmdd>_<nnn>, counting working hours from 1 each day
+def heat_numbers(timestamps, calendar=default_calendar):
+    timestamps = pd.DatetimeIndex(timestamps)
+    hour_list = np.asarray(calendar.working_hours)
+    counters = np.searchsorted(hour_list, timestamps.hour.values) + 1
+
+    # Format each distinct (day, heat) pair once and broadcast back to the rows
+    day_codes, days = pd.factorize(timestamps.normalize())
+    keys = day_codes * (len(hour_list) + 1) + counters
+    unique_keys, inverse = np.unique(keys, return_inverse=True)
+    labels = [
+        f"HT_{days[key // (len(hour_list) + 1)].strftime('%Y%m%d')}_{key % (len(hour_list) + 1):03d}"
+        for key in unique_keys
+    ]
+    return pd.Categorical.from_codes(inverse.astype('int32'), labels)
+
+
+# Vectorized version of generate_pf(): draw PF band per row, then the value inside the band
+def generate_pf_batch(pf_ranges, size, rng=np.random):
+    low_lo, low_hi, low_p = pf_ranges['low']
+    high_lo, high_hi, high_p = pf_ranges['high']
+    normal_lo, normal_hi = pf_ranges['normal'][:2]
+
+    rand = rng.random(size)
+    lo = np.where(rand < low_p, low_lo, np.where(rand < low_p + high_p, high_lo, normal_lo))
+    hi = np.where(rand < low_p, low_hi, np.where(rand < low_p + high_p, high_hi, normal_hi))
+    return np.round(lo + (hi - lo) * rng.random(size), 2)
+
+
+# Raw per-minute draws for one station: PF, power and status codes (0 Working, 1 Idle, 2 Maintenance)
+def draw_energy(station_config, size, rng=np.random):
+    pf = generate_pf_batch(station_config['pf_ranges'], size, rng)
+    working_power = rng.uniform(*station_config['power_range'], size)
+    status_codes = rng.choice(len(STATUS_LABELS), size=size, p=station_config['prob_status'])
+    idle_power = rng.uniform(*station_config['idle_power_range'], size)
+
+    power = np.where(status_codes == 1, idle_power, working_power)
+    power[status_codes == 2] = 0.0
+    return pf, power, status_codes
+
+
+# Total (unrounded) consumption of a batch, used to carry the cumulative reading across shards
+def consumption_total(power):
+    return float(np.sum(power * (1 / 60)))
+
+
+# Build the station DataFrame from raw draws
+def build_energy_frame(station_config, timestamps, pf, power, status_codes, start_id=1, start_reading=0.0,
+                       cumulative_reading=False, calendar=default_calendar):
+    timestamps = pd.DatetimeIndex(timestamps)
+
+    consumption = power * (1 / 60)  # Convert power (KW) to KVAH for 1 minute
+    if cumulative_reading:
+        reading = start_reading + np.cumsum(consumption)
+    else:
+        reading = consumption
+
+    low_pf, high_pf = station_config.get('notification_pf', DEFAULT_NOTIFICATION_PF)
+    notification_codes = np.where(pf < low_pf, 1, np.where(pf > high_pf, 2, 0)).astype('int8')
+    size = len(timestamps)
+
+    df = pd.DataFrame({
+        'ID': np.arange(start_id, start_id + size, dtype='int64'),
+        'Station': _constant_category(station_config.get('station', station_config['name']), size),
+        'Timestamp': timestamps.values,
+        'Power Factor': pf.astype('float32'),
+        'Power (KW)': np.round(power, 2).astype('float32'),
+        'Reading (KVAH)': np.round(reading, 2),
+        'Consumption (KVAH)': np.round(consumption, 2).astype('float32'),
+        'Machine Status': pd.Categorical.from_codes(status_codes.astype('int8'), STATUS_LABELS),
+        'Notification': pd.Categorical.from_codes(notification_codes, NOTIFICATION_LABELS)
+    })
+
+    if station_config.get('heat_no'):
+        df.insert(3, 'HeatNo', heat_numbers(timestamps, calendar))
+
+    return df
+
+
+# Generate the full station DataFrame for the given timestamps with a handful of array operations.
+# station_config follows the `stations` dict layout in station_config.py; optional keys:
+#   'station'          - value written to the Station column (defaults to 'name')
+#   'notification_pf'  - (low, high) PF thresholds for the Notification column
+#   'heat_no'          - add the HeatNo column (Melting_Energy layout)
+# rng may be the global np.random module or a seeded numpy.random.Generator.
+def generate_energy_batch(station_config, timestamps, start_id=1, start_reading=0.0, rng=np.random,
+                          cumulative_reading=False, calendar=default_calendar):
+    pf, power, status_codes = draw_energy(station_config, len(timestamps), rng)
+    return build_energy_frame(station_config, timestamps, pf, power, status_codes, start_id, start_reading,
+                              cumulative_reading, calendar)
+
+
+COMPOSITION_ELEMENTS = ['Fe%', 'C%', 'Cr%', 'Ni%']
+
+
+# Phase lookup table for a heat: one row per phase, one column per element in COMPOSITION_ELEMENTS
+def composition_table(prod_config):
+    return np.array([[phase.get(element, 0) for element in COMPOSITION_ELEMENTS] for phase in prod_config['phases']],
+                    dtype='int16')
+
+
+# Index into composition_table() for the given minute(s) of the hour; the last phase runs to the end of the hour
+def phase_index(prod_config, minutes):
+    return np.minimum(np.asarray(minutes) // prod_config['phase_minutes'], len(prod_config['phases']) - 1)
+
+
+# Running total that restarts on every calendar day, without a Python loop over the rows
+def _daily_cumsum(values, timestamps):
+    totals = np.cumsum(values)
+    day_codes, _ = pd.factorize(timestamps.normalize())
+    day_starts = np.flatnonzero(np.concatenate([[True], np.diff(day_codes) != 0]))
+    offsets = totals[day_starts] - values[day_starts]
+    return totals - np.repeat(offsets, np.diff(np.append(day_starts, len(values))))
+
+
+# Melting_Prod rows for the given timestamps. Composition comes from the heat phase profile
+# (prod_config['phases'], phase_minutes long each); planned/actual metal is charged at the start of every
+# hour and, with prod_config['cumulative_metal'], accumulated per day.
+def generate_melting_prod_batch(prod_config, timestamps, start_id=1, rng=np.random, calendar=default_calendar):
+    timestamps = pd.DatetimeIndex(timestamps)
+    size = len(timestamps)
+    minutes = timestamps.minute.values
+
+    temperature = rng.uniform(*prod_config['temperature_range'], size)
+    composition = composition_table(prod_config)[phase_index(prod_config, minutes)]
+
+    # Planned and actual molten metal, charged at the start of every hour
+    hour_start = minutes == 0
+    planned = np.where(hour_start, float(prod_config['planned_metal_per_hour']), 0.0)
+    actual = planned.copy()
+    actual[hour_start] += rng.uniform(*prod_config['actual_metal_deviation'], int(hour_start.sum()))
+
+    if prod_config.get('cumulative_metal'):
+        planned = _daily_cumsum(planned, timestamps)
+        actual = _daily_cumsum(actual, timestamps)
+
+    df = pd.DataFrame({
+        'ID': np.arange(start_id, start_id + size, dtype='int64'),
+        'Station': _constant_category(prod_config['station'], size),
+        'Timestamp': timestamps.values,
+        'HeatNo': heat_numbers(timestamps, calendar),
+        'Furnace Temperature': np.round(temperature, 2).astype('float32')
+    })
+    for column, element in enumerate(COMPOSITION_ELEMENTS):
+        df[element] = composition[:, column]
+    df['Cumulative Planned Metal (kg)'] = np.round(planned, 2).astype('float32')
+    df['Cumulative Actual Metal (kg)'] = np.round(actual, 2).astype('float32')
+    return df
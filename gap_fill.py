@@ -0,0 +1,139 @@
+# Gap-aware incremental fill. Instead of clearing the tables and regenerating everything, find the working
+# minutes of a range that have no row yet (never generated, or lost while the real-time loop was down) and
+# generate and insert only those; rows already present are never touched.
+# Presence is checked with one GROUP BY Date per table; only days that are partly filled are read minute
+# by minute. Filled rows get IDs reserved from the high-water mark, after the existing ones.
+import logging
+import time
+
+import numpy as np
+import pandas as pd
+
+from energy_generator import generate_energy_batch, generate_melting_prod_batch
+from shift_calendar import default_calendar
+from simulation import resolve_configs, shard_rng, write_chunks
+from sim_clock import get_clock
+from storage import open_storage
+
+logger = logging.getLogger(__name__)
+
+
+# {day: row count} for the days in [first_day, last_day] that have rows
+def day_counts(storage, table, first_day, last_day):
+    counts = storage.read_sql(f"SELECT Date, COUNT(*) AS Readings FROM {table} "
+                              f"WHERE Date BETWEEN ? AND ? GROUP BY Date",
+                              (str(pd.Timestamp(first_day).date()), str(pd.Timestamp(last_day).date())))
+    return dict(zip(pd.to_datetime(counts['Date'].astype(str)), counts['Readings'].astype(int)))
+
+
+# Minutes (floored) that have a row on the days from first_day to last_day
+def present_minutes(storage, table, first_day, last_day):
+    rows = storage.read_sql(f"SELECT Date, Time FROM {table} WHERE Date BETWEEN ? AND ?",
+                            (str(pd.Timestamp(first_day).date()), str(pd.Timestamp(last_day).date())))
+    stamps = pd.to_datetime(rows['Date'].astype(str)) + pd.to_timedelta(rows['Time'].astype(str))
+    return pd.DatetimeIndex(stamps).floor('min')
+
+
+# Working minutes in [start, end) with no row in table
+def find_gaps(storage, table, start, end, calendar=default_calendar):
+    start, end = pd.Timestamp(start), pd.Timestamp(end)
+    if end <= start:
+        return pd.DatetimeIndex([])
+    index = calendar.working_index(start, end)
+    index = index[(index >= start) & (index < end)]
+    if len(index) == 0:
+        return index
+
+    counts = day_counts(storage, table, index[0], index[-1])
+    days = index.normalize()
+    expected = days.value_counts()
+    # A day is complete only if all of its working minutes are in range and present; days cut by the
+    # range bounds or with some rows are checked minute by minute
+    complete = [day for day, rows in expected.items()
+                if rows == calendar.minutes_per_day and counts.get(day, 0) >= rows]
+    partial = sorted(day for day in expected.index if day not in complete and counts.get(day, 0) > 0)
+
+    missing = ~days.isin(complete + partial)
+    if partial:
+        present = present_minutes(storage, table, partial[0], partial[-1])
+        missing |= days.isin(partial) & ~index.isin(present)
+    return index[missing]
+
+
+# Contiguous runs of missing minutes as [(first, last)], for logging
+def gap_ranges(missing, calendar=default_calendar):
+    if len(missing) == 0:
+        return []
+    positions = np.searchsorted(calendar.working_index(missing[0], missing[-1]), missing)
+    breaks = np.flatnonzero(np.diff(positions) != 1) + 1
+    return [(run[0], run[-1]) for run in np.split(missing, breaks)]
+
+
+# Rows of a generated frame whose minute is missing from table, renumbered after the existing IDs
+def missing_rows(storage, table, df, calendar=default_calendar):
+    if df.empty:
+        return df
+    timestamps = pd.DatetimeIndex(df['Timestamp'])
+    missing = find_gaps(storage, table, timestamps.min(), timestamps.max() + pd.Timedelta(minutes=1), calendar)
+    df = df[timestamps.isin(missing)].copy()
+    if not df.empty:
+        df['ID'] = storage.reserve_ids(table, len(df)) + np.arange(len(df), dtype='int64')
+    return df
+
+
+# Generate the missing minutes of one table, one working day at a time, as (table, chunk) pairs.
+# With a seed each day draws from the same stream as stream_simulation(seed=...), so a filled gap holds
+# exactly what a full regeneration would have written there.
+def iter_gap_chunks(table, kind, config, missing, first_id, calendar=default_calendar, rng=np.random, seed=None):
+    next_id = first_id
+    for day, day_missing in pd.Series(missing, index=missing).groupby(missing.normalize()):
+        timestamps = calendar.day_index(day)
+        day_rng = shard_rng(seed, table, pd.Period(day, 'D').ordinal) if seed is not None else rng
+        if kind == 'energy':
+            df = generate_energy_batch(config, timestamps, rng=day_rng, calendar=calendar)
+        else:
+            df = generate_melting_prod_batch(config, timestamps, rng=day_rng, calendar=calendar)
+        df = df[df['Timestamp'].isin(day_missing.index)].copy()
+        df['ID'] = np.arange(next_id, next_id + len(df), dtype='int64')
+        next_id += len(df)
+        yield table, df
+
+
+# Fill every gap of every station table (and Melting_Prod) from start_date up to end (default: the
+# current minute on the process clock, which is left to the real-time loop). Returns {table_name: rows inserted}.
+def fill_gaps(start_date, end=None, storage=None, station_configs=None, prod_config=None,
+              calendar=default_calendar, rng=np.random, seed=None):
+    station_configs, prod_config = resolve_configs(station_configs, prod_config)
+    end = pd.Timestamp(end) if end is not None else pd.Timestamp(get_clock().now()).floor('min')
+    configs = [('energy', station_config) for station_config in station_configs.values()]
+    if prod_config:
+        configs.append(('prod', prod_config))
+
+    own_storage = storage is None
+    if own_storage:
+        storage = open_storage()
+
+    try:
+        started = time.perf_counter()
+        # Filled minutes get IDs above the live rows: the dashboard views must pick the newest rows by time
+        storage.ensure_schema()
+        # Partitions from start_date through a few months ahead exist before any row goes in
+        storage.ensure_partitions(start_date, end.date(), tables=[config['name'] for _, config in configs])
+        filled = {}
+        for kind, config in configs:
+            table = config['name']
+            missing = find_gaps(storage, table, start_date, end, calendar)
+            filled[table] = len(missing)
+            if len(missing) == 0:
+                continue
+            ranges = gap_ranges(missing, calendar)
+            logger.info(f"{table}: {len(missing)} missing minutes in {len(ranges)} gaps "
+                        f"({ranges[0][0]} to {ranges[-1][1]})")
+            first_id = storage.reserve_ids(table, len(missing))
+            write_chunks(storage, iter_gap_chunks(table, kind, config, missing, first_id, calendar, rng, seed))
+
+        logger.info(f"Filled {sum(filled.values())} missing rows in {time.perf_counter() - started:.2f}s")
+        return filled
+    finally:
+        if own_storage:
+            storage.close()
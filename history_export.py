@@ -0,0 +1,166 @@
+# Export of station history to typed, date-partitioned Parquet for offline analytics, so analysts read
+# the days and columns they need instead of pulling whole tables over ODBC:
+#   <root>/<table>/Date=YYYY-MM-DD/part-0.parquet
+# Every station table and Melting_Prod is streamed month by month from the configured storage; only
+# closed days that are not exported yet, or whose row count in storage no longer matches their file (a gap
+# fill added minutes), are written. app.py exports after the startup history and then
+# daily; to run it on its own (e.g. from cron): python history_export.py [first day] [last day]
+# Columns get explicit Arrow types (int64 IDs, time32 Time, float64 measurements, int16 composition,
+# dictionary-encoded strings); Date is the partition key. read_history() loads a date range and a column
+# subset with partition pruning and Parquet statistics pushdown.
+import argparse
+import logging
+import os
+import time
+from datetime import date, timedelta
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from partitioning import PARTITION_COLUMN, partition_dir
+from sim_clock import get_clock
+from storage import COLUMN_TYPES, open_storage, table_layouts
+
+logger = logging.getLogger(__name__)
+
+EXPORT_DIR = os.environ.get('HISTORY_EXPORT_DIR', 'history_export')
+
+ARROW_TYPES = {
+    'BIGINT': pa.int64(),
+    'SMALLINT': pa.int16(),
+    'TIME': pa.time32('s'),
+    'DOUBLE': pa.float64()
+}
+
+
+def _arrow_type(column):
+    sql_type = COLUMN_TYPES.get(column, 'DOUBLE')
+    if sql_type.startswith('VARCHAR'):
+        return pa.dictionary(pa.int32(), pa.string())
+    return ARROW_TYPES[sql_type]
+
+
+# Arrow schema of an exported table file (without the Date partition column)
+def export_schema(table):
+    return pa.schema([(column, _arrow_type(column)) for column in table_layouts()[table] if column != PARTITION_COLUMN])
+
+
+def _table_dir(table, root):
+    return os.path.join(root, table)
+
+
+# {day: rows} of the exported days of table, from the Parquet footers
+def exported_days(table, root=EXPORT_DIR):
+    directory = _table_dir(table, root)
+    if not os.path.isdir(directory):
+        return {}
+    days = {}
+    for name in os.listdir(directory):
+        path = os.path.join(directory, name, 'part-0.parquet')
+        if name.startswith(PARTITION_COLUMN + '=') and os.path.exists(path):
+            days[pd.Timestamp(name.split('=', 1)[1]).date()] = pq.ParquetFile(path).metadata.num_rows
+    return days
+
+
+def _to_arrow(frame, schema):
+    columns = {}
+    for field in schema:
+        values = frame[field.name]
+        if field.name == 'Time':
+            values = pd.to_timedelta(values.astype(str)).dt.total_seconds().astype('int32')
+            columns[field.name] = pa.array(values, pa.int32()).cast(field.type)
+        elif pa.types.is_dictionary(field.type):
+            columns[field.name] = pa.array(values.astype(object), pa.string()).dictionary_encode()
+        else:
+            columns[field.name] = pa.array(pd.to_numeric(values), field.type)
+    return pa.table(columns, schema=schema)
+
+
+# One day file, written under a hidden temporary name (ignored by readers) and renamed, so a partial day
+# is never visible
+def _write_day(table, day, frame, schema, root):
+    directory = os.path.join(_table_dir(table, root), partition_dir(day))
+    os.makedirs(directory, exist_ok=True)
+    temporary = os.path.join(directory, '.part-0.parquet.tmp')
+    pq.write_table(_to_arrow(frame, schema), temporary, compression='zstd')
+    os.replace(temporary, os.path.join(directory, 'part-0.parquet'))
+
+
+# Export the days first_day..last_day of table that are not exported yet or whose row count changed since
+# (their partition is rewritten); returns the days written
+def export_table(storage, table, first_day, last_day, root=EXPORT_DIR):
+    counts = storage.read_sql(f"SELECT Date, COUNT(*) AS Readings FROM {table} WHERE Date BETWEEN ? AND ? "
+                              f"GROUP BY Date",
+                              (str(pd.Timestamp(first_day).date()), str(pd.Timestamp(last_day).date())))
+    exported = exported_days(table, root)
+    stored = zip(pd.to_datetime(counts['Date'].astype(str)).dt.date, counts['Readings'])
+    missing = sorted(day for day, rows in stored if exported.get(day) != rows)
+    if not missing:
+        return 0
+
+    schema = export_schema(table)
+    written = 0
+    # One query per month holding missing or changed days, so memory stays bounded on long histories
+    for _, month_days in pd.Series(missing).groupby(lambda i: (missing[i].year, missing[i].month)):
+        wanted = set(month_days)
+        rows = storage.read_sql(f"SELECT * FROM {table} WHERE Date BETWEEN ? AND ? ORDER BY ID",
+                                (min(wanted).isoformat(), max(wanted).isoformat()))
+        row_days = pd.to_datetime(rows['Date'].astype(str)).dt.date
+        for day, frame in rows.groupby(row_days, sort=True):
+            if day in wanted:
+                _write_day(table, day, frame, schema, root)
+                written += 1
+    return written
+
+
+# Export every registry table (and Melting_Prod) up to last_day (default yesterday on the process clock).
+# first_day defaults to the start of each table's history. Returns {table: days written}.
+def export_history(storage=None, first_day=None, last_day=None, tables=None, root=EXPORT_DIR):
+    last_day = last_day or get_clock().today() - timedelta(days=1)
+    first_day = first_day or pd.Timestamp.min.date()
+    tables = list(table_layouts()) if tables is None else tables
+
+    own_storage = storage is None
+    if own_storage:
+        storage = open_storage()
+    try:
+        started = time.perf_counter()
+        exported = {table: export_table(storage, table, first_day, last_day, root) for table in tables}
+        logger.info(f"Exported {sum(exported.values())} new or changed table-days up to {last_day} "
+                    f"in {time.perf_counter() - started:.2f}s")
+        return exported
+    finally:
+        if own_storage:
+            storage.close()
+
+
+# Rows of table between first_day and last_day (inclusive) from the export, only the given columns
+# (default all). Day directories outside the range are skipped; where is an optional extra pyarrow
+# filter pushed down to the Parquet statistics, e.g. ds.field('Machine Status') == 'Working'.
+def read_history(table, first_day, last_day, columns=None, where=None, root=EXPORT_DIR):
+    directory = _table_dir(table, root)
+    if not os.path.isdir(directory):
+        return pd.DataFrame(columns=columns or table_layouts()[table])
+    partitioning = ds.partitioning(pa.schema([(PARTITION_COLUMN, pa.date32())]), flavor='hive')
+    dataset = ds.dataset(directory, format='parquet', partitioning=partitioning)
+    condition = ((ds.field(PARTITION_COLUMN) >= pd.Timestamp(first_day).date())
+                 & (ds.field(PARTITION_COLUMN) <= pd.Timestamp(last_day).date()))
+    if where is not None:
+        condition = condition & where
+    columns = columns or [column for column in table_layouts()[table] if column in dataset.schema.names]
+    frame = dataset.to_table(columns=columns, filter=condition).to_pandas()
+    if 'ID' in frame.columns:
+        frame = frame.sort_values('ID', ignore_index=True)
+    return frame
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description='Export station history to date-partitioned Parquet')
+    parser.add_argument('first_day', type=date.fromisoformat, nargs='?', help='default: start of each table')
+    parser.add_argument('last_day', type=date.fromisoformat, nargs='?', help='default: yesterday')
+    parser.add_argument('--root', default=EXPORT_DIR)
+    args = parser.parse_args()
+    export_history(first_day=args.first_day, last_day=args.last_day, root=args.root)
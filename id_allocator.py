@@ -0,0 +1,56 @@
+# In-process ID allocator. Instead of SELECT MAX(ID) before every insert, IDs are handed out from blocks
+# reserved per table against the persisted high-water mark (storage reserve_ids()), so there is one
+# round-trip per block_size rows and writers in different threads or processes never hand out the same ID.
+# IDs left in a block when the process exits are skipped, which leaves gaps but never duplicates.
+import logging
+import os
+import threading
+
+from storage import open_storage
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BLOCK_SIZE = int(os.environ.get('ID_BLOCK_SIZE', 1000))
+
+
+class IdAllocator:
+    def __init__(self, storage_factory=open_storage, block_size=DEFAULT_BLOCK_SIZE):
+        self.storage_factory = storage_factory
+        self.block_size = block_size
+        self._blocks = {}
+        self._lock = threading.Lock()
+        self.reservations = 0
+
+    # count IDs for table, in ascending order; contiguous unless they straddle two blocks
+    def take(self, table, count=1):
+        with self._lock:
+            ids = []
+            while len(ids) < count:
+                next_id, limit = self._blocks.get(table, (0, 0))
+                if next_id >= limit:
+                    size = max(self.block_size, count - len(ids))
+                    next_id = self._reserve(table, size)
+                    limit = next_id + size
+                taken = min(limit - next_id, count - len(ids))
+                ids.extend(range(next_id, next_id + taken))
+                self._blocks[table] = (next_id + taken, limit)
+            return ids
+
+    def next_id(self, table):
+        return self.take(table)[0]
+
+    # Forget the in-memory blocks (after the tables were reset or reloaded)
+    def reset(self, tables=None):
+        with self._lock:
+            for table in list(self._blocks) if tables is None else tables:
+                self._blocks.pop(table, None)
+
+    def _reserve(self, table, size):
+        storage = self.storage_factory()
+        try:
+            start = storage.reserve_ids(table, size)
+        finally:
+            storage.close()
+        self.reservations += 1
+        logger.debug(f"Reserved IDs {start}-{start + size - 1} for {table}")
+        return start
@@ -0,0 +1,98 @@
+# Time partitioning of the station tables, so month-to-date and latest-minutes reads only touch the
+# partitions they need as history grows:
+#   mssql   - a monthly partition function/scheme on Date; each table gets a clustered index on
+#             (Date, Time, ID) on that scheme, so Date predicates eliminate partitions. Boundaries are
+#             kept PARTITION_MONTHS_AHEAD months ahead of today (empty partitions split for free).
+#   parquet - one directory per day and table, <table>/Date=YYYY-MM-DD/part-*.parquet (storage.py);
+#             DuckDB prunes the directories on Date filters
+#   sqlite  - an index on (Date, Time) per table; duckdb prunes row groups on its own min/max zonemaps
+import logging
+import os
+from datetime import date
+
+import pandas as pd
+
+from bulk_load import connection_cursor
+from sim_clock import get_clock
+
+logger = logging.getLogger(__name__)
+
+PARTITION_FUNCTION = 'PF_Energy_Month'
+PARTITION_SCHEME = 'PS_Energy_Month'
+PARTITION_INDEX = 'CIX_Energy_Partition'
+PARTITION_COLUMN = 'Date'
+PARTITION_MONTHS_AHEAD = int(os.environ.get('PARTITION_MONTHS_AHEAD', 3))
+
+# Latest/Last9 dashboard views on Parquet read only this many of the newest day partitions per table
+RECENT_PARTITIONS = int(os.environ.get('RECENT_PARTITIONS', 2))
+
+
+def month_start(day):
+    day = pd.Timestamp(day)
+    return date(day.year, day.month, 1)
+
+
+# First day of every month from first_day's month to months_ahead months after last_day's month
+def month_boundaries(first_day, last_day, months_ahead=0):
+    first, last = month_start(first_day), month_start(last_day)
+    first_index = first.year * 12 + first.month - 1
+    last_index = last.year * 12 + last.month - 1 + months_ahead
+    return [date(index // 12, index % 12 + 1, 1) for index in range(first_index, last_index + 1)]
+
+
+# Directory of one Parquet day partition, relative to the table directory
+def partition_dir(day):
+    return f"{PARTITION_COLUMN}={pd.Timestamp(day).date().isoformat()}"
+
+
+def _earliest_day(cursor, tables):
+    days = []
+    for table in tables:
+        cursor.execute(f"SELECT MIN([Date]) FROM {table}")
+        day = cursor.fetchone()[0]
+        if day is not None:
+            days.append(pd.Timestamp(day))
+    return min(days) if days else pd.Timestamp(get_clock().today())
+
+
+# SQL Server: create the partition function/scheme (first boundary at first_day's month, default the
+# oldest row), split in the boundaries up to PARTITION_MONTHS_AHEAD months past last_day (default
+# today), and move every table that is still a heap onto the scheme
+def ensure_mssql_partitions(conn, tables, first_day=None, last_day=None, months_ahead=PARTITION_MONTHS_AHEAD):
+    with connection_cursor(conn) as cursor:
+        cursor.execute("SELECT function_id FROM sys.partition_functions WHERE name = ?", (PARTITION_FUNCTION,))
+        function = cursor.fetchone()
+        last_day = last_day or get_clock().today()
+        if function is None:
+            first_day = first_day or _earliest_day(cursor, tables)
+            boundaries = month_boundaries(first_day, last_day, months_ahead)
+            values = ', '.join(f"'{boundary.isoformat()}'" for boundary in boundaries)
+            cursor.execute(f"CREATE PARTITION FUNCTION {PARTITION_FUNCTION} (date) AS RANGE RIGHT FOR VALUES ({values})")
+            cursor.execute(f"CREATE PARTITION SCHEME {PARTITION_SCHEME} AS PARTITION {PARTITION_FUNCTION} ALL TO ([PRIMARY])")
+            logger.info(f"Created monthly partitioning {boundaries[0]} .. {boundaries[-1]}")
+        else:
+            cursor.execute("SELECT CAST(value AS date) FROM sys.partition_range_values WHERE function_id = ?",
+                           (function[0],))
+            existing = {pd.Timestamp(row[0]).date() for row in cursor.fetchall()}
+            first_day = first_day or (min(existing) if existing else last_day)
+            for boundary in month_boundaries(first_day, last_day, months_ahead):
+                if boundary not in existing:
+                    cursor.execute(f"ALTER PARTITION SCHEME {PARTITION_SCHEME} NEXT USED [PRIMARY]")
+                    cursor.execute(f"ALTER PARTITION FUNCTION {PARTITION_FUNCTION}() SPLIT RANGE ('{boundary.isoformat()}')")
+                    logger.info(f"Added partition boundary {boundary}")
+
+        for table in tables:
+            cursor.execute(
+                "SELECT i.type, ds.name FROM sys.indexes i JOIN sys.data_spaces ds ON ds.data_space_id = i.data_space_id "
+                "WHERE i.object_id = OBJECT_ID(?) AND i.index_id IN (0, 1)", (table,))
+            layout = cursor.fetchone()
+            if layout is None or layout[1] == PARTITION_SCHEME:
+                continue
+            if layout[0] != 0:
+                # An existing clustered index (e.g. a clustered primary key) is left alone
+                logger.warning(f"{table} has a clustered index that is not on {PARTITION_SCHEME}; not partitioned")
+                continue
+            cursor.execute(f"CREATE CLUSTERED INDEX {PARTITION_INDEX} ON {table} ([Date], [Time], ID) "
+                           f"ON {PARTITION_SCHEME} ([Date])")
+            logger.info(f"Partitioned {table} by month")
+    conn.commit()
@@ -0,0 +1,122 @@
+# Single real-time samples (one minute of one station or of Melting_Prod) as ordered column -> value
+# dicts without ID, ready for the write-behind queue or the async ingestion service.
+import threading
+
+import numpy as np
+import pandas as pd
+
+from energy_generator import COMPOSITION_ELEMENTS, composition_table, phase_index
+
+# Running planned/actual metal of the current day per Melting_Prod table, carried from sample to sample
+# when melting_prod['cumulative_metal'] is set: {table: (day, planned, actual)}
+_metal_totals = {}
+_metal_lock = threading.Lock()
+
+
+def generate_pf(station_config):
+    rand = np.random.rand()
+    pf_ranges = station_config['pf_ranges']
+    
+    if rand < pf_ranges['low'][2]:
+        return round(np.random.uniform(pf_ranges['low'][0], pf_ranges['low'][1]), 2)
+    elif rand < pf_ranges['low'][2] + pf_ranges['high'][2]:
+        return round(np.random.uniform(pf_ranges['high'][0], pf_ranges['high'][1]), 2)
+    else:
+        return round(np.random.uniform(pf_ranges['normal'][0], pf_ranges['normal'][1]), 2)
+
+
+# One station's real-time sample at current_date, as an ordered column -> value dict
+def build_energy_insert(station_config, current_date):
+    # Generate heat number for stations with a HeatNo column (Melting)
+    heat_no = f"HT_{current_date.strftime('%Y%m%d')}_{current_date.hour:03d}"
+    
+    # Generate data for current minute
+    pf = generate_pf(station_config)
+    power = np.random.uniform(*station_config['power_range'])
+    status = np.random.choice(["Working", "Idle", "Maintenance"], p=station_config['prob_status'])
+
+    if status == "Idle":
+        power = np.random.uniform(*station_config['idle_power_range'])
+    elif status == "Maintenance":
+        power = 0
+
+    consumption = power * (1 / 60)  # Convert power (KW) to KVAH for 1 minute
+    reading = consumption  # For real-time data, reading equals consumption
+
+    low_pf, high_pf = station_config.get('notification_pf', (0.80, 0.95))
+    notification = "Normal PF"
+    if pf < low_pf:
+        notification = "Low PF"
+    elif pf > high_pf:
+        notification = "High PF"
+
+    row = {
+        'Station': station_config.get('station', station_config['name']),
+        'Date': current_date.date(),
+        'Time': current_date.time(),
+        'HeatNo': heat_no,
+        'Power Factor': pf,
+        'Power (KW)': round(power, 2),
+        'Reading (KVAH)': round(reading, 2),
+        'Consumption (KVAH)': round(consumption, 2),
+        'Machine Status': status,
+        'Notification': notification
+    }
+    if not station_config.get('heat_no'):
+        del row['HeatNo']
+    return row
+
+
+# Continue the running metal totals of day from the rows already stored for it (after a restart)
+def resume_metal_totals(storage, melting_prod, day):
+    if not melting_prod.get('cumulative_metal'):
+        return
+    table = melting_prod['name']
+    totals = storage.read_sql(f"SELECT MAX(\"Cumulative Planned Metal (kg)\") AS Planned, "
+                              f"MAX(\"Cumulative Actual Metal (kg)\") AS Actual FROM {table} WHERE Date = ?",
+                              (str(day),))
+    planned, actual = totals['Planned'].iloc[0], totals['Actual'].iloc[0]
+    with _metal_lock:
+        _metal_totals[table] = (day, 0.0 if pd.isna(planned) else float(planned),
+                                0.0 if pd.isna(actual) else float(actual))
+
+
+# Add one minute's metal to the running totals of its day; the totals start again at each new day
+def _add_metal(table, day, planned, actual):
+    with _metal_lock:
+        total_day, total_planned, total_actual = _metal_totals.get(table, (day, 0.0, 0.0))
+        if total_day != day:
+            total_planned, total_actual = 0.0, 0.0
+        _metal_totals[table] = (day, total_planned + planned, total_actual + actual)
+        return _metal_totals[table][1:]
+
+
+# Melting_Prod real-time sample at current_date, as an ordered column -> value dict
+def build_melting_prod_insert(melting_prod, current_date):
+    # Generate heat number
+    heat_no = f"HT_{current_date.strftime('%Y%m%d')}_{current_date.hour:03d}"
+    
+    # Generate data
+    temperature = np.random.uniform(*melting_prod['temperature_range'])
+    
+    # Metal composition from the heat phase profile
+    minute = current_date.minute
+    phase = composition_table(melting_prod)[phase_index(melting_prod, minute)]
+    composition = dict(zip(COMPOSITION_ELEMENTS, phase.tolist()))
+    
+    # Cumulative Planned and Actual Molten Metal
+    planned = melting_prod['planned_metal_per_hour'] if minute == 0 else 0
+    actual = planned + np.random.uniform(*melting_prod['actual_metal_deviation']) if minute == 0 else 0
+    if melting_prod.get('cumulative_metal'):
+        planned, actual = _add_metal(melting_prod['name'], current_date.date(), planned, actual)
+    
+    return {
+        'Station': melting_prod['station'],
+        'Date': current_date.date(),
+        'Time': current_date.time(),
+        'HeatNo': heat_no,
+        'Furnace Temperature': round(temperature, 2),
+        **composition,
+        'Cumulative Planned Metal (kg)': round(planned, 2),
+        'Cumulative Actual Metal (kg)': round(actual, 2)
+    }
@@ -0,0 +1,150 @@
+import hashlib
+import logging
+import os
+from datetime import time as dt_time
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Plant defaults: one day shift 9 AM to 6 PM, Monday to Saturday
+DEFAULT_SHIFTS = [(9, 18)]
+DEFAULT_DAYS = [0, 1, 2, 3, 4, 5]
+
+MINUTES_PER_DAY = 24 * 60
+
+
+# Shift boundaries may be given as an hour (9), "HH:MM" string or datetime.time
+def _to_minute_of_day(value):
+    if isinstance(value, dt_time):
+        return value.hour * 60 + value.minute
+    if isinstance(value, str):
+        hour, minute = value.split(':')
+        return int(hour) * 60 + int(minute)
+    return int(value) * 60
+
+
+def _to_day(value):
+    return np.datetime64(pd.Timestamp(value).date(), 'D')
+
+
+class ShiftCalendar:
+    def __init__(self, shifts=DEFAULT_SHIFTS, days_of_week=DEFAULT_DAYS, holidays=(), cache_dir=None):
+        self.shifts = [(_to_minute_of_day(start), _to_minute_of_day(end)) for start, end in shifts]
+        self.days_of_week = sorted(set(days_of_week))
+        self.holidays = sorted({pd.Timestamp(day).date() for day in holidays})
+        self.cache_dir = cache_dir
+
+        # Working minutes of a single day; a shift ending before it starts wraps past midnight
+        mask = np.zeros(MINUTES_PER_DAY, dtype=bool)
+        for start, end in self.shifts:
+            if end > start:
+                mask[start:end] = True
+            else:
+                mask[start:] = True
+                mask[:end] = True
+        self.minute_mask = mask
+        self.minute_offsets = np.flatnonzero(mask)
+        self.minutes_per_day = len(self.minute_offsets)
+        self._minutes_before = np.concatenate([[0], np.cumsum(mask)])
+
+        self._busdaycal = self._build_busdaycal()
+        self._index_cache = {}
+
+    def _build_busdaycal(self):
+        weekmask = [1 if day in self.days_of_week else 0 for day in range(7)]
+        return np.busdaycalendar(weekmask=weekmask, holidays=np.array(self.holidays, dtype='datetime64[D]'))
+
+    # numpy's busdaycalendar cannot be pickled; rebuild it so calendars can be sent to worker processes
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_busdaycal']
+        state['_index_cache'] = {}
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._busdaycal = self._build_busdaycal()
+
+    # Hours touched by any shift, in order (used for heat numbering)
+    @property
+    def working_hours(self):
+        return sorted(set((self.minute_offsets // 60).tolist()))
+
+    def is_working_day(self, value):
+        return bool(np.is_busday(_to_day(value), busdaycal=self._busdaycal))
+
+    def is_working_minute(self, value):
+        ts = pd.Timestamp(value)
+        return bool(self.minute_mask[ts.hour * 60 + ts.minute]) and self.is_working_day(ts)
+
+    # Number of working minutes in [start, end), computed without materialising the index
+    def working_minutes_between(self, start, end):
+        start, end = pd.Timestamp(start), pd.Timestamp(end)
+        if end <= start:
+            return 0
+        start_day, end_day = _to_day(start), _to_day(end)
+        full_days = int(np.busday_count(start_day, end_day, busdaycal=self._busdaycal))
+        before_start = self._minutes_before[start.hour * 60 + start.minute] if self.is_working_day(start) else 0
+        before_end = self._minutes_before[end.hour * 60 + end.minute] if self.is_working_day(end) else 0
+        return int(full_days * self.minutes_per_day - before_start + before_end)
+
+    # Every working minute from start_date to end_date (both days inclusive)
+    def working_index(self, start_date, end_date):
+        start_day, end_day = _to_day(start_date), _to_day(end_date)
+        key = (str(start_day), str(end_day))
+        if key in self._index_cache:
+            return self._index_cache[key]
+
+        index = self._load_cached_index(key)
+        if index is None:
+            index = self._build_index(start_day, end_day)
+            self._store_cached_index(key, index)
+
+        self._index_cache[key] = index
+        return index
+
+    # Working days from start_date to end_date (both inclusive) as datetime64[D]
+    def working_days(self, start_date, end_date):
+        days = np.arange(_to_day(start_date), _to_day(end_date) + np.timedelta64(1, 'D'), dtype='datetime64[D]')
+        return days[np.is_busday(days, busdaycal=self._busdaycal)]
+
+    # Working minutes of a single day, built without touching the range caches (used by streaming)
+    def day_index(self, day):
+        return self._build_index(_to_day(day), _to_day(day))
+
+    def _build_index(self, start_day, end_day):
+        days = self.working_days(start_day, end_day)
+        grid = days.astype('datetime64[m]')[:, None] + self.minute_offsets[None, :].astype('timedelta64[m]')
+        return pd.DatetimeIndex(grid.ravel().astype('datetime64[ns]'))
+
+    def _cache_path(self, key):
+        signature = repr((self.shifts, self.days_of_week, [str(day) for day in self.holidays], key))
+        digest = hashlib.sha1(signature.encode()).hexdigest()[:16]
+        return os.path.join(self.cache_dir, f"working_minutes_{key[0]}_{key[1]}_{digest}.npy")
+
+    def _load_cached_index(self, key):
+        if not self.cache_dir:
+            return None
+        path = self._cache_path(key)
+        if not os.path.exists(path):
+            return None
+        try:
+            return pd.DatetimeIndex(np.load(path).astype('datetime64[ns]'))
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable calendar cache {path}: {str(e)}")
+            return None
+
+    def _store_cached_index(self, key, index):
+        if not self.cache_dir:
+            return
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            np.save(self._cache_path(key), index.values.astype('datetime64[m]'))
+        except OSError as e:
+            logger.warning(f"Could not write calendar cache: {str(e)}")
+
+
+# Shared calendar used by the generators and the real-time loops
+default_calendar = ShiftCalendar(cache_dir=os.environ.get('CALENDAR_CACHE_DIR', '.calendar_cache'))
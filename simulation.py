@@ -0,0 +1,298 @@
+import pandas as pd
+import numpy as np
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+import time
+import logging
+import zlib
+from contextlib import contextmanager
+
+from energy_generator import (generate_energy_batch, generate_melting_prod_batch, draw_energy, consumption_total,
+                              build_energy_frame)
+from storage import open_storage
+from shift_calendar import default_calendar
+from station_config import registry
+
+logger = logging.getLogger(__name__)
+
+# Default simulation range
+start_date = datetime(2025, 4, 20)
+end_date = datetime(2025, 5, 20)
+
+
+# Default to the current station registry snapshot; pass prod_config={} to skip Melting_Prod
+def resolve_configs(station_configs=None, prod_config=None):
+    if station_configs is None:
+        station_configs = registry.stations
+    if prod_config is None:
+        prod_config = registry.melting_prod
+    return station_configs, prod_config
+
+
+# Table names of every configured station plus Melting_Prod
+def table_names(station_configs=None, prod_config=None):
+    station_configs, prod_config = resolve_configs(station_configs, prod_config)
+    names = [station_config['name'] for station_config in station_configs.values()]
+    if prod_config:
+        names.append(prod_config['name'])
+    return names
+
+
+# Stable stream key per table, so adding or reordering stations never changes another station's stream
+def stream_key(table_name):
+    return zlib.crc32(table_name.encode())
+
+
+# Independent, reproducible random stream for one (station, date shard) pair
+def shard_rng(seed, table_name, shard_ordinal):
+    seed_seq = np.random.SeedSequence(seed, spawn_key=(stream_key(table_name), int(shard_ordinal)))
+    return np.random.Generator(np.random.PCG64(seed_seq))
+
+
+# Split the working-minute index into calendar shards ('M' month, 'D' day); returns [(ordinal, timestamps)]
+def split_shards(timestamps, shard_freq='M'):
+    if len(timestamps) == 0:
+        return []
+    ordinals = timestamps.to_period(shard_freq).asi8
+    boundaries = np.flatnonzero(np.diff(ordinals)) + 1
+    starts = np.concatenate([[0], boundaries])
+    ends = np.concatenate([boundaries, [len(timestamps)]])
+    return [(ordinals[start], timestamps[start:end]) for start, end in zip(starts, ends)]
+
+
+def _generate_shard(task):
+    kind, config, timestamps, seed, ordinal, start_id, start_reading, cumulative_reading, calendar = task
+    rng = shard_rng(seed, config['name'], ordinal)
+    if kind == 'energy':
+        return generate_energy_batch(config, timestamps, start_id, start_reading, rng, cumulative_reading, calendar)
+    return generate_melting_prod_batch(config, timestamps, start_id, rng, calendar)
+
+
+# Seeded generation: every (station, shard) draws from its own SeedSequence stream, so the output
+# is byte-identical for a given seed and shard_freq no matter how many worker processes are used.
+def generate_all_stations_seeded(start_date, end_date, seed, station_configs=None, prod_config=None,
+                                 calendar=default_calendar, start_ids=None, cumulative_reading=False,
+                                 workers=1, shard_freq='M'):
+    station_configs, prod_config = resolve_configs(station_configs, prod_config)
+    start_ids = start_ids or {}
+    shards = split_shards(calendar.working_index(start_date, end_date), shard_freq)
+
+    configs = [('energy', station_config) for station_config in station_configs.values()]
+    if prod_config:
+        configs.append(('prod', prod_config))
+
+    tasks = []
+    for kind, config in configs:
+        next_id = start_ids.get(config['name'], 1)
+        reading = 0.0
+        for ordinal, timestamps in shards:
+            tasks.append((kind, config, timestamps, seed, ordinal, next_id, reading, cumulative_reading, calendar))
+            next_id += len(timestamps)
+
+            # Carry the cumulative reading: re-drawing a shard's stream is far cheaper than building its frame
+            if kind == 'energy' and cumulative_reading:
+                _, power, _ = draw_energy(config, len(timestamps), shard_rng(seed, config['name'], ordinal))
+                reading += consumption_total(power)
+
+    if workers == 1:
+        results = [_generate_shard(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_generate_shard, tasks))
+
+    results = iter(results)
+    frames = {}
+    for kind, config in configs:
+        station_frames = [next(results) for _ in shards]
+        frame = pd.concat(station_frames, ignore_index=True) if station_frames else pd.DataFrame()
+        if 'HeatNo' in frame:
+            # Heat numbers differ per shard, so concat falls back to strings; restore the categorical
+            frame['HeatNo'] = frame['HeatNo'].astype('category')
+        frames[config['name']] = frame
+    return frames
+
+
+# Generate all stations (and Melting_Prod) for one date range in a single pass.
+# The working-minute index is built once and shared; returns {table_name: DataFrame}.
+# Passing a seed switches to the reproducible, optionally multi-process, sharded mode.
+def generate_all_stations(start_date, end_date, station_configs=None, prod_config=None,
+                          calendar=default_calendar, rng=np.random, start_ids=None, cumulative_reading=False,
+                          seed=None, workers=1, shard_freq='M'):
+    if seed is not None:
+        return generate_all_stations_seeded(start_date, end_date, seed, station_configs, prod_config, calendar,
+                                            start_ids, cumulative_reading, workers, shard_freq)
+
+    station_configs, prod_config = resolve_configs(station_configs, prod_config)
+    start_ids = start_ids or {}
+    timestamps = calendar.working_index(start_date, end_date)
+
+    frames = {}
+    for station_name, station_config in station_configs.items():
+        table_name = station_config['name']
+        frames[table_name] = generate_energy_batch(
+            station_config,
+            timestamps,
+            start_id=start_ids.get(table_name, 1),
+            rng=rng,
+            cumulative_reading=cumulative_reading,
+            calendar=calendar
+        )
+
+    if prod_config:
+        table_name = prod_config['name']
+        frames[table_name] = generate_melting_prod_batch(
+            prod_config,
+            timestamps,
+            start_id=start_ids.get(table_name, 1),
+            rng=rng,
+            calendar=calendar
+        )
+
+    return frames
+
+
+# Split one day's frame into chunk_hours-wide windows (None keeps the whole day)
+def _split_hours(df, timestamps, chunk_hours):
+    if not chunk_hours:
+        yield df
+        return
+    buckets = timestamps.hour.values // chunk_hours
+    boundaries = np.flatnonzero(np.diff(buckets)) + 1
+    for chunk in np.split(np.arange(len(df)), boundaries):
+        yield df.iloc[chunk]
+
+
+# Stream all stations one working day at a time, yielding (table_name, chunk) pairs.
+# Only one day per station is in memory; IDs and the cumulative reading carry over between chunks.
+# With a seed each station-day uses its own stream, matching generate_all_stations(seed, shard_freq='D').
+# start_readings continues cumulative readings from an earlier range ({table_name: reading}).
+def iter_station_chunks(start_date, end_date, station_configs=None, prod_config=None,
+                        calendar=default_calendar, rng=np.random, start_ids=None, cumulative_reading=False,
+                        seed=None, chunk_hours=None, start_readings=None):
+    station_configs, prod_config = resolve_configs(station_configs, prod_config)
+    start_ids = start_ids or {}
+    start_readings = start_readings or {}
+    configs = [('energy', station_config) for station_config in station_configs.values()]
+    if prod_config:
+        configs.append(('prod', prod_config))
+
+    next_ids = {config['name']: start_ids.get(config['name'], 1) for _, config in configs}
+    readings = {config['name']: start_readings.get(config['name'], 0.0) for _, config in configs}
+
+    for day in calendar.working_days(start_date, end_date):
+        timestamps = calendar.day_index(day)
+        day_ordinal = pd.Period(pd.Timestamp(day), 'D').ordinal
+
+        for kind, config in configs:
+            table_name = config['name']
+            day_rng = shard_rng(seed, table_name, day_ordinal) if seed is not None else rng
+
+            if kind == 'energy':
+                pf, power, status_codes = draw_energy(config, len(timestamps), day_rng)
+                df = build_energy_frame(config, timestamps, pf, power, status_codes, next_ids[table_name],
+                                        readings[table_name], cumulative_reading, calendar)
+                readings[table_name] += consumption_total(power)
+            else:
+                df = generate_melting_prod_batch(config, timestamps, next_ids[table_name], day_rng, calendar)
+
+            next_ids[table_name] += len(df)
+            for chunk in _split_hours(df, timestamps, chunk_hours):
+                yield table_name, chunk
+
+
+# Sink for iter_station_chunks: inserts each chunk as it is produced and commits per chunk
+def write_chunks(storage, chunks):
+    total_rows = 0
+    for table_name, df in chunks:
+        if df.empty:
+            continue
+        total_rows += storage.load(table_name, df).rows
+    logger.info(f"Bulk load summary: {storage.summary()}")
+    return total_rows
+
+
+# Insert every generated frame over one storage session, one commit per table
+def write_frames(storage, frames):
+    for table_name, df in frames.items():
+        if df.empty:
+            continue
+        storage.load(table_name, df)
+    logger.info(f"Bulk load summary: {storage.summary()}")
+
+
+# Reserve the block of IDs an appending run will write (every working minute from start_date to end_date),
+# so it cannot collide with the real-time writers; returns {table_name: first ID}
+def reserve_start_ids(storage, tables, start_date, end_date, calendar=default_calendar):
+    start = pd.Timestamp(start_date).normalize()
+    end = pd.Timestamp(end_date).normalize() + pd.Timedelta(days=1)
+    rows = calendar.working_minutes_between(start, end)
+    return {table: storage.reserve_ids(table, rows) for table in tables}
+
+
+# Yields {table: write target}. With clear=True the targets are staging copies that replace the live
+# tables in one swap at the end, so a full regeneration never exposes a half-loaded table.
+@contextmanager
+def write_targets(storage, tables, clear):
+    if not clear:
+        yield {table: table for table in tables}
+        return
+    with storage.staged_reload(tables) as staging:
+        yield staging
+
+
+# Generate and insert all stations for [start_date, end_date] using one storage session
+# (open_storage() on the configured backend unless one is passed).
+# With clear=True the tables are rebuilt and swapped in, otherwise IDs continue from MAX(ID).
+# seed/workers select the reproducible sharded mode (see generate_all_stations_seeded).
+def run_simulation(start_date=start_date, end_date=end_date, storage=None, clear=True, station_configs=None,
+                   prod_config=None, calendar=default_calendar, rng=np.random, cumulative_reading=False,
+                   seed=None, workers=1):
+    own_storage = storage is None
+    if own_storage:
+        storage = open_storage()
+
+    try:
+        # Pin one registry snapshot for the whole run
+        station_configs, prod_config = resolve_configs(station_configs, prod_config)
+        tables = table_names(station_configs, prod_config)
+        start_ids = {} if clear else reserve_start_ids(storage, tables, start_date, end_date, calendar)
+
+        started = time.perf_counter()
+        frames = generate_all_stations(start_date, end_date, station_configs, prod_config, calendar, rng,
+                                       start_ids, cumulative_reading, seed, workers)
+        logger.info(f"Generated {sum(len(df) for df in frames.values())} rows for {len(frames)} tables "
+                    f"in {time.perf_counter() - started:.2f}s")
+
+        with write_targets(storage, tables, clear) as targets:
+            write_frames(storage, {targets[table]: df for table, df in frames.items()})
+        return frames
+    finally:
+        if own_storage:
+            storage.close()
+
+
+# Same as run_simulation but streamed day by day (or chunk_hours at a time), so memory stays flat
+# no matter how long the range is. Returns the number of rows written.
+def stream_simulation(start_date=start_date, end_date=end_date, storage=None, clear=True, station_configs=None,
+                      prod_config=None, calendar=default_calendar, rng=np.random, cumulative_reading=False,
+                      seed=None, chunk_hours=None):
+    own_storage = storage is None
+    if own_storage:
+        storage = open_storage()
+
+    try:
+        # Pin one registry snapshot for the whole run
+        station_configs, prod_config = resolve_configs(station_configs, prod_config)
+        tables = table_names(station_configs, prod_config)
+        start_ids = {} if clear else reserve_start_ids(storage, tables, start_date, end_date, calendar)
+
+        started = time.perf_counter()
+        chunks = iter_station_chunks(start_date, end_date, station_configs, prod_config, calendar, rng, start_ids,
+                                     cumulative_reading, seed, chunk_hours)
+        with write_targets(storage, tables, clear) as targets:
+            total_rows = write_chunks(storage, ((targets[table], df) for table, df in chunks))
+        logger.info(f"Streamed {total_rows} rows in {time.perf_counter() - started:.2f}s")
+        return total_rows
+    finally:
+        if own_storage:
+            storage.close()
@@ -0,0 +1,165 @@
+# Durable local spool for the real-time writers. Rows are appended to segment files on local disk before
+# anything talks to the database, so producers never wait on the DB and an outage or restart loses no
+# minute; a single drainer reads batches back in order and acknowledges them once they are committed.
+# Delivery is at-least-once: rows of segments left by an earlier process may already be in the database
+# (committed, not yet acknowledged), so those are marked recovered and deduplicated by the drainer.
+#   <directory>/<seq>.log  one JSON [table, row] per line; a new segment every segment_rows rows
+#   <directory>/<seq>.ack  byte offset up to which the segment has been written to the database
+import json
+import logging
+import os
+import threading
+from datetime import date, time as dt_time
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SPOOL_DIR = os.environ.get('INGEST_SPOOL_DIR', 'ingest_spool')
+DEFAULT_SEGMENT_ROWS = int(os.environ.get('INGEST_SPOOL_SEGMENT_ROWS', 50000))
+# fsync every append (survives power loss, not only process crashes) at the cost of a disk flush per tick
+DEFAULT_SPOOL_FSYNC = os.environ.get('INGEST_SPOOL_FSYNC', 'False').lower() == 'true'
+
+
+def _encode(value):
+    if isinstance(value, (date, dt_time)):
+        return value.isoformat()
+    if hasattr(value, 'item'):
+        # numpy scalars
+        return value.item()
+    raise TypeError(f"Cannot spool {type(value).__name__}")
+
+
+# Spooled rows come back with Date and Time as date / time objects again
+def _decode(row):
+    if isinstance(row.get('Date'), str):
+        row['Date'] = date.fromisoformat(row['Date'])
+    if isinstance(row.get('Time'), str):
+        row['Time'] = dt_time.fromisoformat(row['Time'])
+    return row
+
+
+class Spool:
+    def __init__(self, directory=DEFAULT_SPOOL_DIR, segment_rows=DEFAULT_SEGMENT_ROWS, fsync=DEFAULT_SPOOL_FSYNC):
+        self.directory = directory
+        self.segment_rows = segment_rows
+        self.fsync = fsync
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._file = None
+        self._segment_rows = 0
+        existing = self._segments()
+        # Segments of an earlier process: their unacknowledged rows may have been committed already
+        self.recovered = set(existing)
+        self._offsets = {seq: self._read_ack(seq) for seq in existing}
+        self._pending = sum(self._count_rows(seq, offset) for seq, offset in self._offsets.items())
+        self._seq = max(existing, default=0) + 1
+        self.stats = {'appended': 0, 'acked': 0, 'recovered_rows': self._pending}
+        if self._pending:
+            logger.info(f"Spool {directory}: {self._pending} rows from {len(existing)} segments to replay")
+
+    def _path(self, seq, suffix='.log'):
+        return os.path.join(self.directory, f"{seq:012d}{suffix}")
+
+    def _segments(self):
+        return sorted(int(name[:-4]) for name in os.listdir(self.directory) if name.endswith('.log'))
+
+    def _read_ack(self, seq):
+        try:
+            with open(self._path(seq, '.ack')) as f:
+                return int(f.read() or 0)
+        except (FileNotFoundError, ValueError):
+            return 0
+
+    def _count_rows(self, seq, offset):
+        with open(self._path(seq), 'rb') as f:
+            f.seek(offset)
+            return sum(1 for line in f if line.endswith(b'\n'))
+
+    # Rows appended and not yet acknowledged
+    def depth(self):
+        return self._pending
+
+    # Append (table, row) pairs durably; returns once they are on disk (or in the OS cache without fsync)
+    def append(self, rows):
+        if not rows:
+            return
+        data = ''.join(json.dumps([table, row], default=_encode) + '\n' for table, row in rows).encode()
+        with self._lock:
+            if self._file is None:
+                self._file = open(self._path(self._seq), 'ab')
+                self._offsets[self._seq] = 0
+            self._file.write(data)
+            self._file.flush()
+            if self.fsync:
+                os.fsync(self._file.fileno())
+            self._segment_rows += len(rows)
+            self._pending += len(rows)
+            self.stats['appended'] += len(rows)
+            if self._segment_rows >= self.segment_rows:
+                self._seal()
+
+    # Close the segment being written; the next append starts a new one
+    def _seal(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            self._seq += 1
+            self._segment_rows = 0
+
+    # Up to count of the oldest unacknowledged rows as (token, [(table, row)], recovered); rows are only
+    # released by ack(token). Single drainer: read again without ack and the same rows come back.
+    # The token holds the lines consumed, corrupt ones included, so depth() drops by all of them.
+    def read(self, count):
+        with self._lock:
+            for seq in sorted(self._offsets):
+                offset = self._offsets[seq]
+                batch, lines = [], 0
+                with open(self._path(seq), 'rb') as f:
+                    f.seek(offset)
+                    for line in f:
+                        if not line.endswith(b'\n'):
+                            # Torn write of a crashed process, or a line still being written
+                            break
+                        try:
+                            table, row = json.loads(line)
+                        except ValueError:
+                            logger.warning(f"Spool segment {seq}: skipping a corrupt line at byte {offset}")
+                        else:
+                            batch.append((table, _decode(row)))
+                        offset += len(line)
+                        lines += 1
+                        if len(batch) >= count:
+                            break
+                if batch:
+                    return (seq, offset, lines), batch, seq in self.recovered
+                if lines:
+                    # Only corrupt lines: nothing to write, release them now
+                    self._release(seq, offset, lines)
+                if seq != self._seq or self._file is None:
+                    # Fully drained segment that no longer receives rows
+                    self._drop(seq)
+            return None, [], False
+
+    # The rows of token are in the database: advance the segment's acknowledged offset
+    def ack(self, token):
+        with self._lock:
+            self._release(*token)
+
+    def _release(self, seq, offset, lines):
+        self._offsets[seq] = offset
+        self._pending -= lines
+        self.stats['acked'] += lines
+        with open(self._path(seq, '.ack'), 'w') as f:
+            f.write(str(offset))
+
+    def _drop(self, seq):
+        for suffix in ('.log', '.ack'):
+            try:
+                os.remove(self._path(seq, suffix))
+            except FileNotFoundError:
+                pass
+        self._offsets.pop(seq, None)
+        self.recovered.discard(seq)
+
+    def close(self):
+        with self._lock:
+            self._seal()
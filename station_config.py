@@ -0,0 +1,137 @@
+# Station registry shared by app.py, the simulation engine and table maintenance.
+# Stations are declared in stations.toml (or the file named by STATION_REGISTRY); the registry
+# re-reads the file when it changes, so stations can be added without restarting the server.
+import copy
+import logging
+import os
+import threading
+import time
+import tomllib
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_REGISTRY_PATH = os.environ.get(
+    'STATION_REGISTRY',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'stations.toml')
+)
+
+# Keys holding (min, max[, p]) pairs, kept as tuples like the original hard-coded config
+_TUPLE_KEYS = ('power_range', 'idle_power_range', 'notification_pf', 'temperature_range', 'actual_metal_deviation')
+
+
+def _merge(base, override):
+    merged = copy.deepcopy(base)
+    for key, value in override.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = _merge(merged[key], value)
+        else:
+            merged[key] = value
+    return merged
+
+
+def _normalise(config):
+    for key in _TUPLE_KEYS:
+        if key in config:
+            config[key] = tuple(config[key])
+    if 'pf_ranges' in config:
+        config['pf_ranges'] = {band: tuple(values) for band, values in config['pf_ranges'].items()}
+    return config
+
+
+# Resolve 'extends' chains so a feeder only lists what differs from its template station
+def _resolve_stations(raw_stations):
+    resolved = {}
+
+    def resolve(key, seen=()):
+        if key in resolved:
+            return resolved[key]
+        if key in seen:
+            raise ValueError(f"Circular 'extends' in station registry: {' -> '.join(seen + (key,))}")
+        if key not in raw_stations:
+            raise ValueError(f"Station '{seen[-1]}' extends unknown station '{key}'")
+        entry = dict(raw_stations[key])
+        parent = entry.pop('extends', None)
+        config = _merge(resolve(parent, seen + (key,)), entry) if parent else entry
+        resolved[key] = config
+        return config
+
+    for key in raw_stations:
+        resolve(key)
+
+    stations = {}
+    for key, config in resolved.items():
+        config = _normalise(copy.deepcopy(config))
+        if 'name' not in config:
+            raise ValueError(f"Station '{key}' has no table name")
+        stations[key] = config
+    return stations
+
+
+# Profiles of the standalone station scripts: a registry station (extends, default the same key) with the
+# settings the script overrides. They are not stations, so nothing else writes them.
+def _resolve_scripts(raw_scripts, stations):
+    scripts = {}
+    for key, entry in raw_scripts.items():
+        entry = dict(entry)
+        parent = entry.pop('extends', key)
+        if parent not in stations:
+            raise ValueError(f"Script profile '{key}' extends unknown station '{parent}'")
+        scripts[key] = _normalise(_merge(stations[parent], entry))
+    return scripts
+
+
+def load_registry(path=DEFAULT_REGISTRY_PATH):
+    with open(path, 'rb') as f:
+        data = tomllib.load(f)
+    stations = _resolve_stations(data.get('stations', {}))
+    scripts = _resolve_scripts(data.get('scripts', {}), stations)
+    melting_prod = _normalise(data['melting_prod']) if 'melting_prod' in data else {}
+    return stations, scripts, melting_prod
+
+
+class StationRegistry:
+    def __init__(self, path=DEFAULT_REGISTRY_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._mtime = None
+        self._watcher = None
+        self.stations, self.scripts, self.melting_prod = {}, {}, {}
+        self.reload()
+
+    # Re-read the registry file. The dicts are replaced, never mutated, so a reader
+    # that grabbed registry.stations keeps a consistent snapshot.
+    def reload(self):
+        with self._lock:
+            mtime = os.path.getmtime(self.path)
+            stations, scripts, melting_prod = load_registry(self.path)
+            self.stations, self.scripts, self.melting_prod = stations, scripts, melting_prod
+            self._mtime = mtime
+        logger.info(f"Loaded {len(stations)} stations from {self.path}")
+
+    def reload_if_changed(self):
+        try:
+            if os.path.getmtime(self.path) == self._mtime:
+                return False
+            self.reload()
+            return True
+        except Exception as e:
+            # Keep serving the last good registry if the file is missing or invalid mid-edit
+            logger.error(f"Failed to reload station registry {self.path}: {str(e)}")
+            return False
+
+    # Poll the file in a daemon thread and hot-reload on change
+    def start_watching(self, interval=5):
+        if self._watcher:
+            return self._watcher
+
+        def watch():
+            while True:
+                time.sleep(interval)
+                self.reload_if_changed()
+
+        self._watcher = threading.Thread(target=watch, daemon=True)
+        self._watcher.start()
+        return self._watcher
+
+
+registry = StationRegistry()
@@ -0,0 +1,663 @@
+# Storage backends. Generators, the real-time writers and the dashboard readers all go through a
+# storage session instead of a hard-coded pyodbc connection:
+#   mssql   - the SQL Server instance (default)
+#   sqlite  - a local SQLite file, to run and profile everything without the server
+#   duckdb  - a local DuckDB file; columnar, far faster for month-scale aggregates
+#   parquet - one Parquet dataset per table under a directory, queried through an in-memory DuckDB
+# Selected with the STORAGE_BACKEND / STORAGE_PATH environment variables or open_storage(backend, path).
+# The local backends create the station tables and stand-ins for the dashboard views from the registry;
+# on SQL Server the dashboard views are defined from the registry too (ensure_schema).
+# Tables are time-partitioned on every backend (partitioning.py).
+import json
+import logging
+import os
+import shutil
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import date, time as dt_time
+
+import pandas as pd
+
+from bulk_load import BulkLoader, LoadStats, connection_cursor, detect_dialect, quote_identifier
+from energy_generator import ENERGY_COLUMNS, MELTING_ENERGY_COLUMNS, MELTING_PROD_COLUMNS, expand_for_db
+from partitioning import PARTITION_COLUMN, RECENT_PARTITIONS, ensure_mssql_partitions, partition_dir
+from station_config import registry
+from table_reset import RETIRED_SUFFIX, STAGING_SUFFIX, create_staging_table, drop_tables, reset_tables, swap_tables
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = ['mssql', 'sqlite', 'duckdb', 'parquet']
+DEFAULT_BACKEND = os.environ.get('STORAGE_BACKEND', 'mssql')
+DEFAULT_PATHS = {'sqlite': 'energy.sqlite', 'duckdb': 'energy.duckdb', 'parquet': 'energy_parquet'}
+
+# SQL Server connection details, read once here for the server, the pool and the standalone scripts
+# (MSSQL_SERVER / MSSQL_DATABASE / MSSQL_USERNAME / MSSQL_PASSWORD); an empty username uses a trusted
+# connection
+MSSQL_LOGIN = {
+    'server': os.environ.get('MSSQL_SERVER', 'database-2.c5084sk6oq16.ap-south-1.rds.amazonaws.com,1433'),
+    'database': os.environ.get('MSSQL_DATABASE', 'EnergyDB'),
+    'username': os.environ.get('MSSQL_USERNAME', 'admin'),
+    'password': os.environ.get('MSSQL_PASSWORD', '')
+}
+
+# Persisted high-water mark per table for the ID block allocator (id_allocator.py)
+ID_HIGH_WATER_TABLE = 'Id_High_Water'
+
+# Views (re)created per local database file (keyed by path) or on SQL Server ('mssql') in this process;
+# concurrent sessions opened from several threads would otherwise race on DROP VIEW / CREATE VIEW
+_schema_lock = threading.Lock()
+_schema_applied = {}
+
+# The Parquet high-water file is rewritten per reservation; serialise that within the process
+_high_water_lock = threading.Lock()
+
+# Column types for the tables the local backends create; anything not listed is a measurement (DOUBLE)
+COLUMN_TYPES = {
+    'ID': 'BIGINT',
+    'Station': 'VARCHAR(50)',
+    'Date': 'DATE',
+    'Time': 'TIME',
+    'HeatNo': 'VARCHAR(20)',
+    'Machine Status': 'VARCHAR(20)',
+    'Notification': 'VARCHAR(20)',
+    'Fe%': 'SMALLINT',
+    'C%': 'SMALLINT',
+    'Cr%': 'SMALLINT',
+    'Ni%': 'SMALLINT'
+}
+
+
+# {table: columns} for every station table and Melting_Prod in the registry
+def table_layouts(station_configs=None, prod_config=None):
+    station_configs = registry.stations if station_configs is None else station_configs
+    prod_config = registry.melting_prod if prod_config is None else prod_config
+    layouts = {
+        config['name']: MELTING_ENERGY_COLUMNS if config.get('heat_no') else ENERGY_COLUMNS
+        for config in station_configs.values()
+    }
+    if prod_config:
+        layouts[prod_config['name']] = MELTING_PROD_COLUMNS
+    return layouts
+
+
+def _q(column, dialect='sqlite'):
+    if dialect == 'mssql':
+        return f"[{column}]"
+    return '"' + column + '"'
+
+
+# The dashboard views, built over the registry tables in the SQL of dialect: the SQL Server definitions
+# and their stand-ins on the local backends (SQLite/DuckDB SQL).
+# recent: {table: first day} restricts the latest-readings views to the newest partitions of table.
+def dashboard_view_sql(station_configs=None, prod_config=None, recent=None, dialect='sqlite'):
+    station_configs = registry.stations if station_configs is None else station_configs
+    prod_config = registry.melting_prod if prod_config is None else prod_config
+    if not station_configs:
+        return {}
+
+    def q(column):
+        return _q(column, dialect)
+
+    def newest(count, columns, table):
+        # Newest rows by time, not by ID: gap-filled minutes get IDs above the live rows
+        order = f"ORDER BY {q('Date')} DESC, {q('Time')} DESC, ID DESC"
+        if dialect == 'mssql':
+            return f"SELECT TOP {count} {columns} FROM {source(table)} AS r {order}"
+        return f"SELECT {columns} FROM {source(table)} AS r {order} LIMIT {count}"
+
+    def source(table):
+        if recent and recent.get(table):
+            return f"(SELECT * FROM {table} WHERE {q('Date')} >= DATE '{recent[table]}')"
+        return table
+
+    latest, last9, consumption = [], [], []
+    for key, config in station_configs.items():
+        table = config['name']
+        columns = (f"'{key}' AS Process, {q('Date')}, {q('Time')}, {q('Power (KW)')} AS Power, "
+                   f"{q('Consumption (KVAH)')} AS Consumption, {q('Power Factor')} AS PowerFactor")
+        latest.append(f"SELECT * FROM ({newest(1, columns, table)}) AS latest_{len(latest)}")
+        columns = f"{q('Date')}, {q('Time')}, {q('Power (KW)')} AS Power"
+        last9.append(f"SELECT * FROM ({newest(9, columns, table)}) AS last9_{len(last9)}")
+        consumption.append(f"SELECT {q('Date')}, {q('Consumption (KVAH)')} AS Consumption FROM {table}")
+
+    views = {
+        'Latest_AllEnergy_Readings_View': ' UNION ALL '.join(latest),
+        'Latest_Energy_Reading_View': "SELECT Process, Power FROM Latest_AllEnergy_Readings_View",
+        'Last9_Energy_Readings_Vw': ' UNION ALL '.join(last9),
+        'Daily_Consumption_View': f"SELECT {q('Date')}, SUM(Consumption) AS Total_Consumption "
+                                  f"FROM ({' UNION ALL '.join(consumption)}) AS readings GROUP BY {q('Date')}"
+    }
+    if prod_config:
+        # Cumulative metal already holds the running total of the day
+        total = 'MAX' if prod_config.get('cumulative_metal') else 'SUM'
+        views['Daily_Production_View'] = (f"SELECT {q('Date')}, {total}({q('Cumulative Actual Metal (kg)')}) "
+                                          f"AS Daily_Production FROM {prod_config['name']} GROUP BY {q('Date')}")
+    return views
+
+
+def build_insert_query(table_name, columns, dialect='mssql'):
+    column_list = ', '.join(quote_identifier(column, dialect) for column in columns)
+    placeholders = ', '.join('?' for _ in columns)
+    return f"INSERT INTO {table_name} ({column_list}) VALUES ({placeholders})"
+
+
+def _fetch_frame(cursor):
+    columns = [column[0] for column in cursor.description]
+    return pd.DataFrame.from_records([tuple(row) for row in cursor.fetchall()], columns=columns)
+
+
+# A session on a DB-API connection (SQL Server, SQLite or DuckDB). Writes are committed by commit()
+# (load() and reset() commit themselves); close() releases the connection.
+class SqlStorage:
+    def __init__(self, conn, **loader_options):
+        self.conn = conn
+        self.dialect = detect_dialect(conn)
+        self.loader = BulkLoader(conn, **loader_options)
+
+    def read_sql(self, query, params=()):
+        with connection_cursor(self.conn) as cursor:
+            cursor.execute(query, list(params))
+            return _fetch_frame(cursor)
+
+    # [(query, params)] -> [DataFrame]. SQL Server gets a single batch (one round trip, one result set per
+    # query); SQLite/DuckDB are in-process, so the queries simply run in turn.
+    def read_sql_batch(self, queries):
+        if self.dialect != 'mssql':
+            return [self.read_sql(query, params) for query, params in queries]
+        with connection_cursor(self.conn) as cursor:
+            cursor.execute('SET NOCOUNT ON; ' + '; '.join(query for query, _ in queries),
+                           [param for _, params in queries for param in params])
+            frames = []
+            while True:
+                if cursor.description:
+                    frames.append(_fetch_frame(cursor))
+                if not cursor.nextset():
+                    break
+        if len(frames) != len(queries):
+            raise RuntimeError(f"Expected {len(queries)} result sets, got {len(frames)}")
+        return frames
+
+    def next_id(self, table):
+        with connection_cursor(self.conn) as cursor:
+            cursor.execute(f"SELECT MAX(ID) FROM {table}")
+            max_id = cursor.fetchone()[0]
+        return 1 if max_id is None else max_id + 1
+
+    def _create_high_water_table(self, cursor):
+        if self.dialect == 'mssql':
+            cursor.execute(f"IF OBJECT_ID('{ID_HIGH_WATER_TABLE}') IS NULL "
+                           f"CREATE TABLE {ID_HIGH_WATER_TABLE} (TableName NVARCHAR(128) PRIMARY KEY, NextId BIGINT NOT NULL)")
+        else:
+            cursor.execute(f"CREATE TABLE IF NOT EXISTS {ID_HIGH_WATER_TABLE} "
+                           f"(TableName VARCHAR(128) PRIMARY KEY, NextId BIGINT NOT NULL)")
+
+    # Reserve count IDs for table and return the first one. The high-water mark is bumped and committed in
+    # its own transaction (the UPDATE holds the row lock until commit), so concurrent writers never overlap.
+    # The first reservation for a table starts after the rows already in it.
+    def reserve_ids(self, table, count, retries=5):
+        with connection_cursor(self.conn) as cursor:
+            self._create_high_water_table(cursor)
+            self.conn.commit()
+            for attempt in range(retries):
+                try:
+                    if self.dialect == 'duckdb':
+                        # DuckDB autocommits each statement; UPDATE and SELECT must see the same transaction
+                        cursor.execute("BEGIN TRANSACTION")
+                    cursor.execute(f"UPDATE {ID_HIGH_WATER_TABLE} SET NextId = NextId + ? WHERE TableName = ?",
+                                   (count, table))
+                    cursor.execute(f"SELECT NextId FROM {ID_HIGH_WATER_TABLE} WHERE TableName = ?", (table,))
+                    row = cursor.fetchone()
+                    if row is not None:
+                        self.conn.commit()
+                        return row[0] - count
+
+                    cursor.execute(f"SELECT MAX(ID) FROM {table}")
+                    start = (cursor.fetchone()[0] or 0) + 1
+                    cursor.execute(f"INSERT INTO {ID_HIGH_WATER_TABLE} (TableName, NextId) VALUES (?, ?)",
+                                   (table, start + count))
+                    self.conn.commit()
+                    return start
+                except Exception:
+                    # Another writer initialised or bumped the same mark first; try again
+                    self.conn.rollback()
+                    if attempt == retries - 1:
+                        raise
+                    time.sleep(0.01 * (attempt + 1))
+
+    # Drop the high-water marks so the next reservation starts again from MAX(ID) (after a reset or reload)
+    def forget_ids(self, tables):
+        with connection_cursor(self.conn) as cursor:
+            self._create_high_water_table(cursor)
+            for table in tables:
+                cursor.execute(f"DELETE FROM {ID_HIGH_WATER_TABLE} WHERE TableName = ?", (table,))
+        self.conn.commit()
+
+    # Insert one row ({column: value}); committed with the rest of the tick by commit()
+    def insert(self, table, row):
+        self.insert_many(table, [row])
+
+    # Insert rows ({column: value} each) with one executemany per column layout; committed by commit()
+    def insert_many(self, table, rows):
+        layouts = {}
+        for row in rows:
+            layouts.setdefault(tuple(row), []).append(tuple(row.values()))
+
+        with connection_cursor(self.conn) as cursor:
+            if self.dialect == 'mssql':
+                cursor.fast_executemany = True
+            for columns, values in layouts.items():
+                if self.dialect == 'sqlite':
+                    # No datetime.time adapter in sqlite3; store ISO strings like the bulk loader
+                    values = [tuple(str(value) if isinstance(value, (date, dt_time)) else value for value in row)
+                              for row in values]
+                cursor.executemany(build_insert_query(table, list(columns), self.dialect), values)
+
+    def load(self, table, df):
+        if table.endswith(STAGING_SUFFIX):
+            # Staging copies share the live table's TVP type
+            live = table[:-len(STAGING_SUFFIX)]
+            self.loader.tvp_types.setdefault(table, self.loader.tvp_types.get(live, f"dbo.{live}_Type"))
+        return self.loader.load(table, df)
+
+    def summary(self):
+        return self.loader.summary()
+
+    # Remove rows first..last (inclusive) by ID, e.g. a partially written backfill shard
+    def delete_id_range(self, table, first, last):
+        with connection_cursor(self.conn) as cursor:
+            cursor.execute(f"DELETE FROM {table} WHERE ID BETWEEN ? AND ?", (first, last))
+        self.conn.commit()
+
+    def reset(self, tables):
+        reset_tables(self.conn, tables)
+        self.forget_ids(tables)
+
+    # Empty staging copies of tables; returns {table: staging table}
+    def create_staging(self, tables):
+        drop_tables(self.conn, [table + RETIRED_SUFFIX for table in tables])
+        return {table: create_staging_table(self.conn, table) for table in tables}
+
+    # Rename the staging copies over the live tables in one transaction. SQL Server partitions the copies
+    # before they go live; SQLite indexes the live tables once the old ones (and their indexes) are gone.
+    def swap_staging(self, tables):
+        if self.dialect == 'mssql':
+            self.ensure_partitions(tables=[table + STAGING_SUFFIX for table in tables])
+        swap_tables(self.conn, tables)
+        self.forget_ids(tables)
+        if self.dialect == 'sqlite':
+            self.ensure_partitions(tables=tables)
+
+    # Time partitioning (partitioning.py) of tables, default every registry table. SQL Server boundaries
+    # run from first_day (default the oldest row) to a few months past last_day (default today).
+    def ensure_partitions(self, first_day=None, last_day=None, tables=None):
+        tables = list(table_layouts()) if tables is None else tables
+        if self.dialect == 'mssql':
+            ensure_mssql_partitions(self.conn, tables, first_day, last_day)
+        elif self.dialect == 'sqlite':
+            with connection_cursor(self.conn) as cursor:
+                for table in tables:
+                    cursor.execute(f"CREATE INDEX IF NOT EXISTS {_q('ix_' + table + '_date')} "
+                                   f"ON {table} ({_q('Date')}, {_q('Time')})")
+            self.conn.commit()
+
+    def drop_staging(self, tables):
+        self.rollback()
+        drop_tables(self.conn, [table + STAGING_SUFFIX for table in tables])
+
+    # Load into staging copies and swap them in on success; yields {table: staging table}.
+    # On error the staging tables are dropped and the live tables are left untouched.
+    @contextmanager
+    def staged_reload(self, tables):
+        staging = self.create_staging(tables)
+        try:
+            yield staging
+        except Exception:
+            self.drop_staging(tables)
+            raise
+        self.swap_staging(tables)
+
+    def commit(self):
+        self.conn.commit()
+
+    # The SQL Server tables are managed on the server; the dashboard views are (re)defined from the
+    # registry, once per server and registry version in this process
+    def ensure_schema(self):
+        if self.dialect != 'mssql':
+            return
+        with _schema_lock:
+            views = dashboard_view_sql(dialect='mssql')
+            if _schema_applied.get('mssql') != views:
+                with connection_cursor(self.conn) as cursor:
+                    for view, query in views.items():
+                        cursor.execute(f"CREATE OR ALTER VIEW {view} AS {query}")
+                self.conn.commit()
+                _schema_applied['mssql'] = views
+
+    def rollback(self):
+        try:
+            self.conn.rollback()
+        except Exception:
+            # DuckDB autocommits unless a transaction was opened, and refuses a rollback without one
+            if self.dialect != 'duckdb':
+                raise
+
+    # Trivial round-trip to check the connection is still alive
+    def ping(self):
+        with connection_cursor(self.conn) as cursor:
+            cursor.execute("SELECT 1")
+            cursor.fetchone()
+
+    def close(self):
+        self.conn.close()
+
+
+# SQLite/DuckDB file: creates the registry tables and the dashboard views on open (once per file and
+# registry version in this process)
+class LocalSqlStorage(SqlStorage):
+    def __init__(self, conn, path=None, **loader_options):
+        super().__init__(conn, **loader_options)
+        self.path = path
+        self.ensure_schema()
+
+    # Create tables and views if the registry changed since they were last created for this file
+    def ensure_schema(self):
+        with _schema_lock:
+            signature = (table_layouts(), dashboard_view_sql())
+            if self.path is None or _schema_applied.get(self.path) != signature:
+                self.create_schema()
+                if self.path is not None:
+                    _schema_applied[self.path] = signature
+
+    def create_schema(self, station_configs=None, prod_config=None):
+        with connection_cursor(self.conn) as cursor:
+            for table, columns in table_layouts(station_configs, prod_config).items():
+                column_list = ', '.join(f"{_q(column)} {COLUMN_TYPES.get(column, 'DOUBLE')}" for column in columns)
+                cursor.execute(f"CREATE TABLE IF NOT EXISTS {table} ({column_list})")
+            for view, query in dashboard_view_sql(station_configs, prod_config).items():
+                cursor.execute(f"DROP VIEW IF EXISTS {view}")
+                cursor.execute(f"CREATE VIEW {view} AS {query}")
+        self.conn.commit()
+        self.ensure_partitions(tables=list(table_layouts(station_configs, prod_config)))
+
+
+# One Parquet dataset per table, partitioned by day: <table>/Date=YYYY-MM-DD/part-*.parquet (the Date
+# column lives in the directory name). Writes add part files; queries run on an in-memory DuckDB with a
+# view per table over its files, which skips the partitions outside a Date filter, plus the dashboard views.
+class ParquetStorage:
+    dialect = 'parquet'
+
+    def __init__(self, root):
+        import duckdb
+
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+        self.conn = duckdb.connect()
+        self.stats = []
+        self._pending = {}
+        # What each view is bound to; the globs pick up new part files by themselves, so a view is only
+        # rebound when its table gains its first files, loses all of them or changes columns
+        self._bound = {}
+        self._migrate_flat_files()
+
+    def _table_dir(self, table):
+        return os.path.join(self.root, table)
+
+    def _pattern(self, table):
+        return os.path.join(self._table_dir(table), '*', '*.parquet').replace("'", "''")
+
+    def _part_files(self, table):
+        directory = self._table_dir(table)
+        if not os.path.isdir(directory):
+            return []
+        return [os.path.join(directory, partition, name)
+                for partition in os.listdir(directory) if os.path.isdir(os.path.join(directory, partition))
+                for name in os.listdir(os.path.join(directory, partition)) if name.endswith('.parquet')]
+
+    def _files(self, table):
+        return bool(self._part_files(table))
+
+    def _write_file(self, directory, frame):
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"part-{time.time_ns()}-{uuid.uuid4().hex[:8]}.parquet")
+        frame.to_parquet(path, index=False)
+
+    # One part file per day partition the rows fall in
+    def _write(self, table, frame):
+        days = pd.to_datetime(frame[PARTITION_COLUMN].astype(str)).dt.date
+        for day, part in frame.groupby(days, sort=True):
+            self._write_file(os.path.join(self._table_dir(table), partition_dir(day)),
+                             part.drop(columns=[PARTITION_COLUMN]))
+
+    # Move part files of the earlier flat layout (<table>/*.parquet) into day partitions. Each file is
+    # claimed with a rename first, so concurrent sessions never migrate it twice.
+    def _migrate_flat_files(self):
+        for table in os.listdir(self.root):
+            directory = self._table_dir(table)
+            if not os.path.isdir(directory):
+                continue
+            for name in os.listdir(directory):
+                if not name.endswith('.parquet'):
+                    continue
+                claimed = os.path.join(directory, name + '.migrating')
+                try:
+                    os.rename(os.path.join(directory, name), claimed)
+                except FileNotFoundError:
+                    continue
+                self._write(table, pd.read_parquet(claimed))
+                os.remove(claimed)
+                logger.info(f"Moved {table}/{name} into day partitions")
+
+    # First day of the newest RECENT_PARTITIONS partitions holding files
+    def _recent_day(self, files):
+        days = sorted({os.path.basename(os.path.dirname(path)).split('=', 1)[1] for path in files})
+        return days[-RECENT_PARTITIONS:][0] if days else None
+
+    # (Re)bind a view per table to its current files, then the dashboard views on top
+    def _refresh_views(self):
+        recent = {}
+        for table, columns in table_layouts().items():
+            files = self._part_files(table)
+            if files:
+                recent[table] = self._recent_day(files)
+            binding = (tuple(columns), bool(files))
+            if self._bound.get(table) == binding:
+                continue
+            if files:
+                column_list = ', '.join(_q(column) for column in columns)
+                source = (f"SELECT {column_list} FROM read_parquet('{self._pattern(table)}', hive_partitioning = true, "
+                          f"hive_types = {{'{PARTITION_COLUMN}': DATE}}, union_by_name = true)")
+            else:
+                source = 'SELECT ' + ', '.join(
+                    f"CAST(NULL AS {COLUMN_TYPES.get(column, 'DOUBLE')}) AS {_q(column)}" for column in columns
+                ) + ' WHERE false'
+            self.conn.execute(f"CREATE OR REPLACE VIEW {table} AS {source}")
+            self._bound[table] = binding
+        views = dashboard_view_sql(recent=recent)
+        if self._bound.get(None) != views:
+            for view, query in views.items():
+                self.conn.execute(f"CREATE OR REPLACE VIEW {view} AS {query}")
+            self._bound[None] = views
+
+    def read_sql(self, query, params=()):
+        self._refresh_views()
+        return self.conn.execute(query, list(params)).df()
+
+    # Views are bound once for the whole batch
+    def read_sql_batch(self, queries):
+        self._refresh_views()
+        return [self.conn.execute(query, list(params)).df() for query, params in queries]
+
+    def next_id(self, table):
+        max_id = None
+        if self._files(table):
+            max_id = self.conn.execute(
+                f"SELECT MAX(ID) FROM read_parquet('{self._pattern(table)}', union_by_name = true)").fetchone()[0]
+        pending = [row['ID'] for row in self._pending.get(table, []) if 'ID' in row]
+        if pending:
+            max_id = max([max_id or 0] + pending)
+        return 1 if max_id is None else int(max_id) + 1
+
+    def _high_water_path(self):
+        return os.path.join(self.root, f"{ID_HIGH_WATER_TABLE}.json")
+
+    def _read_high_water(self):
+        path = self._high_water_path()
+        if not os.path.exists(path):
+            return {}
+        with open(path) as f:
+            return json.load(f)
+
+    def _write_high_water(self, marks):
+        path = self._high_water_path()
+        with open(path + '.tmp', 'w') as f:
+            json.dump(marks, f)
+        os.replace(path + '.tmp', path)
+
+    # High-water marks live in a JSON file next to the datasets (single-process use)
+    def reserve_ids(self, table, count):
+        with _high_water_lock:
+            marks = self._read_high_water()
+            start = marks.get(table) or self.next_id(table)
+            marks[table] = start + count
+            self._write_high_water(marks)
+        return start
+
+    def forget_ids(self, tables):
+        with _high_water_lock:
+            marks = self._read_high_water()
+            self._write_high_water({table: mark for table, mark in marks.items() if table not in tables})
+
+    # Rows are buffered and written as one part file per table on commit()
+    def insert(self, table, row):
+        self.insert_many(table, [row])
+
+    def insert_many(self, table, rows):
+        self._pending.setdefault(table, []).extend(rows)
+
+    def load(self, table, df):
+        started = time.perf_counter()
+        self._write(table, expand_for_db(df))
+        stats = LoadStats(table, 'parquet', len(df), time.perf_counter() - started)
+        self.stats.append(stats)
+        logger.info(f"Wrote {stats.rows} rows to {table} as Parquet ({stats.rows_per_sec:,.0f} rows/s)")
+        return stats
+
+    def summary(self):
+        return LoadStats('all tables', 'parquet', sum(stats.rows for stats in self.stats),
+                         sum(stats.seconds for stats in self.stats))
+
+    # Rewrite the part files holding IDs first..last (inclusive) without those rows. Other writers may
+    # add or remove their own part files meanwhile; files that disappear are skipped.
+    def delete_id_range(self, table, first, last):
+        for path in self._part_files(table):
+            try:
+                ids = pd.read_parquet(path, columns=['ID'])['ID']
+                if not ids.between(first, last).any():
+                    continue
+                frame = pd.read_parquet(path)
+            except FileNotFoundError:
+                continue
+            keep = ~frame['ID'].between(first, last)
+            if keep.any():
+                self._write_file(os.path.dirname(path), frame[keep])
+            os.remove(path)
+
+    def reset(self, tables):
+        for table in tables:
+            shutil.rmtree(self._table_dir(table), ignore_errors=True)
+            logger.info(f"Reset {table}")
+        self.forget_ids(tables)
+
+    # Staging copies are <table>_staging directories
+    def create_staging(self, tables):
+        staging = {table: table + STAGING_SUFFIX for table in tables}
+        self.reset(staging.values())
+        return staging
+
+    # Swap each staging directory in with a rename
+    def swap_staging(self, tables):
+        for table in tables:
+            retired = self._table_dir(table + RETIRED_SUFFIX)
+            shutil.rmtree(retired, ignore_errors=True)
+            if os.path.isdir(self._table_dir(table)):
+                os.replace(self._table_dir(table), retired)
+            os.makedirs(self._table_dir(table + STAGING_SUFFIX), exist_ok=True)
+            os.replace(self._table_dir(table + STAGING_SUFFIX), self._table_dir(table))
+            shutil.rmtree(retired, ignore_errors=True)
+        self.forget_ids(tables)
+        logger.info(f"Swapped in {len(tables)} reloaded tables")
+
+    def drop_staging(self, tables):
+        self.rollback()
+        self.reset([table + STAGING_SUFFIX for table in tables])
+
+    # Write into <table>_staging directories, then swap each directory in with a rename
+    @contextmanager
+    def staged_reload(self, tables):
+        staging = self.create_staging(tables)
+        try:
+            yield staging
+        except Exception:
+            self.drop_staging(tables)
+            raise
+        self.swap_staging(tables)
+
+    def commit(self):
+        pending, self._pending = self._pending, {}
+        for table, rows in pending.items():
+            self._write(table, pd.DataFrame(rows))
+
+    def rollback(self):
+        self._pending = {}
+
+    # Views are rebound to the registry on every read
+    def ensure_schema(self):
+        pass
+
+    # Day partitions are created as rows are written
+    def ensure_partitions(self, first_day=None, last_day=None, tables=None):
+        pass
+
+    def ping(self):
+        if not os.path.isdir(self.root):
+            raise FileNotFoundError(self.root)
+
+    def close(self):
+        self._pending = {}
+        self.conn.close()
+
+
+# pyodbc connection to the SQL Server instance of login (default MSSQL_LOGIN)
+def connect_mssql(login=MSSQL_LOGIN):
+    import pyodbc
+
+    if login['username']:
+        auth = f"UID={login['username']};PWD={login['password']};"
+    else:
+        auth = "Trusted_Connection=yes;"
+    return pyodbc.connect(
+        f"DRIVER={{ODBC Driver 17 for SQL Server}};SERVER={login['server']};DATABASE={login['database']};{auth}"
+    )
+
+
+# Open a storage session on the configured backend
+def open_storage(backend=None, path=None):
+    backend = backend or DEFAULT_BACKEND
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown storage backend '{backend}', expected one of {BACKENDS}")
+
+    if backend == 'mssql':
+        return SqlStorage(connect_mssql(), bcp_login=MSSQL_LOGIN)
+
+    path = path or os.environ.get('STORAGE_PATH') or DEFAULT_PATHS[backend]
+    if backend == 'sqlite':
+        # Sessions may be handed between threads by the pool (storage_pool.py), one thread at a time
+        return LocalSqlStorage(sqlite3.connect(path, check_same_thread=False), path=os.path.abspath(path))
+    if backend == 'duckdb':
+        import duckdb
+
+        return LocalSqlStorage(duckdb.connect(path), path=os.path.abspath(path))
+    return ParquetStorage(path)
@@ -0,0 +1,139 @@
+# Bounded pool of storage sessions shared by the generator threads. Opening a SQL Server session is a TLS
+# handshake plus a login to RDS, which used to happen on every real-time tick; pooled sessions are opened
+# once and reused. get() is a drop-in storage_factory: the session it returns goes back to the pool on
+# close() (rolled back first) instead of disconnecting.
+# Sessions idle for longer than ping_after seconds are health-checked with a trivial query before being
+# handed out, and sessions older than recycle seconds are replaced.
+import logging
+import os
+import threading
+import time
+
+from storage import open_storage
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_POOL_SIZE = int(os.environ.get('POOL_SIZE', 10))
+DEFAULT_POOL_TIMEOUT = float(os.environ.get('POOL_TIMEOUT', 30))
+DEFAULT_POOL_RECYCLE = float(os.environ.get('POOL_RECYCLE', 1800))
+DEFAULT_POOL_PING_AFTER = float(os.environ.get('POOL_PING_AFTER', 30))
+
+
+class PooledStorage:
+    # Wraps a storage session; everything except close() is passed through
+    def __init__(self, pool, storage, opened):
+        self._pool = pool
+        self._storage = storage
+        self._opened = opened
+
+    def __getattr__(self, name):
+        return getattr(self._storage, name)
+
+    # Return the session to the pool (only the first call counts)
+    def close(self):
+        pool, self._pool = self._pool, None
+        if pool is not None:
+            pool._release(self._storage, self._opened)
+
+
+class StoragePool:
+    # max_size bounds the number of open sessions; get() waits up to timeout seconds for one to come back
+    def __init__(self, storage_factory=open_storage, max_size=DEFAULT_POOL_SIZE, timeout=DEFAULT_POOL_TIMEOUT,
+                 recycle=DEFAULT_POOL_RECYCLE, ping_after=DEFAULT_POOL_PING_AFTER):
+        self.storage_factory = storage_factory
+        self.max_size = max_size
+        self.timeout = timeout
+        self.recycle = recycle
+        self.ping_after = ping_after
+        self._slots = threading.BoundedSemaphore(max_size)
+        self._lock = threading.Lock()
+        self._idle = []  # (storage, opened, returned) with the most recently returned last
+        self._in_use = 0
+        self.counters = {'opened': 0, 'reused': 0, 'discarded': 0, 'failed_pings': 0, 'waits': 0, 'timeouts': 0}
+
+    # Check out a session; close() on it returns it to the pool
+    def get(self):
+        if not self._slots.acquire(blocking=False):
+            self._count('waits')
+            if not self._slots.acquire(timeout=self.timeout):
+                self._count('timeouts')
+                raise TimeoutError(f"No storage session available within {self.timeout}s "
+                                   f"(pool size {self.max_size})")
+        try:
+            storage, opened = self._checkout()
+        except Exception:
+            self._slots.release()
+            raise
+        with self._lock:
+            self._in_use += 1
+        return PooledStorage(self, storage, opened)
+
+    def _checkout(self):
+        while True:
+            with self._lock:
+                if not self._idle:
+                    break
+                storage, opened, returned = self._idle.pop()
+            now = time.monotonic()
+            if now - opened > self.recycle:
+                self._discard(storage, 'recycled')
+                continue
+            if now - returned > self.ping_after and not self._ping(storage):
+                self._count('failed_pings')
+                self._discard(storage, 'failed health check')
+                continue
+            # Stations added to the registry since the session was opened get their tables
+            storage.ensure_schema()
+            self._count('reused')
+            return storage, opened
+
+        storage = self.storage_factory()
+        self._count('opened')
+        logger.debug(f"Opened pooled storage session ({self.counters['opened']} so far)")
+        return storage, time.monotonic()
+
+    def _ping(self, storage):
+        try:
+            storage.ping()
+            return True
+        except Exception as e:
+            logger.warning(f"Pooled storage session failed health check: {str(e)}")
+            return False
+
+    def _count(self, counter):
+        with self._lock:
+            self.counters[counter] += 1
+
+    def _discard(self, storage, reason):
+        self._count('discarded')
+        logger.debug(f"Discarding pooled storage session ({reason})")
+        try:
+            storage.close()
+        except Exception as e:
+            logger.debug(f"Error closing discarded session: {str(e)}")
+
+    def _release(self, storage, opened):
+        try:
+            # Uncommitted work is never carried over to the next borrower
+            storage.rollback()
+        except Exception as e:
+            logger.warning(f"Rollback failed on returned session, discarding it: {str(e)}")
+            self._discard(storage, 'rollback failed')
+        else:
+            with self._lock:
+                self._idle.append((storage, opened, time.monotonic()))
+        finally:
+            with self._lock:
+                self._in_use -= 1
+            self._slots.release()
+
+    # Close every idle session (e.g. on shutdown)
+    def dispose(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for storage, _, _ in idle:
+            self._discard(storage, 'pool disposed')
+
+    def stats(self):
+        with self._lock:
+            return {'max_size': self.max_size, 'in_use': self._in_use, 'idle': len(self._idle), **self.counters}
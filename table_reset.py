@@ -0,0 +1,89 @@
+# Fast table resets. Emptying a table is a TRUNCATE (page deallocation, minimal logging) instead of
+# SELECT COUNT(*) + DELETE; a full reload goes into staging copies that are renamed into place in one
+# transaction, so readers see either the old data or the new data, never a half-loaded table.
+import logging
+
+from bulk_load import connection_cursor, detect_dialect
+
+logger = logging.getLogger(__name__)
+
+STAGING_SUFFIX = '_staging'
+RETIRED_SUFFIX = '_retired'
+
+
+# Empty the tables. Falls back to DELETE where TRUNCATE is refused (e.g. a table referenced by a foreign key).
+def reset_tables(conn, tables):
+    dialect = detect_dialect(conn)
+    with connection_cursor(conn) as cursor:
+        for table in tables:
+            if dialect == 'sqlite':
+                # SQLite has no TRUNCATE; an unqualified DELETE uses its truncate optimisation
+                cursor.execute(f"DELETE FROM {table}")
+            else:
+                try:
+                    cursor.execute(f"TRUNCATE TABLE {table}")
+                except Exception as e:
+                    logger.warning(f"TRUNCATE refused for {table}, deleting rows instead: {str(e)}")
+                    conn.rollback()
+                    cursor.execute(f"DELETE FROM {table}")
+            conn.commit()
+            logger.info(f"Reset {table}")
+
+
+def _begin(cursor, dialect):
+    # pyodbc already runs inside a transaction; SQLite/DuckDB need it opened for DDL
+    if dialect != 'mssql':
+        cursor.execute("BEGIN TRANSACTION")
+
+
+def _rename(cursor, dialect, table, new_name):
+    if dialect == 'mssql':
+        cursor.execute(f"EXEC sp_rename '{table}', '{new_name}'")
+    else:
+        cursor.execute(f"ALTER TABLE {table} RENAME TO {new_name}")
+
+
+# Empty copy of table's columns to load into; any leftover from an interrupted reload is dropped first
+def create_staging_table(conn, table):
+    dialect = detect_dialect(conn)
+    staging = table + STAGING_SUFFIX
+    with connection_cursor(conn) as cursor:
+        cursor.execute(f"DROP TABLE IF EXISTS {staging}")
+        if dialect == 'mssql':
+            cursor.execute(f"SELECT TOP 0 * INTO {staging} FROM {table}")
+        else:
+            cursor.execute(f"CREATE TABLE {staging} AS SELECT * FROM {table} LIMIT 0")
+    conn.commit()
+    return staging
+
+
+def drop_tables(conn, tables):
+    with connection_cursor(conn) as cursor:
+        for table in tables:
+            cursor.execute(f"DROP TABLE IF EXISTS {table}")
+    conn.commit()
+
+
+# Rename every staging table over its live table in a single transaction, then drop the old data
+def swap_tables(conn, tables):
+    dialect = detect_dialect(conn)
+    with connection_cursor(conn) as cursor:
+        if dialect == 'sqlite':
+            # Keep views bound to the live table name instead of following the rename to the retired copy
+            cursor.execute("PRAGMA legacy_alter_table = ON")
+        try:
+            _begin(cursor, dialect)
+            for table in tables:
+                _rename(cursor, dialect, table, table + RETIRED_SUFFIX)
+                _rename(cursor, dialect, table + STAGING_SUFFIX, table)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            if dialect == 'sqlite':
+                cursor.execute("PRAGMA legacy_alter_table = OFF")
+
+    drop_tables(conn, [table + RETIRED_SUFFIX for table in tables])
+    logger.info(f"Swapped in {len(tables)} reloaded tables")
+
@@ -0,0 +1,33 @@
+import os
+import sys
+from functools import partial
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# The modules live at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from energy_generator import build_timestamps, generate_energy_batch  # noqa: E402
+from storage import open_storage  # noqa: E402
+
+
+@pytest.fixture
+def sqlite_path(tmp_path):
+    return str(tmp_path / 'energy.sqlite')
+
+
+# storage_factory for a fresh SQLite database (the tables are created on the first open)
+@pytest.fixture
+def storage_factory(sqlite_path):
+    factory = partial(open_storage, 'sqlite', sqlite_path)
+    factory().close()
+    return factory
+
+
+# Every working minute from first_day to last_day (inclusive) of a station, drawn from a seeded stream
+def station_frame(config, first_day, last_day, seed=1, cumulative_reading=False):
+    timestamps = build_timestamps(pd.Timestamp(first_day), pd.Timestamp(last_day) + pd.Timedelta(hours=23, minutes=59))
+    return generate_energy_batch(config, timestamps, rng=np.random.default_rng(seed),
+                                 cumulative_reading=cumulative_reading)
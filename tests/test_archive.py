@@ -0,0 +1,76 @@
+import pandas as pd
+import pytest
+
+from archive import archive_closed_days, daily_aggregates, monthly_aggregates, read_archive
+from conftest import station_frame
+from station_config import registry
+
+MELTING = registry.stations['Melting']
+
+
+def normalised(frame):
+    frame = frame.copy()
+    frame['Date'] = frame['Date'].astype(str)
+    frame['Time'] = frame['Time'].astype(str)
+    return frame.reset_index(drop=True)
+
+
+@pytest.fixture
+def stored(storage_factory):
+    storage = storage_factory()
+    storage.load(MELTING['name'], station_frame(MELTING, '2025-04-28', '2025-05-03'))
+    yield storage
+    storage.close()
+
+
+def test_archive_round_trip_is_lossless(stored, tmp_path):
+    root = str(tmp_path / 'archive')
+    archived = archive_closed_days(stored, '2025-04-28', '2025-05-03', tables=[MELTING['name']], root=root)
+    rows = stored.read_sql(f"SELECT * FROM {MELTING['name']} ORDER BY ID")
+    assert archived == {MELTING['name']: len(rows)}
+
+    restored = read_archive(MELTING['name'], '2025-04-28', '2025-05-03', root=root)
+    pd.testing.assert_frame_equal(normalised(restored), normalised(rows), check_dtype=False, rtol=0, atol=1e-9)
+
+    # Archiving again adds nothing
+    assert archive_closed_days(stored, '2025-04-28', '2025-05-03', tables=[MELTING['name']], root=root) == \
+        {MELTING['name']: 0}
+
+
+def test_archive_aggregates_match_the_database(stored, tmp_path):
+    root = str(tmp_path / 'archive')
+    archive_closed_days(stored, '2025-04-28', '2025-05-03', tables=[MELTING['name']], root=root)
+
+    expected = stored.read_sql(f"SELECT Date, SUM(\"Consumption (KVAH)\") AS Total, MAX(\"Power (KW)\") AS Peak "
+                               f"FROM {MELTING['name']} GROUP BY Date ORDER BY Date")
+    daily = daily_aggregates(MELTING['name'], '2025-04-28', '2025-05-03', root=root)
+    assert list(daily['Date'].astype(str)) == list(expected['Date'].astype(str))
+    assert daily['Consumption (KVAH) sum'].to_numpy() == pytest.approx(expected['Total'].to_numpy())
+    assert daily['Power (KW) max'].to_numpy() == pytest.approx(expected['Peak'].to_numpy())
+
+    monthly = monthly_aggregates(MELTING['name'], '2025-04-28', '2025-05-03', root=root).set_index('Month')
+    assert monthly.loc['2025-05', 'Rows'] == daily.loc[daily['Date'].astype(str) >= '2025-05-01', 'Rows'].sum()
+
+
+def test_days_whose_rows_changed_are_archived_again(storage_factory, tmp_path):
+    root = str(tmp_path / 'archive')
+    frame = station_frame(MELTING, '2025-04-28', '2025-04-30')
+    afternoon = (frame['Timestamp'].dt.normalize() == '2025-04-29') & (frame['Timestamp'].dt.hour >= 13)
+    storage = storage_factory()
+    try:
+        storage.load(MELTING['name'], frame[~afternoon])
+        archive_closed_days(storage, '2025-04-28', '2025-04-30', tables=[MELTING['name']], root=root)
+
+        # A gap fill stores the missing afternoon of the 29th after it was archived
+        storage.load(MELTING['name'], frame[afternoon])
+        assert archive_closed_days(storage, '2025-04-28', '2025-04-30', tables=[MELTING['name']], root=root) == \
+            {MELTING['name']: int((frame['Timestamp'].dt.normalize() == '2025-04-29').sum())}
+
+        rows = storage.read_sql(f"SELECT * FROM {MELTING['name']} ORDER BY Date, Time")
+    finally:
+        storage.close()
+    restored = read_archive(MELTING['name'], '2025-04-28', '2025-04-30', root=root)
+    pd.testing.assert_frame_equal(normalised(restored.sort_values(['Date', 'Time'])), normalised(rows),
+                                  check_dtype=False, rtol=0, atol=1e-9)
+    assert list(daily_aggregates(MELTING['name'], '2025-04-28', '2025-04-30', root=root)['Rows']) == \
+        list(rows.groupby('Date').size())
@@ -0,0 +1,36 @@
+import random
+import time
+from datetime import datetime
+
+import pandas as pd
+
+from async_ingest import AsyncIngestService
+from id_allocator import IdAllocator
+from sim_clock import VirtualClock
+from station_config import registry
+
+
+def test_async_ingest_ids_follow_time_with_concurrent_writers(storage_factory):
+    class SlowIds(IdAllocator):
+        # Uneven latency on every allocation, so concurrent batches would race for their IDs
+        def take(self, table, count=1):
+            time.sleep(random.random() * 0.01)
+            return super().take(table, count)
+
+    random.seed(5)
+    service = AsyncIngestService(storage_factory=storage_factory, clock=VirtualClock(datetime(2025, 5, 5, 10, 0), 6000),
+                                 batch_size=3, writers=4, flush_interval=0.01, ids=SlowIds(storage_factory))
+    service.start()
+    time.sleep(1)
+    service.stop(30)
+
+    storage = storage_factory()
+    try:
+        for config in registry.stations.values():
+            rows = storage.read_sql(f"SELECT ID, Date, Time FROM {config['name']} ORDER BY ID")
+            assert len(rows) > 5
+            assert rows['ID'].is_unique
+            stamps = pd.to_datetime(rows['Date'].astype(str) + ' ' + rows['Time'].astype(str))
+            assert stamps.is_monotonic_increasing
+    finally:
+        storage.close()
@@ -0,0 +1,74 @@
+import json
+from datetime import date
+
+import pytest
+
+import backfill
+from storage import open_storage
+
+START = date(2025, 4, 21)
+
+
+def table_rows(path, table='Melting_Energy'):
+    storage = open_storage('sqlite', path)
+    try:
+        return storage.read_sql(f"SELECT * FROM {table} ORDER BY ID")
+    finally:
+        storage.close()
+
+
+def test_backfill_resumes_and_extends_to_a_later_end_date(tmp_path, monkeypatch):
+    path, checkpoint = str(tmp_path / 'energy.sqlite'), str(tmp_path / 'checkpoint.json')
+    options = dict(clear=True, seed=7, workers=2, shard_days=3, checkpoint_path=checkpoint, backend='sqlite', path=path)
+
+    write_shard = backfill._write_shard
+    calls = []
+
+    def crash_on_third(storage, task, chunks):
+        calls.append(task[0])
+        if len(calls) == 3:
+            raise RuntimeError('worker crashed')
+        return write_shard(storage, task, chunks)
+
+    monkeypatch.setattr(backfill, '_write_shard', crash_on_third)
+    with pytest.raises(RuntimeError):
+        backfill.run_backfill(START, date(2025, 5, 2), **options)
+    with open(checkpoint) as f:
+        completed = json.load(f)['completed']
+    assert len(completed) == 2
+
+    # Restarted on a later day: the same run continues up to the new end date
+    monkeypatch.setattr(backfill, '_write_shard', write_shard)
+    progress = backfill.run_backfill(START, date(2025, 5, 6), **options)
+    # The last shard (2025-05-01, 2025-05-02) grows with the later end date and is redone if it was done
+    assert progress.resumed_shards == len(set(completed) - {'2025-05-01'})
+
+    reference = str(tmp_path / 'reference.sqlite')
+    backfill.run_backfill(START, date(2025, 5, 6), **{**options, 'workers': 1, 'path': reference,
+                                                       'checkpoint_path': checkpoint + '.reference'})
+    resumed = table_rows(path)
+    assert resumed['ID'].is_unique
+    assert resumed.equals(table_rows(reference))
+
+
+def test_append_backfill_resumes_within_its_reserved_ids(tmp_path, monkeypatch):
+    path, checkpoint = str(tmp_path / 'energy.sqlite'), str(tmp_path / 'checkpoint.json')
+    options = dict(seed=3, workers=1, shard_days=2, checkpoint_path=checkpoint, backend='sqlite', path=path)
+
+    write_shard = backfill._write_shard
+
+    def crash_on_second(storage, task, chunks):
+        if task[0] != str(START):
+            raise RuntimeError('crashed')
+        return write_shard(storage, task, chunks)
+
+    monkeypatch.setattr(backfill, '_write_shard', crash_on_second)
+    with pytest.raises(RuntimeError):
+        backfill.run_backfill(START, date(2025, 4, 26), **options)
+
+    monkeypatch.setattr(backfill, '_write_shard', write_shard)
+    backfill.run_backfill(START, date(2025, 5, 10), **options)
+    rows = table_rows(path)
+    assert rows['ID'].is_unique
+    # The reserved ID block covers the checkpointed range only, so the run ends there
+    assert str(rows['Date'].max()) == '2025-04-26'
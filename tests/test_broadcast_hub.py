@@ -0,0 +1,70 @@
+import threading
+import time
+from datetime import datetime
+
+from broadcast_hub import BroadcastHub, encode_frame
+from sim_clock import VirtualClock
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+class Screen:
+    # Disconnects after the greeting and two updates
+    def __init__(self):
+        self.frames = []
+
+    def send(self, frame):
+        self.frames.append(frame)
+        if len(self.frames) == 3:
+            raise ConnectionError('screen closed')
+
+
+class NullStorage:
+    def close(self):
+        pass
+
+
+def serve(hub, screen):
+    try:
+        hub.serve(screen)
+    except ConnectionError:
+        pass
+
+
+def test_every_screen_gets_the_same_update_from_one_query():
+    polls = []
+
+    def compute(storage):
+        polls.append(storage)
+        return [('power', {'poll': len(polls)})]
+
+    clock = VirtualClock(datetime(2025, 5, 5, 10), speed=None)
+    hub = BroadcastHub(NullStorage, compute=compute, interval=5, clock=clock)
+    screens = [Screen() for _ in range(3)]
+    threads = [threading.Thread(target=serve, args=(hub, screen)) for screen in screens]
+    try:
+        for thread in threads:
+            thread.start()
+        assert wait_for(lambda: hub.subscribers() == 3 and len(polls) == 1)
+        clock.advance(5)
+        for thread in threads:
+            thread.join(5)
+        assert hub.subscribers() == 0
+
+        # Nobody is watching: the poller stops querying
+        clock.advance(60)
+        time.sleep(0.1)
+        assert len(polls) == 2
+    finally:
+        hub.stop(5)
+
+    greeting = encode_frame('connection_established', {'message': 'WebSocket connection established successfully'})
+    expected = [greeting, encode_frame('power', {'poll': 1}), encode_frame('power', {'poll': 2})]
+    assert all(screen.frames == expected for screen in screens)
+    # The send that failed on disconnect is not counted
+    assert hub.stats['frames_sent'] == 3
@@ -0,0 +1,35 @@
+import pandas as pd
+import pytest
+
+from bulk_load import BulkLoader
+from conftest import station_frame
+from energy_generator import expand_for_db
+from station_config import registry
+from storage import open_storage
+
+MELTING = registry.stations['Melting']
+
+
+@pytest.mark.parametrize('backend, method, probed', [
+    ('sqlite', 'values', 'values'),
+    ('sqlite', 'executemany', 'values'),
+    ('duckdb', 'dataframe', 'dataframe'),
+    ('duckdb', 'values', 'dataframe'),
+])
+def test_every_load_path_stores_the_frame(tmp_path, backend, method, probed):
+    frame = station_frame(MELTING, '2025-04-28', '2025-04-29')
+    storage = open_storage(backend, str(tmp_path / f"energy.{backend}"))
+    try:
+        assert BulkLoader(storage.conn).method_for(MELTING['name']) == probed
+        # Chunks smaller than the frame and not a multiple of the VALUES statement size
+        loader = BulkLoader(storage.conn, method=method, chunk_size=777)
+        stats = loader.load(MELTING['name'], frame)
+        assert (stats.method, stats.rows) == (method, len(frame))
+
+        stored = storage.read_sql(f"SELECT * FROM {MELTING['name']} ORDER BY ID")
+    finally:
+        storage.close()
+    expected = expand_for_db(frame)
+    strings = {column: str for column in expected.columns if expected[column].dtype in ('category', object)}
+    strings.update(Date=str, Time=str)
+    pd.testing.assert_frame_equal(stored.astype(strings), expected.astype(strings), check_dtype=False)
@@ -0,0 +1,36 @@
+from datetime import datetime
+
+import pytest
+
+import sim_clock
+from dashboard_queries import (current_power, dashboard_events, latest_energy_data, month_consumption,
+                               month_consumption_per_tonne, power_view, today_consumption, today_production)
+from sim_clock import VirtualClock
+from simulation import stream_simulation
+from storage import open_storage
+
+
+@pytest.fixture(params=['sqlite', 'duckdb', 'parquet'])
+def storage(request, tmp_path, monkeypatch):
+    monkeypatch.setattr(sim_clock, '_clock', VirtualClock(datetime(2025, 5, 6, 12), speed=None))
+    storage = open_storage(request.param, str(tmp_path / f"energy.{request.param}"))
+    stream_simulation('2025-04-24', '2025-05-06', storage=storage, seed=2)
+    yield storage
+    storage.close()
+
+
+def test_the_batched_update_matches_the_single_queries(storage):
+    events = dict(dashboard_events(storage))
+    assert events['latest_energy_data'] == latest_energy_data(storage)
+    assert events['current_power'] == {'TotalPower': current_power(storage)}
+    assert events['today_data'] == {'TodayConsumption': today_consumption(storage),
+                                    'TodayProduction': today_production(storage)}
+    assert events['power_view'] == power_view(storage)
+    assert events['monthly_data'] == {'ThisMonthConsumption': month_consumption(storage),
+                                      'PreviousMonthConsumption': month_consumption(storage, 1)}
+    assert events['consumption_per_tonne'] == {
+        'ThisMonthConsumptionPerTonne': month_consumption_per_tonne(storage),
+        'PreviousMonthConsumptionPerTonne': month_consumption_per_tonne(storage, 1)
+    }
+    # Both months hold data, so none of the KPIs fell back to 0
+    assert all(events['monthly_data'].values()) and all(events['consumption_per_tonne'].values())
@@ -0,0 +1,50 @@
+import pandas as pd
+import pytest
+
+from conftest import station_frame
+from gap_fill import fill_gaps, missing_rows
+from station_config import registry
+from storage import dashboard_view_sql, open_storage
+
+LADDLE = registry.stations['Laddle']
+
+
+@pytest.fixture(params=['sqlite', 'duckdb', 'parquet'])
+def storage(request, tmp_path):
+    storage = open_storage(request.param, str(tmp_path / f"energy.{request.param}"))
+    yield storage
+    storage.close()
+
+
+def test_missing_rows_fills_every_gap_after_the_stored_ids(storage):
+    stored = station_frame(LADDLE, '2025-04-21', '2025-04-23')
+    day = stored['Timestamp'].dt.normalize()
+    # 21st stored, 22nd missing, 23rd stored until 13:00
+    kept = stored[(day == '2025-04-21') | ((day == '2025-04-23') & (stored['Timestamp'].dt.hour < 13))]
+    storage.load(LADDLE['name'], kept)
+
+    rows = missing_rows(storage, LADDLE['name'], station_frame(LADDLE, '2025-04-21', '2025-04-23', seed=2))
+    assert list(rows['Timestamp']) == list(stored.loc[~stored.index.isin(kept.index), 'Timestamp'])
+    first_id = kept['ID'].max() + 1
+    assert list(rows['ID']) == list(range(first_id, first_id + len(rows)))
+
+
+def test_latest_views_pick_the_newest_minute_after_a_gap_fill(storage):
+    for config in registry.stations.values():
+        frame = station_frame(config, '2025-04-21', '2025-04-26')
+        storage.load(config['name'], frame[frame['Timestamp'] >= pd.Timestamp('2025-04-25')])
+    # The filled days get IDs above the live rows
+    fill_gaps(pd.Timestamp('2025-04-21'), end=pd.Timestamp('2025-04-25'), storage=storage, seed=3)
+
+    latest = storage.read_sql("SELECT Date, Time FROM Latest_AllEnergy_Readings_View")
+    assert set(latest['Date'].astype(str) + ' ' + latest['Time'].astype(str)) == {'2025-04-26 17:59:00'}
+    last9 = storage.read_sql("SELECT Date, Time FROM Last9_Energy_Readings_Vw")
+    assert set(last9['Date'].astype(str)) == {'2025-04-26'}
+    assert len(last9) == 9 * len(registry.stations)
+
+
+def test_sql_server_views_pick_the_newest_minute_by_time():
+    views = dashboard_view_sql(dialect='mssql')
+    for view in ['Latest_AllEnergy_Readings_View', 'Last9_Energy_Readings_Vw']:
+        assert 'MAX(ID)' not in views[view]
+        assert views[view].count('ORDER BY [Date] DESC, [Time] DESC, ID DESC') == len(registry.stations)
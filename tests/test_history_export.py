@@ -0,0 +1,31 @@
+import pandas as pd
+
+from conftest import station_frame
+from history_export import export_table, read_history
+from station_config import registry
+
+LADDLE = registry.stations['Laddle']
+
+
+def test_changed_days_are_exported_again(storage_factory, tmp_path):
+    root = str(tmp_path / 'export')
+    frame = station_frame(LADDLE, '2025-04-28', '2025-04-30')
+    afternoon = (frame['Timestamp'].dt.normalize() == '2025-04-29') & (frame['Timestamp'].dt.hour >= 13)
+    storage = storage_factory()
+    try:
+        storage.load(LADDLE['name'], frame[~afternoon])
+        assert export_table(storage, LADDLE['name'], '2025-04-28', '2025-04-30', root=root) == 3
+        assert export_table(storage, LADDLE['name'], '2025-04-28', '2025-04-30', root=root) == 0
+
+        # A gap fill stores the missing afternoon of the 29th after it was exported
+        storage.load(LADDLE['name'], frame[afternoon])
+        assert export_table(storage, LADDLE['name'], '2025-04-28', '2025-04-30', root=root) == 1
+        rows = storage.read_sql(f"SELECT ID, Date, Time FROM {LADDLE['name']} ORDER BY ID")
+    finally:
+        storage.close()
+
+    exported = read_history(LADDLE['name'], '2025-04-28', '2025-04-30', columns=['ID', 'Date', 'Time'], root=root)
+    assert list(exported['ID']) == list(rows['ID'])
+    assert list(exported['Date'].astype(str)) == list(rows['Date'].astype(str))
+    assert len(exported) == len(frame)
+    assert list(pd.Series(exported['Time']).astype(str)) == list(rows['Time'].astype(str))
@@ -0,0 +1,25 @@
+import threading
+
+from id_allocator import IdAllocator
+
+
+def test_allocators_never_hand_out_the_same_id(storage_factory):
+    # Two allocators stand in for two processes sharing the high-water mark
+    allocators = [IdAllocator(storage_factory, block_size=50) for _ in range(2)]
+    taken = []
+    lock = threading.Lock()
+
+    def take(allocator):
+        for _ in range(40):
+            ids = allocator.take('Laddle_Energy', 7)
+            with lock:
+                taken.extend(ids)
+
+    threads = [threading.Thread(target=take, args=(allocator,)) for allocator in allocators for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(taken) == 2 * 4 * 40 * 7
+    assert len(set(taken)) == len(taken)
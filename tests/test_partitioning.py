@@ -0,0 +1,47 @@
+import os
+from datetime import date
+
+from conftest import station_frame
+from partitioning import month_boundaries
+from station_config import registry
+from storage import open_storage
+
+LADDLE = registry.stations['Laddle']
+
+
+def test_month_boundaries_run_ahead_of_the_last_day():
+    assert month_boundaries('2024-11-20', '2025-01-03', months_ahead=2) == \
+        [date(2024, 11, 1), date(2024, 12, 1), date(2025, 1, 1), date(2025, 2, 1), date(2025, 3, 1)]
+
+
+def test_parquet_reads_skip_the_partitions_outside_the_date_filter(tmp_path):
+    root = str(tmp_path / 'energy_parquet')
+    storage = open_storage('parquet', root)
+    try:
+        storage.load(LADDLE['name'], station_frame(LADDLE, '2025-04-28', '2025-05-02'))
+        partitions = sorted(os.listdir(os.path.join(root, LADDLE['name'])))
+        assert partitions == [f"Date=2025-0{day}" for day in ('4-28', '4-29', '4-30', '5-01', '5-02')]
+
+        rows = storage.read_sql(f"SELECT Date, COUNT(*) AS Readings FROM {LADDLE['name']} "
+                                f"WHERE Date >= ? GROUP BY Date ORDER BY Date", ('2025-05-01',))
+        assert list(rows['Date'].astype(str)) == ['2025-05-01', '2025-05-02']
+        # Only the two partitions the filter keeps are scanned
+        plan = storage.conn.execute(f"EXPLAIN ANALYZE SELECT COUNT(*) FROM {LADDLE['name']} "
+                                    f"WHERE Date >= DATE '2025-05-01'").fetchall()[0][1]
+        assert 'Scanning Files: 2/5' in plan
+        latest = storage.read_sql("SELECT Date, Time FROM Last9_Energy_Readings_Vw")
+        assert set(latest['Date'].astype(str)) == {'2025-05-02'}
+    finally:
+        storage.close()
+
+
+def test_sqlite_tables_get_a_date_index(sqlite_path):
+    storage = open_storage('sqlite', sqlite_path)
+    try:
+        indexes = storage.read_sql("SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = ?",
+                                   (LADDLE['name'],))
+        plan = storage.read_sql(f"EXPLAIN QUERY PLAN SELECT * FROM {LADDLE['name']} WHERE Date = ?", ('2025-05-01',))
+    finally:
+        storage.close()
+    assert list(indexes['name']) == [f"ix_{LADDLE['name']}_date"]
+    assert plan['detail'].str.contains('USING INDEX').any()
@@ -0,0 +1,47 @@
+from datetime import date, datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from energy_generator import build_timestamps, generate_melting_prod_batch
+import realtime_samples
+from realtime_samples import build_melting_prod_insert, resume_metal_totals
+from station_config import registry
+
+MELTING_PROD = registry.melting_prod
+
+
+# Running totals left by other tests' samples
+@pytest.fixture(autouse=True)
+def fresh_totals(monkeypatch):
+    monkeypatch.setattr(realtime_samples, '_metal_totals', {})
+
+
+def test_real_time_metal_accumulates_like_the_batch_generator():
+    # 09:00 to 10:00 of one day and the first charge of the next day
+    samples = [build_melting_prod_insert(MELTING_PROD, datetime(2025, 5, 5, 9) + pd.Timedelta(minutes=m))
+               for m in range(61)]
+    samples.append(build_melting_prod_insert(MELTING_PROD, datetime(2025, 5, 6, 9)))
+    planned = [row['Cumulative Planned Metal (kg)'] for row in samples]
+    assert planned[0] == MELTING_PROD['planned_metal_per_hour']
+    assert planned[59] == planned[0]
+    assert planned[60] == 2 * planned[0]
+    # A new day starts from its own first charge
+    assert planned[61] == planned[0]
+
+
+def test_real_time_metal_continues_the_stored_day(storage_factory):
+    timestamps = build_timestamps(pd.Timestamp('2025-05-05'), pd.Timestamp('2025-05-05 23:59'))
+    batch = generate_melting_prod_batch(MELTING_PROD, timestamps, rng=np.random.default_rng(1))
+    storage = storage_factory()
+    try:
+        storage.load(MELTING_PROD['name'], batch[batch['Timestamp'] < pd.Timestamp('2025-05-05 12:00')])
+        resume_metal_totals(storage, MELTING_PROD, date(2025, 5, 5))
+    finally:
+        storage.close()
+
+    stored = batch[batch['Timestamp'] < pd.Timestamp('2025-05-05 12:00')]
+    row = build_melting_prod_insert(MELTING_PROD, datetime(2025, 5, 5, 12))
+    assert row['Cumulative Planned Metal (kg)'] == pytest.approx(
+        stored['Cumulative Planned Metal (kg)'].max() + MELTING_PROD['planned_metal_per_hour'])
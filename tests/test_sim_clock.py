@@ -0,0 +1,40 @@
+import time
+from datetime import datetime
+
+import pandas as pd
+
+from sim_clock import VirtualClock
+from tick_scheduler import replay
+
+START = datetime(2025, 5, 5, 10, 0)
+
+
+def test_virtual_time_runs_speed_times_faster():
+    clock = VirtualClock(START, speed=600)
+    started = time.monotonic()
+    clock.sleep(60)
+    assert time.monotonic() - started < 1
+    assert clock.now() >= datetime(2025, 5, 5, 10, 1)
+
+    stopped = VirtualClock(START, speed=None)
+    time.sleep(0.05)
+    assert stopped.now() == START
+    stopped.advance_to(datetime(2025, 5, 5, 11, 30))
+    assert stopped.now() == datetime(2025, 5, 5, 11, 30)
+    assert stopped.today() == START.date()
+
+
+def test_replay_inserts_each_minute_when_virtual_time_reaches_it():
+    timestamps = pd.date_range('2025-05-05 09:58', '2025-05-05 10:05', freq='min')
+    frame = pd.DataFrame({'Timestamp': timestamps})
+    clock = VirtualClock(START, speed=3000)
+    batches = []
+
+    def insert(rows):
+        batches.append((clock.now(), list(rows['Timestamp'])))
+
+    replay(frame, timestamps, insert, clock=clock)
+    # Minutes already due go in at once, the rest one tick at a time, never before virtual time reaches them
+    assert batches[0][1] == list(timestamps[:3])
+    assert [rows for _, rows in batches[1:]] == [[stamp] for stamp in timestamps[3:]]
+    assert all(now >= rows[-1] for now, rows in batches)
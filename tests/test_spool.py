@@ -0,0 +1,89 @@
+from datetime import datetime
+
+from realtime_samples import build_energy_insert
+from spool import Spool
+from station_config import registry
+from write_behind import WriteBehindQueue
+
+TABLES = ['Laddle', 'Moulding']
+
+
+def tick_rows(hour, minutes):
+    return [[(registry.stations[key]['name'], build_energy_insert(registry.stations[key], datetime(2025, 5, 5, hour, minute)))
+             for key in TABLES] for minute in minutes]
+
+
+def test_spool_replays_after_a_crash_without_duplicates(tmp_path, storage_factory):
+    directory = str(tmp_path / 'spool')
+    queue = WriteBehindQueue(batch_size=20, storage_factory=storage_factory, spool=Spool(directory, segment_rows=30))
+    for rows in tick_rows(10, range(10)):
+        queue.put_many(rows)
+
+    # Crash between commit and acknowledgement: the first batch is in the database but still spooled
+    queue.spool.ack = lambda token: None
+    assert queue.flush() == 20
+    # Queued after the last flush and never written
+    for rows in tick_rows(11, range(30)):
+        queue.put_many(rows)
+
+    replay = WriteBehindQueue(batch_size=20, storage_factory=storage_factory, spool=Spool(directory, segment_rows=30))
+    assert replay.depth() == 80
+    while replay.flush():
+        pass
+    assert replay.depth() == 0
+
+    storage = storage_factory()
+    try:
+        for key in TABLES:
+            rows = storage.read_sql(f"SELECT ID, Date, Time FROM {registry.stations[key]['name']}")
+            assert len(rows) == 40
+            assert not rows.duplicated(['Date', 'Time']).any()
+            assert rows['ID'].is_unique
+    finally:
+        storage.close()
+
+
+def test_spool_keeps_rows_while_the_database_is_down(tmp_path, storage_factory):
+    def down():
+        raise ConnectionError('database unreachable')
+
+    queue = WriteBehindQueue(batch_size=10, storage_factory=down, spool=Spool(str(tmp_path / 'spool')))
+    for rows in tick_rows(10, range(5)):
+        queue.put_many(rows)
+    try:
+        queue.flush()
+    except ConnectionError:
+        pass
+    assert queue.depth() == 10
+
+    queue.storage_factory = storage_factory
+    queue.ids.storage_factory = storage_factory
+    while queue.flush():
+        pass
+    assert queue.depth() == 0
+    storage = storage_factory()
+    try:
+        assert len(storage.read_sql("SELECT ID FROM Laddle_Energy")) == 5
+    finally:
+        storage.close()
+
+
+def test_corrupt_lines_leave_the_spool_depth(tmp_path):
+    directory = str(tmp_path / 'spool')
+    spool = Spool(directory)
+    spool.append(tick_rows(10, range(2))[0] + tick_rows(10, range(2))[1])
+    spool.close()
+    path = f"{directory}/{1:012d}.log"
+    with open(path, 'rb') as f:
+        lines = f.readlines()
+    lines[1] = b'{not json\n'
+    with open(path, 'wb') as f:
+        f.writelines(lines + [b'{also not json\n'])
+
+    spool = Spool(directory)
+    assert spool.depth() == 5
+    token, batch, _ = spool.read(10)
+    assert len(batch) == 3
+    spool.ack(token)
+    assert spool.depth() == 0
+    assert spool.read(10)[1] == []
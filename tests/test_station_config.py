@@ -0,0 +1,15 @@
+from station_config import registry
+
+
+def test_script_profiles_override_their_station():
+    core = registry.scripts['CoreMaking']
+    station = registry.stations['CoreMaking']
+    assert core['station'] == 'Core_Energy'
+    assert core['notification_pf'] == (0.80, 0.90)
+    assert core['pf_ranges']['high'] == (0.91, 0.99, 0.10)
+    # Everything not overridden comes from the station
+    assert core['name'] == station['name']
+    assert core['pf_ranges']['low'] == station['pf_ranges']['low']
+    assert core['power_range'] == station['power_range']
+    # Profiles are not stations
+    assert 'station' not in station
@@ -0,0 +1,46 @@
+import pytest
+
+from storage_pool import StoragePool
+
+
+def test_returned_sessions_are_reused(storage_factory):
+    pool = StoragePool(storage_factory, max_size=2)
+    first = pool.get()
+    session = first._storage
+    first.close()
+    first.close()
+    second = pool.get()
+    assert second._storage is session
+    second.close()
+    assert pool.stats()['opened'] == 1
+    assert pool.stats()['reused'] == 1
+    pool.dispose()
+
+
+def test_dead_sessions_fail_the_health_check_and_are_replaced(storage_factory):
+    pool = StoragePool(storage_factory, max_size=1, ping_after=0)
+    storage = pool.get()
+    dead = storage._storage
+    storage.close()
+    # The connection drops while the session is idle
+    dead.conn.close()
+
+    storage = pool.get()
+    assert storage._storage is not dead
+    assert len(storage.read_sql("SELECT 1 AS one")) == 1
+    storage.close()
+    assert pool.stats()['failed_pings'] == 1
+    assert pool.stats()['opened'] == 2
+    pool.dispose()
+
+
+def test_a_full_pool_times_out(storage_factory):
+    pool = StoragePool(storage_factory, max_size=1, timeout=0.05)
+    storage = pool.get()
+    with pytest.raises(TimeoutError):
+        pool.get()
+    storage.close()
+    # The slot came back with the session
+    pool.get().close()
+    assert pool.stats()['timeouts'] == 1
+    pool.dispose()
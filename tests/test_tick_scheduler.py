@@ -0,0 +1,55 @@
+import time
+from datetime import datetime, timedelta
+
+from sim_clock import VirtualClock
+from tick_scheduler import TickScheduler
+
+START = datetime(2025, 5, 5, 9, 59, 30)
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def test_ticks_land_on_minute_boundaries_and_catch_up_in_order():
+    clock = VirtualClock(START, speed=None)
+    ticks = []
+    scheduler = TickScheduler(ticks.append, period=60, max_catch_up=3, clock=clock)
+    scheduler.start()
+    try:
+        clock.advance(31)
+        assert wait_for(lambda: len(ticks) == 1)
+        assert ticks == [datetime(2025, 5, 5, 10, 0)]
+
+        # Stalled for ten minutes: the last three missed ticks are fired late, each with its own boundary
+        clock.advance(10 * 60)
+        assert wait_for(lambda: len(ticks) == 5)
+    finally:
+        scheduler.stop(5)
+    assert ticks[1:] == [datetime(2025, 5, 5, 10, 0) + timedelta(minutes=minutes) for minutes in (7, 8, 9, 10)]
+    assert scheduler.stats['skipped_ticks'] == 6
+    assert scheduler.stats['late_ticks'] == 3
+
+
+def test_a_failing_tick_does_not_stop_the_scheduler():
+    clock = VirtualClock(START, speed=None)
+    ticks = []
+
+    def callback(tick):
+        ticks.append(tick)
+        if len(ticks) == 1:
+            raise RuntimeError('database down')
+
+    scheduler = TickScheduler(callback, period=60, clock=clock)
+    scheduler.start()
+    try:
+        clock.advance(31)
+        assert wait_for(lambda: len(ticks) == 1)
+        clock.advance(60)
+        assert wait_for(lambda: len(ticks) == 2)
+    finally:
+        scheduler.stop(5)
+    assert scheduler.stats['failures'] == 1
@@ -0,0 +1,33 @@
+import threading
+from datetime import datetime
+
+from id_allocator import IdAllocator
+from realtime_samples import build_energy_insert
+from station_config import registry
+from write_behind import WriteBehindQueue
+
+
+def test_write_behind_ids_are_unique_with_concurrent_producers(storage_factory):
+    queue = WriteBehindQueue(flush_interval=0.01, batch_size=25, storage_factory=storage_factory,
+                             ids=IdAllocator(storage_factory, block_size=10))
+    config = registry.stations['Laddle']
+    queue.start()
+
+    def produce(hour):
+        for minute in range(60):
+            queue.put(config['name'], build_energy_insert(config, datetime(2025, 5, 5, hour, minute)))
+
+    producers = [threading.Thread(target=produce, args=(hour,)) for hour in range(9, 13)]
+    for producer in producers:
+        producer.start()
+    for producer in producers:
+        producer.join()
+    queue.stop()
+
+    storage = storage_factory()
+    try:
+        rows = storage.read_sql("SELECT ID FROM Laddle_Energy")
+    finally:
+        storage.close()
+    assert len(rows) == 4 * 60
+    assert rows['ID'].is_unique
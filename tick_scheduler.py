@@ -0,0 +1,115 @@
+# Wall-clock-aligned tick scheduler for the real-time generators. One thread fires callback(tick) on every
+# multiple of period seconds since the epoch (minute boundaries by default), where tick is that boundary
+# as a datetime, so samples land exactly one period apart however long each tick takes.
+# Ticks missed while the process was stalled are fired late, in order, each with its own boundary, up to
+# max_catch_up of them; older ones are skipped (the startup gap fill picks those minutes up).
+import logging
+import math
+import os
+import threading
+from collections import deque
+from datetime import datetime
+
+import pandas as pd
+
+from sim_clock import get_clock
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TICK_PERIOD = float(os.environ.get('TICK_PERIOD', 60))
+DEFAULT_MAX_CATCH_UP = int(os.environ.get('TICK_MAX_CATCH_UP', 60))
+
+
+class TickScheduler:
+    # clock: a sim_clock clock (the process-wide one by default); ticks follow its time, so a VirtualClock
+    # replays the live path faster than real time
+    def __init__(self, callback, period=DEFAULT_TICK_PERIOD, max_catch_up=DEFAULT_MAX_CATCH_UP, clock=None,
+                 name='ticks'):
+        self.callback = callback
+        self.period = period
+        self.max_catch_up = max_catch_up
+        self.clock = clock or get_clock()
+        self.name = name
+        self._stop = threading.Event()
+        self._thread = None
+        self.stats = {'ticks': 0, 'late_ticks': 0, 'skipped_ticks': 0, 'failures': 0, 'max_lag_seconds': 0.0}
+
+    # First boundary strictly after now
+    def next_boundary(self, now):
+        return (math.floor(now / self.period) + 1) * self.period
+
+    def start(self):
+        if self._thread:
+            return self._thread
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.run, name=self.name, daemon=True)
+        self._thread.start()
+        return self._thread
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+
+    # Blocking loop; returns once stop() is called
+    def run(self):
+        next_tick = self.next_boundary(self.clock.time())
+        while not self._stop.is_set():
+            delay = next_tick - self.clock.time()
+            if delay > 0:
+                # Re-check after waking; the wait may return early
+                self.clock.wait(self._stop, delay)
+                continue
+
+            now = self.clock.time()
+            overdue = int((now - next_tick) // self.period)
+            if overdue > self.max_catch_up:
+                skipped = overdue - self.max_catch_up
+                logger.warning(f"{self.name}: {skipped} ticks missed, catching up on the last {self.max_catch_up}")
+                self.stats['skipped_ticks'] += skipped
+                next_tick += skipped * self.period
+
+            while next_tick <= now and not self._stop.is_set():
+                self._fire(next_tick, now)
+                next_tick += self.period
+
+    def _fire(self, tick, now):
+        lag = now - tick
+        self.stats['ticks'] += 1
+        self.stats['max_lag_seconds'] = max(self.stats['max_lag_seconds'], lag)
+        if lag >= self.period:
+            self.stats['late_ticks'] += 1
+        try:
+            self.callback(datetime.fromtimestamp(tick))
+        except Exception as e:
+            self.stats['failures'] += 1
+            logger.error(f"{self.name}: tick {datetime.fromtimestamp(tick)} failed: {str(e)}")
+
+
+# Hand the rows of frame to insert(rows) as their timestamps come due, one tick at a time (rows already
+# due go in straight away); blocks until every row is inserted. frame and timestamps are in the same order.
+def replay(frame, timestamps, insert, period=DEFAULT_TICK_PERIOD, clock=None):
+    clock = clock or get_clock()
+    pending = deque(range(len(frame)))
+    timestamps = list(pd.DatetimeIndex(timestamps))
+    done = threading.Event()
+
+    def insert_due(tick):
+        due = []
+        while pending and timestamps[pending[0]] <= tick:
+            due.append(pending.popleft())
+        if due:
+            insert(frame.iloc[due])
+        if not pending:
+            done.set()
+
+    insert_due(clock.now())
+    if done.is_set():
+        return
+    scheduler = TickScheduler(insert_due, period, max_catch_up=math.inf, clock=clock, name='replay')
+    scheduler.start()
+    try:
+        done.wait()
+    finally:
+        scheduler.stop()
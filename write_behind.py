@@ -0,0 +1,161 @@
+# Write-behind queue for the real-time writers. Producers put() rows and return immediately; one writer
+# thread drains the queue every flush_interval seconds (or as soon as batch_size rows are waiting) and
+# writes everything it drained in a single multi-table transaction over one storage session.
+# IDs are assigned at flush time from the in-process block allocator (id_allocator.py).
+# With a spool (spool.py), put() appends to local segment files instead of memory, so rows survive
+# database outages and restarts; batches are read back from the spool and acknowledged once committed.
+import logging
+import os
+import threading
+import time
+from collections import deque
+
+import pandas as pd
+
+from gap_fill import present_minutes
+from id_allocator import IdAllocator
+from storage import open_storage
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_FLUSH_INTERVAL = float(os.environ.get('WRITE_BEHIND_INTERVAL', 5))
+DEFAULT_BATCH_SIZE = int(os.environ.get('WRITE_BEHIND_BATCH', 5000))
+
+
+class WriteBehindQueue:
+    # max_queue bounds memory if the database is unreachable for a long time; the oldest rows are dropped
+    # (without a spool; the spool is bounded by disk only)
+    def __init__(self, flush_interval=DEFAULT_FLUSH_INTERVAL, batch_size=DEFAULT_BATCH_SIZE, max_queue=1_000_000,
+                 storage_factory=open_storage, ids=None, spool=None):
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.storage_factory = storage_factory
+        self.ids = ids or IdAllocator(storage_factory)
+        self.spool = spool
+        self._rows = deque(maxlen=max_queue)
+        self._condition = threading.Condition()
+        self._stopping = False
+        self._thread = None
+        self.stats = {'queued': 0, 'written': 0, 'flushes': 0, 'failures': 0, 'last_flush_seconds': 0.0}
+
+    # Queue one row ({column: value}, without ID) for table
+    def put(self, table, row):
+        self.put_many([(table, row)])
+
+    # Queue several (table, row) pairs at once, e.g. every station's sample for one tick
+    def put_many(self, rows):
+        if self.spool:
+            self.spool.append(rows)
+        with self._condition:
+            if not self.spool:
+                self._rows.extend(rows)
+            self.stats['queued'] += len(rows)
+            if self.depth() >= self.batch_size:
+                self._condition.notify()
+
+    def depth(self):
+        return self.spool.depth() if self.spool else len(self._rows)
+
+    def start(self):
+        if self._thread:
+            return self._thread
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, name='write-behind', daemon=True)
+        self._thread.start()
+        return self._thread
+
+    # Stop the writer and flush whatever is still queued
+    def stop(self, timeout=None):
+        with self._condition:
+            self._stopping = True
+            self._condition.notify()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self):
+        while True:
+            with self._condition:
+                if not self._stopping and self.depth() < self.batch_size:
+                    self._condition.wait(self.flush_interval)
+                stopping = self._stopping
+            try:
+                # Drain completely on shutdown, one batch per wake-up otherwise
+                while self.flush() and (stopping or self.depth() >= self.batch_size):
+                    pass
+            except Exception as e:
+                logger.error(f"Write-behind flush failed, will retry: {str(e)}")
+                if stopping:
+                    return
+                time.sleep(self.flush_interval)
+            if stopping:
+                if self.spool:
+                    self.spool.close()
+                return
+
+    def _take_batch(self):
+        with self._condition:
+            return [self._rows.popleft() for _ in range(min(self.batch_size, len(self._rows)))]
+
+    # Put a failed batch back at the head of the queue, preserving order (spooled rows stay unacknowledged)
+    def _requeue(self, batch):
+        if self.spool:
+            return
+        with self._condition:
+            self._rows.extendleft(reversed(batch))
+
+    # Rows whose minute is already in their table (spooled by an earlier process and committed before it
+    # could acknowledge them)
+    def _already_written(self, storage, tables):
+        for table, rows in tables.items():
+            days = [row['Date'] for row in rows]
+            present = set(present_minutes(storage, table, min(days), max(days)))
+            kept = [row for row in rows
+                    if pd.Timestamp.combine(row['Date'], row['Time']).floor('min') not in present]
+            if len(kept) < len(rows):
+                logger.info(f"Spool replay: skipping {len(rows) - len(kept)} rows already in {table}")
+            tables[table] = kept
+
+    # Write one batch in a single transaction; returns the number of rows written
+    def flush(self):
+        if self.spool:
+            token, batch, recovered = self.spool.read(self.batch_size)
+        else:
+            token, batch, recovered = None, self._take_batch(), False
+        if not batch:
+            return 0
+
+        tables = {}
+        for table, row in batch:
+            tables.setdefault(table, []).append(row)
+
+        started = time.perf_counter()
+        try:
+            storage = self.storage_factory()
+        except Exception:
+            self._requeue(batch)
+            self.stats['failures'] += 1
+            raise
+        try:
+            if recovered:
+                self._already_written(storage, tables)
+            # IDs are reserved outside the write transaction; a failed write only leaves a gap
+            ids = {table: self.ids.take(table, len(rows)) for table, rows in tables.items()}
+            for table, rows in tables.items():
+                storage.insert_many(table, [{'ID': row_id, **row} for row_id, row in zip(ids[table], rows)])
+            storage.commit()
+        except Exception:
+            self._requeue(batch)
+            self.stats['failures'] += 1
+            raise
+        finally:
+            storage.close()
+        if token:
+            self.spool.ack(token)
+
+        written = sum(len(rows) for rows in tables.values())
+        self.stats['written'] += written
+        self.stats['flushes'] += 1
+        self.stats['last_flush_seconds'] = time.perf_counter() - started
+        logger.debug(f"Flushed {written} rows to {len(tables)} tables in {self.stats['last_flush_seconds']:.3f}s")
+        return len(batch)